@@ -20,6 +20,7 @@ logger = logging.getLogger(__name__)
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from src.analytics.supabase_analytics import supabase_analytics
 from src.config.supabase_config import get_supabase_client
 
 # Rate limiting (simple in-memory for demo; use Redis in production)
@@ -221,15 +222,8 @@ class handler(BaseHTTPRequestHandler):
             }
             
             # Log analytics view
-            try:
-                client.table("tool_invocations").insert({
-                    "tool": "analytics_view",
-                    "args_hash": "",
-                    "duration_ms": 0,  # Will be calculated client-side
-                    "status": "success"
-                }).execute()
-            except Exception as e:
-                logger.warning(f"Could not log analytics view: {e}")
+            # (queued by the analytics write-behind buffer, flushed below)
+            supabase_analytics.log_tool_invocation("analytics_view")
             
             self._send_json(200, response)
             
@@ -238,6 +232,10 @@ class handler(BaseHTTPRequestHandler):
             self._send_json(500, {
                 "error": f"Internal server error: {str(e)}"
             })
+        finally:
+            # After the response is complete (Content-Length); the container
+            # may be frozen once the handler returns
+            supabase_analytics.flush()
     
     def do_OPTIONS(self):
         """Handle CORS preflight request."""
@@ -246,12 +244,21 @@ class handler(BaseHTTPRequestHandler):
         self.end_headers()
     
     def _send_json(self, status_code: int, data: Dict[str, Any]):
-        """Send JSON response with CORS headers."""
+        """Send JSON response with CORS headers.
+        
+        Content-Length lets the client (and Vercel's proxy) treat the
+        response as complete once the body is written, so the analytics
+        flush in the handler's finally block runs after the user has it.
+        """
+        body = json.dumps(data).encode('utf-8')
         self.send_response(status_code)
         self._send_cors_headers()
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Connection', 'close')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
+        self.wfile.flush()
     
     def _send_cors_headers(self):
         """Add CORS headers for cross-origin requests."""
@@ -1,8 +1,21 @@
 """
 Vercel serverless function for chat API endpoint.
 Executes LangGraph conversation flow and returns response.
+
+Streaming: send {"stream": true} (or Accept: text/event-stream) to receive
+Server-Sent Events instead of one JSON body:
+
+    event: token    data: {"text": "..."}    answer deltas as the LLM writes them
+    event: context  data: {"text": "..."}    role-context blocks appended to the answer
+    event: done     data: {...}              the regular JSON response (full answer + metadata)
+    event: error    data: {"success": false, "error": "..."}
+
+GET /api/chat returns this instance's latency histograms (p50/p95/p99 per
+request, per conversation node and per sub-span such as embed/llm).
 """
 from http.server import BaseHTTPRequestHandler
+import asyncio
+import hmac
 import json
 import sys
 import os
@@ -17,9 +30,19 @@ logger = logging.getLogger(__name__)
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.flows.conversation_flow import run_conversation_flow
+from src.analytics.supabase_analytics import supabase_analytics
+from src.flows.async_flow import FlowDeadlineExceeded
+from src.flows.conversation_flow import (
+    run_conversation_flow,
+    run_conversation_flow_async,
+    stream_conversation_flow,
+)
 from src.flows.conversation_state import ConversationState
-from src.core.rag_engine import RagEngine
+from src.core.rag_engine import get_rag_engine
+from src.observability.profiling import latency_summary
+
+# Run independent nodes (notifications, analytics insert, role context) concurrently
+ASYNC_FLOW_ENABLED = os.getenv("ASYNC_CONVERSATION_FLOW", "true").lower() == "true"
 
 
 class handler(BaseHTTPRequestHandler):
@@ -47,8 +70,8 @@ class handler(BaseHTTPRequestHandler):
             user_name = data.get('user_name')
             user_phone = data.get('user_phone')
             
-            # Initialize RAG engine
-            rag_engine = RagEngine()
+            # Reuse the warm container's RAG engine (built on first request)
+            rag_engine = get_rag_engine()
             
             # Create conversation state
             state = ConversationState(
@@ -66,32 +89,92 @@ class handler(BaseHTTPRequestHandler):
             if user_phone:
                 state.stash('user_phone', user_phone)
             
-            # Run conversation flow
-            result_state = run_conversation_flow(state, rag_engine, session_id=session_id)
+            if data.get('stream') or 'text/event-stream' in self.headers.get('Accept', ''):
+                self._stream_response(state, rag_engine, session_id)
+                return
             
-            # Build response
-            response = {
-                'success': True,
-                'answer': result_state.answer,
-                'role': result_state.role,
-                'session_id': result_state.fetch('session_id', session_id),
-                'analytics': result_state.analytics_metadata,
-                'actions_taken': [
-                    action.get('type') for action in result_state.pending_actions
-                ],
-                'retrieved_chunks': len(result_state.retrieved_chunks)
-            }
+            # Run conversation flow
+            if ASYNC_FLOW_ENABLED:
+                result_state = asyncio.run(
+                    run_conversation_flow_async(state, rag_engine, session_id=session_id)
+                )
+            else:
+                result_state = run_conversation_flow(state, rag_engine, session_id=session_id)
             
             # Send success response
-            self._send_json(200, response)
+            self._send_json(200, self._build_response(result_state, session_id))
             
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {e}")
             self._send_error(400, "Invalid JSON in request body")
+        except FlowDeadlineExceeded as e:
+            logger.error(f"Conversation flow timed out: {e}")
+            self._send_error(504, "Request timed out, please try again")
         except Exception as e:
             logger.error(f"Error processing request: {str(e)}")
             logger.error(traceback.format_exc())
             self._send_error(500, f"Internal server error: {str(e)}")
+        finally:
+            # The response is already complete (Content-Length, or the SSE
+            # `done` event); queued retrieval_logs must still be written
+            # before returning, since a frozen container never runs the
+            # flusher thread or atexit
+            supabase_analytics.flush()
+    
+    def _build_response(self, result_state: ConversationState, session_id: str) -> Dict[str, Any]:
+        """JSON response body for a completed conversation turn."""
+        return {
+            'success': True,
+            'answer': result_state.answer,
+            'role': result_state.role,
+            'session_id': result_state.fetch('session_id', session_id),
+            'analytics': result_state.analytics_metadata,
+            'actions_taken': [
+                action.get('type') for action in result_state.pending_actions
+            ],
+            'retrieved_chunks': len(result_state.retrieved_chunks)
+        }
+    
+    def _stream_response(self, state: ConversationState, rag_engine, session_id: str):
+        """Send the conversation turn as Server-Sent Events (see module docstring)."""
+        self.send_response(200)
+        self._send_cors_headers()
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        try:
+            for kind, payload in stream_conversation_flow(state, rag_engine, session_id=session_id):
+                if kind == 'done':
+                    self._send_event('done', self._build_response(payload, session_id))
+                else:
+                    self._send_event(kind, {'text': payload})
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error(f"Error streaming response: {str(e)}")
+            logger.error(traceback.format_exc())
+            self._send_event('error', {'success': False, 'error': f"Internal server error: {str(e)}"})
+    
+    def _send_event(self, event: str, data: Dict[str, Any]):
+        """Write one Server-Sent Event and flush it to the client."""
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+    
+    def do_GET(self):
+        """Return the in-process latency histogram summary.
+
+        Admin only: disabled (404) unless LATENCY_STATS_TOKEN is set, and the
+        request must send it as `Authorization: Bearer <token>`.
+        """
+        token = os.getenv("LATENCY_STATS_TOKEN", "")
+        if not token:
+            self._send_error(404, "Not found")
+            return
+        supplied = self.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+            self._send_error(403, "Forbidden")
+            return
+        self._send_json(200, {'success': True, 'latency': latency_summary()})
     
     def do_OPTIONS(self):
         """Handle CORS preflight request."""
@@ -100,12 +183,21 @@ class handler(BaseHTTPRequestHandler):
         self.end_headers()
     
     def _send_json(self, status_code: int, data: Dict[str, Any]):
-        """Send JSON response with CORS headers."""
+        """Send JSON response with CORS headers.
+        
+        Content-Length lets the client (and Vercel's proxy) treat the
+        response as complete once the body is written, so the analytics
+        flush in the handler's finally block runs after the user has it.
+        """
+        body = json.dumps(data).encode('utf-8')
         self.send_response(status_code)
         self._send_cors_headers()
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Connection', 'close')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
+        self.wfile.flush()
     
     def _send_error(self, status_code: int, message: str):
         """Send error response."""
@@ -117,5 +209,5 @@ class handler(BaseHTTPRequestHandler):
     def _send_cors_headers(self):
         """Add CORS headers for cross-origin requests."""
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
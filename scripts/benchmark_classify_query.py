@@ -0,0 +1,96 @@
+"""Benchmark classify_query keyword matching.
+
+Compares, on representative chat queries:
+
+- per-list scans:  one `any(keyword in query ...)` per vocabulary, the way
+                   classify_query matched before (plus the MMA regexes built
+                   per query)
+- matcher:         QUERY_MATCHER.match(), one pass of the compiled automaton
+- classify_query:  the whole node (matching + stash calls)
+
+and checks that both matchers report the same vocabularies for every query.
+
+Usage:
+    python scripts/benchmark_classify_query.py
+    python scripts/benchmark_classify_query.py --repeat 20000
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Offline placeholders so config validation passes without real credentials
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from src.flows import query_classification as qc
+from src.flows.conversation_state import ConversationState
+
+QUERIES = [
+    "Tell me about Noah's career and his experience at Tesla",
+    "Why did you choose Supabase instead of Pinecone for vector search?",
+    "Show me the code for the retrieval pipeline",
+    "How does the RAG pipeline in this chatbot work? Explain the architecture and trade-offs.",
+    "What are Noah's hobbies? Any fun fact?",
+    "Does Noah still train MMA or has he had a fight recently?",
+    "Can you display the collected data?",
+    "How many people asked about the resume this week?",
+    "hello",
+    "What's the difference between the node and the class in the conversation flow?",
+]
+
+
+def per_list_scan(lowered):
+    """Vocabulary hits the pre-automaton way: one scan per keyword list."""
+    vocabularies = {category: phrases for category, phrases in [
+        ("data_display", qc.DATA_DISPLAY_KEYWORDS), ("teaching", qc.TEACHING_KEYWORDS),
+        ("code_display", qc.CODE_DISPLAY_KEYWORDS), ("proactive_code", qc.PROACTIVE_CODE_TOPICS),
+        ("import", qc.IMPORT_KEYWORDS), ("library", qc.LIBRARY_NAMES), ("question", qc.QUESTION_WORDS),
+        ("fun", qc.FUN_KEYWORDS), ("proactive_data", qc.PROACTIVE_DATA_TOPICS),
+        ("technical", qc.TECHNICAL_TERMS), ("how", qc.HOW_PHRASES), ("system", qc.SYSTEM_WORDS),
+        ("career", qc.CAREER_TERMS),
+    ]}
+    hits = {category for category, phrases in vocabularies.items() if any(p in lowered for p in phrases)}
+    if any(re.search(r"\b" + k + r"\b", lowered) for k in qc.MMA_KEYWORDS):
+        hits.add("mma")
+    return frozenset(hits)
+
+
+def classify(query):
+    qc.classify_query(ConversationState(role="Software Developer", query=query))
+
+
+def per_query_us(fn, inputs, repeat):
+    total = timeit.timeit(lambda: [fn(item) for item in inputs], number=repeat)
+    return total / (repeat * len(inputs)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark classify_query keyword matching')
+    parser.add_argument('--repeat', type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # classify_query logs proactive detections
+
+    lowered = [query.lower() for query in QUERIES]
+    mismatches = [q for q in lowered if per_list_scan(q) != qc.QUERY_MATCHER.match(q)]
+    if mismatches:
+        sys.exit(f"Matchers disagree on: {mismatches}")
+
+    scan_us = per_query_us(per_list_scan, lowered, args.repeat)
+    matcher_us = per_query_us(qc.QUERY_MATCHER.match, lowered, args.repeat)
+    classify_us = per_query_us(classify, QUERIES, args.repeat)
+
+    print(f"\n{len(QUERIES)} queries, {args.repeat} repeats, identical hits")
+    print(f"{'per-list scans':<20}{scan_us:>10.2f} µs/query")
+    print(f"{'matcher':<20}{matcher_us:>10.2f} µs/query  ({scan_us / matcher_us:.1f}x)")
+    print(f"{'classify_query':<20}{classify_us:>10.2f} µs/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark the two-stage Matryoshka search for the in-process KB index.
+
+Stage one scores every chunk on a re-normalized prefix of the embedding
+(e.g. the first 256 of 1536 dims); stage two rescores the best candidates
+at full dimension. Reports recall@k against exhaustive full-dimension
+search, scoring FLOPs per query and per-query latency for a grid of
+prefix sizes and candidate counts.
+
+Matryoshka truncation only preserves ranking for embeddings trained for
+it (text-embedding-3-*), so use --embeddings openai for representative
+recall. The offline hashing embeddings spread signal evenly over all
+dims and give a pessimistic lower bound.
+
+Usage:
+    python scripts/benchmark_matryoshka_index.py                       # offline hashing embeddings
+    python scripts/benchmark_matryoshka_index.py --embeddings openai
+    python scripts/benchmark_matryoshka_index.py --dims 256 512 --candidates 32 64 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.kb_benchmark_data import build_index, embed, load_kb_chunks, recall_at_k, run_queries
+from src.retrieval.embedding_index import normalize_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Matryoshka prefix prefilter + full-dimension rescoring')
+    parser.add_argument('--embeddings', choices=['hashing', 'openai'], default='hashing')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--dims', type=int, nargs='+', default=[256, 512], help='Prefix dimensions to try')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[32, 64], help='Rows rescored at full dimension')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Tile the KB this many times (with small noise) to simulate a larger index')
+    args = parser.parse_args()
+
+    chunks, questions = load_kb_chunks()
+    print(f"📄 {len(chunks)} chunks x{args.repeat}, {len(questions)} queries ({args.embeddings} embeddings)")
+    matrix = embed([c['content'] for c in chunks], args.embeddings)
+    queries = embed(questions, args.embeddings)
+    if args.repeat > 1:
+        rng = np.random.default_rng(0)
+        noise = rng.normal(scale=0.01 * float(np.abs(matrix).mean()), size=(args.repeat - 1,) + matrix.shape)
+        matrix = np.vstack([matrix] + [matrix + n for n in noise.astype(np.float32)])
+        chunks = chunks * args.repeat
+
+    exact_index = build_index(chunks, matrix)
+    expected, exact_ms = run_queries(exact_index, queries, args.top_k)
+    exact_scores = normalize_rows(queries) @ exact_index.matrix.T
+    n, full_dims = exact_index.matrix.shape
+
+    print(f"\n{'mode':<26}{'recall@' + str(args.top_k):>12}{'MFLOP/query':>14}{'ms/query':>11}")
+    print(f"{f'exhaustive ({full_dims}d)':<26}{1.0:>12.4f}{2 * n * full_dims / 1e6:>14.2f}{exact_ms:>11.3f}")
+
+    for dims in args.dims:
+        for candidates in args.candidates:
+            index = build_index(chunks, matrix).quantize('float32', rescore_candidates=candidates, prefix_dims=dims)
+            actual, ms = run_queries(index, queries, args.top_k)
+            flops = 2 * n * min(dims, full_dims) + 2 * max(candidates, args.top_k) * full_dims
+            label = f"prefix {dims}d, {candidates} rescored"
+            print(f"{label:<26}{recall_at_k(exact_scores, expected, actual):>12.4f}{flops / 1e6:>14.2f}{ms:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark compact (float16 / int8) storage for the in-process KB index.
+
+Compares EmbeddingIndex with quantized coarse scoring + exact rescoring
+against exact float32 search on the shipped knowledge bases, reporting
+recall@k, resident embedding memory and per-query latency.
+
+Usage:
+    python scripts/benchmark_quantized_index.py                    # offline hashing embeddings
+    python scripts/benchmark_quantized_index.py --embeddings openai
+    python scripts/benchmark_quantized_index.py --top-k 5 --candidates 32
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.kb_benchmark_data import build_index, embed, load_kb_chunks, recall_at_k, run_queries
+from src.retrieval.embedding_index import normalize_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark quantized KB index storage')
+    parser.add_argument('--embeddings', choices=['hashing', 'openai'], default='hashing')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--candidates', type=int, default=64, help='Rows rescored at float32 per query')
+    args = parser.parse_args()
+
+    chunks, questions = load_kb_chunks()
+    print(f"📄 {len(chunks)} chunks, {len(questions)} queries ({args.embeddings} embeddings)")
+    matrix = embed([c['content'] for c in chunks], args.embeddings)
+    queries = embed(questions, args.embeddings)
+
+    exact_index = build_index(chunks, matrix)
+    expected, exact_ms = run_queries(exact_index, queries, args.top_k)
+    exact_scores = normalize_rows(queries) @ exact_index.matrix.T
+
+    print(f"\n{'storage':<26}{'recall@' + str(args.top_k):>12}{'resident MB':>14}{'ms/query':>11}")
+    print(f"{'float32':<26}{1.0:>12.4f}{exact_index.resident_bytes / 1e6:>14.2f}{exact_ms:>11.3f}")
+
+    for storage in ('float16', 'int8'):
+        for candidates in (0, args.candidates):
+            index = build_index(chunks, matrix).quantize(storage, rescore_candidates=candidates)
+            actual, ms = run_queries(index, queries, args.top_k)
+            # The best max(top_k, candidates) coarse rows are always rescored
+            label = f"{storage}, {max(candidates, args.top_k)} rescored"
+            print(f"{label:<26}{recall_at_k(exact_scores, expected, actual):>12.4f}{index.resident_bytes / 1e6:>14.2f}{ms:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark RagEngine construction with lazy vs eager components.
+
+RagEngine builds its components (LLM client, career KB, code index, ...)
+on first access. This script measures what a request pays:
+
+- lazy:   RagEngine() alone, what the pgvector chat path pays up front
+- chat:   RagEngine() + llm + response_generator (retrieval + generation)
+- eager:  RagEngine() + warm(), equivalent to the old constructor
+
+and the build time of each component. The pgvector retriever is disabled
+so the numbers measure in-process setup, not network calls.
+
+Usage:
+    python scripts/benchmark_rag_engine_startup.py
+    python scripts/benchmark_rag_engine_startup.py --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Offline placeholders so config validation passes without real credentials
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from src.core.rag_engine import LAZY_COMPONENTS, RagEngine
+
+
+def timed_ms(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark lazy RagEngine startup')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    RagEngine(use_pgvector=False).warm()  # import/JIT warm-up, not measured
+
+    lazy, chat, eager = [], [], []
+    components = {name: [] for name in LAZY_COMPONENTS}
+    for _ in range(args.runs):
+        lazy.append(timed_ms(lambda: RagEngine(use_pgvector=False)))
+        chat.append(timed_ms(lambda: RagEngine(use_pgvector=False).warm(["llm", "response_generator"])))
+
+        def build_eager():
+            for name, ms in RagEngine(use_pgvector=False).warm().items():
+                components[name].append(ms)
+        eager.append(timed_ms(build_eager))
+
+    print(f"\n{'construction':<28}{'median ms':>12}")
+    print(f"{'lazy (RagEngine())':<28}{statistics.median(lazy):>12.1f}")
+    print(f"{'chat path (llm + generator)':<28}{statistics.median(chat):>12.1f}")
+    print(f"{'eager (warm())':<28}{statistics.median(eager):>12.1f}")
+
+    print(f"\n{'component':<28}{'median ms':>12}")
+    for name, samples in components.items():
+        print(f"{name:<28}{statistics.median(samples):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Build (or incrementally refresh) the serialized code index artifact.
+
+Writes vector_stores/code_index/index.json.gz, which CodeIndex loads on
+startup instead of AST-parsing every .py file. An existing artifact is
+reused: only files whose content hash changed are re-parsed.
+
+Usage:
+    python scripts/build_code_index.py              # refresh the artifact
+    python scripts/build_code_index.py --full       # re-parse every file
+    python scripts/build_code_index.py --output /tmp/code_index
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.retrieval.code_index import REPO_ROOT, CodeIndex
+
+DEFAULT_OUTPUT = os.path.join("vector_stores", "code_index")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the serialized code index artifact')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Artifact directory (relative to the repo root)')
+    parser.add_argument('--full', action='store_true', help='Ignore the existing artifact and re-parse every file')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = CodeIndex(REPO_ROOT, artifact_path=None if args.full else args.output)
+    build_ms = (time.perf_counter() - started) * 1000
+    path = index.save(args.output)
+
+    started = time.perf_counter()
+    CodeIndex(REPO_ROOT, artifact_path=args.output)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    print(f"✅ {len(index.index)} entries from {len(index._files)} files → {path} ({path.stat().st_size / 1e3:.0f} KB)")
+    print(f"   build: {build_ms:.0f}ms ({'full' if args.full or not index.loaded_from_artifact else 'incremental'}), "
+          f"load from artifact: {load_ms:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Shared data helpers for the retrieval benchmark scripts.
+
+Loads the shipped Q&A knowledge bases (data/*.csv) as chunk texts plus
+their questions, and embeds them either with OpenAI (realistic, costs a
+few cents) or with a deterministic feature-hashing embedder (offline, no
+API key, good enough for comparing an approximate index against exact
+search over the *same* vectors). Also builds an EmbeddingIndex over them
+and times batched queries against it.
+"""
+
+import csv
+import hashlib
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.retrieval.embedding_index import EmbeddingIndex
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+# Q&A knowledge bases in the same format the migration script ingests
+QA_KNOWLEDGE_BASES = ('career_kb', 'technical_kb', 'architecture_kb')
+
+EMBEDDING_DIMENSIONS = 1536
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def load_kb_chunks(kb_names=QA_KNOWLEDGE_BASES) -> Tuple[List[Dict[str, str]], List[str]]:
+    """Read KB CSVs into chunk dicts and their questions.
+
+    Chunk content matches scripts/migrate_all_kb_to_supabase.py
+    ("question\\n\\nanswer"), so results are representative of production.
+
+    Returns:
+        (chunks with doc_id/section/content, questions usable as queries)
+    """
+    chunks: List[Dict[str, str]] = []
+    questions: List[str] = []
+    for kb_name in kb_names:
+        path = os.path.join(DATA_DIR, f"{kb_name}.csv")
+        with open(path, 'r', encoding='utf-8') as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                question = (row.get('Question') or row.get('question') or '').strip()
+                answer = (row.get('Answer') or row.get('answer') or '').strip()
+                if not question and not answer:
+                    continue
+                chunks.append({
+                    'doc_id': kb_name,
+                    'section': f"entry_{i + 1}",
+                    'content': f"{question}\n\n{answer}",
+                })
+                if question:
+                    questions.append(question)
+    return chunks, questions
+
+
+def hashing_embeddings(texts: List[str], dimensions: int = EMBEDDING_DIMENSIONS) -> np.ndarray:
+    """Deterministic signed feature-hashing embeddings (unigrams + bigrams)."""
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            matrix[row, value % dimensions] += 1.0 if (value >> 63) & 1 else -1.0
+    return matrix
+
+
+def openai_embeddings(texts: List[str], model: str = "text-embedding-3-small") -> np.ndarray:
+    """Embed texts with OpenAI, 100 inputs per request."""
+    from openai import OpenAI
+
+    client = OpenAI()
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), 100):
+        response = client.embeddings.create(model=model, input=texts[start:start + 100])
+        vectors.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def embed(texts: List[str], backend: str) -> np.ndarray:
+    """Embed with the named backend ("hashing" or "openai")."""
+    if backend == "openai":
+        return openai_embeddings(texts)
+    return hashing_embeddings(texts)
+
+
+def build_index(chunks: List[Dict[str, str]], matrix: np.ndarray) -> EmbeddingIndex:
+    """EmbeddingIndex over `chunks` with row numbers as ids."""
+    return EmbeddingIndex(
+        matrix,
+        ids=list(range(len(chunks))),
+        doc_ids=[c['doc_id'] for c in chunks],
+        sections=[c['section'] for c in chunks],
+        contents=[c['content'] for c in chunks],
+    )
+
+
+def run_queries(index: EmbeddingIndex, queries: np.ndarray, top_k: int) -> Tuple[List[List[int]], float]:
+    """Search all queries in one batch.
+
+    Returns:
+        (top-k ids per query, milliseconds per query)
+    """
+    started = time.perf_counter()
+    results = index.search_many(queries, top_k=top_k, threshold=-1.0)
+    per_query_ms = (time.perf_counter() - started) * 1000 / max(len(queries), 1)
+    return [[c['id'] for c in r] for r in results], per_query_ms
+
+
+def recall_at_k(exact_scores: np.ndarray, expected: List[List[int]], actual: List[List[int]]) -> float:
+    """Mean fraction of the exact top-k recovered by an approximate search.
+
+    Tie-aware: a returned id counts as a hit when its exact score is at
+    least the k-th best exact score, so equally-scored chunks (duplicate
+    KB rows, integer-valued hashing features) are not counted as misses.
+
+    Args:
+        exact_scores: float[Q, N] exact cosine scores for every query/chunk
+        expected: Exact top-k ids per query
+        actual: Approximate top-k ids per query
+    """
+    total = 0.0
+    for q, (exp, act) in enumerate(zip(expected, actual)):
+        if not exp:
+            total += 1.0
+            continue
+        kth = exact_scores[q, exp].min() - 1e-6
+        hits = sum(1 for i in set(act) if exact_scores[q, i] >= kth)
+        total += min(hits, len(exp)) / len(exp)
+    return total / len(expected) if expected else 1.0
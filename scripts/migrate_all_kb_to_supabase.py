@@ -9,6 +9,12 @@ Usage:
     python scripts/migrate_all_kb_to_supabase.py
     python scripts/migrate_all_kb_to_supabase.py --force  # Re-import all
     python scripts/migrate_all_kb_to_supabase.py --kb technical_kb  # Just one KB
+    python scripts/migrate_all_kb_to_supabase.py --snapshot-only  # Rebuild KB snapshot
+
+After migrating, the script writes a memory-mapped KB snapshot
+(vector_stores/kb_snapshot/) that PgVectorRetriever loads on cold start.
+Vercel rebuilds it with --snapshot-only in buildCommand and bundles it via
+includeFiles (vercel.json); a stale snapshot is ignored automatically.
 """
 
 import sys
@@ -24,6 +30,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from openai import OpenAI
 from src.config.supabase_config import get_supabase_client, supabase_settings
+from src.retrieval.embedding_snapshot import DEFAULT_SNAPSHOT_DIR
 
 logging.basicConfig(
     level=logging.INFO,
@@ -274,6 +281,27 @@ class EnhancedMigration:
         logger.info(f"   Time elapsed: {elapsed:.1f}s")
         logger.info("="*60 + "\n")
         logger.info("✅ All migrations complete!")
+    
+    def write_snapshot(self, directory: str = DEFAULT_SNAPSHOT_DIR) -> bool:
+        """Write the versioned KB embedding snapshot for fast cold starts.
+        
+        Returns:
+            True if the snapshot was written
+        """
+        from src.retrieval.pgvector_retriever import PgVectorRetriever
+        
+        retriever = PgVectorRetriever(
+            openai_client=self.openai_client,
+            supabase_client=self.supabase_client,
+            snapshot_dir=None
+        )
+        try:
+            retriever.export_snapshot(directory)
+            logger.info(f"📦 KB snapshot written to {directory}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to write KB snapshot: {e}")
+            return False
 
 
 def main():
@@ -282,6 +310,9 @@ def main():
     parser = argparse.ArgumentParser(description='Migrate all KB data to Supabase')
     parser.add_argument('--force', action='store_true', help='Delete existing and re-import')
     parser.add_argument('--kb', type=str, help='Migrate specific KB only (career_kb, technical_kb, architecture_kb)')
+    parser.add_argument('--snapshot-dir', type=str, default=DEFAULT_SNAPSHOT_DIR, help='Where to write the KB snapshot')
+    parser.add_argument('--no-snapshot', action='store_true', help='Skip writing the KB snapshot')
+    parser.add_argument('--snapshot-only', action='store_true', help='Only rebuild the KB snapshot from Supabase')
     
     args = parser.parse_args()
     
@@ -298,7 +329,11 @@ def main():
     
     # Run migration
     migration = EnhancedMigration()
-    migration.migrate_all(force=args.force, specific_kb=args.kb)
+    if not args.snapshot_only:
+        migration.migrate_all(force=args.force, specific_kb=args.kb)
+    if not args.no_snapshot:
+        if not migration.write_snapshot(args.snapshot_dir) and args.snapshot_only:
+            sys.exit(1)
 
 
 if __name__ == '__main__':
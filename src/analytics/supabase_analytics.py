@@ -11,18 +11,44 @@ Key differences from GCP version:
 - Supabase RLS → Built-in security instead of IAM policies
 
 Cost savings: ~$100-200/month (GCP) → ~$25-50/month (Supabase)
+
+Write-behind (ANALYTICS_WRITE_BEHIND, default on):
+    retrieval_logs and tool_invocations rows are queued in a
+    WriteBehindBuffer and written in bulk by a background thread, so chat
+    requests don't wait on them. messages rows are always inserted
+    synchronously: the message_id goes back to the client, and
+    api/feedback.py (a different serverless process) inserts feedback rows
+    that reference messages(id), so the row must exist before the id leaves
+    this process.
+
+    Serverless handlers call flush() before returning: a frozen or killed
+    Vercel container never runs the background thread or atexit.
 """
 
+import atexit
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
 import uuid
 
+from src.analytics.write_buffer import WriteBehindBuffer
 from src.config.supabase_config import get_supabase_client, supabase_settings
 
 logger = logging.getLogger(__name__)
 
+# Tables written by the buffer (messages is always written synchronously)
+BUFFERED_TABLES = ("retrieval_logs", "tool_invocations")
+
+# PostgREST: column not found in the schema cache (e.g. messages.timings
+# before migration 005)
+MISSING_COLUMN = "PGRST204"
+
+
+def _write_behind_enabled() -> bool:
+    return os.getenv("ANALYTICS_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+
 
 @dataclass
 class UserInteractionData:
@@ -37,6 +63,8 @@ class UserInteractionData:
     - query/answer: Store the actual conversation
     - latency_ms: Monitor performance
     - tokens_*: Track OpenAI usage for cost optimization
+    - timings: Per-node/sub-span breakdown of latency_ms (messages.timings
+      jsonb, migration 005) so slow requests show which stage was slow
     """
     session_id: str
     role_mode: str
@@ -48,6 +76,7 @@ class UserInteractionData:
     tokens_completion: Optional[int] = None
     success: bool = True
     timestamp: Optional[datetime] = None
+    timings: Optional[Dict[str, Any]] = None
     
     def __post_init__(self):
         """Set timestamp if not provided."""
@@ -98,15 +127,34 @@ class SupabaseAnalytics:
         message_id = supabase_analytics.log_interaction(interaction)
     """
     
-    def __init__(self):
+    def __init__(self, write_behind: Optional[bool] = None):
         """Initialize Supabase client.
         
+        Args:
+            write_behind: Queue inserts in a WriteBehindBuffer (default:
+                ANALYTICS_WRITE_BEHIND env var, on unless set to false)
+        
         Why lazy initialization:
         - Client creation happens on first use
         - Tests can mock get_supabase_client easily
         - Allows app to start even if Supabase is temporarily down
         """
         self._client = None
+        self._buffer: Optional[WriteBehindBuffer] = None
+        # Cleared the first time PostgREST reports messages.timings missing
+        self._timings_column = True
+        if write_behind is None:
+            write_behind = _write_behind_enabled()
+        if write_behind:
+            self._buffer = WriteBehindBuffer(
+                self._bulk_insert,
+                batch_size=int(os.getenv("ANALYTICS_BATCH_SIZE", "50")),
+                flush_interval=float(os.getenv("ANALYTICS_FLUSH_SECONDS", "2")),
+                max_pending=int(os.getenv("ANALYTICS_MAX_PENDING", "1000")),
+                block_timeout=float(os.getenv("ANALYTICS_BLOCK_MS", "0")) / 1000,
+                table_order=BUFFERED_TABLES,
+            )
+            atexit.register(self._buffer.close)
     
     @property
     def client(self):
@@ -115,6 +163,33 @@ class SupabaseAnalytics:
             self._client = get_supabase_client()
         return self._client
     
+    def _bulk_insert(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Multi-row insert used by the write-behind buffer (one request per call)."""
+        self.client.table(table).insert(rows).execute()
+    
+    def _insert(self, table: str, row: Dict[str, Any]):
+        """Queue `row` when write-behind is on, otherwise insert it now.
+        
+        Returns:
+            The insert result for direct writes, None when queued
+        """
+        if self._buffer is not None:
+            self._buffer.put(table, row)
+            return None
+        return self.client.table(table).insert(row).execute()
+    
+    def flush(self) -> int:
+        """Write all queued analytics rows now (no-op without write-behind).
+        
+        Returns:
+            Number of rows written
+        """
+        return self._buffer.flush() if self._buffer is not None else 0
+    
+    def buffer_stats(self) -> Optional[Dict[str, int]]:
+        """Write-behind counters (queued/written/dropped/failed/pending), or None."""
+        return self._buffer.stats() if self._buffer is not None else None
+    
     def log_interaction(self, interaction: UserInteractionData) -> Optional[int]:
         """Log a user interaction to the messages table.
         
@@ -126,11 +201,13 @@ class SupabaseAnalytics:
             
         Why this approach:
         - Returns ID so we can log retrieval info later
+        - Never queued, even with write-behind: the client rates the answer
+          by this id and feedback.message_id references messages(id)
         - Fails gracefully (logs error but doesn't crash app)
         - Simple direct write (no Pub/Sub complexity)
         """
         try:
-            result = self.client.table('messages').insert({
+            row = {
                 'session_id': interaction.session_id,
                 'role_mode': interaction.role_mode,
                 'query': interaction.query,
@@ -141,8 +218,20 @@ class SupabaseAnalytics:
                 'tokens_completion': interaction.tokens_completion,
                 'success': interaction.success,
                 'created_at': interaction.timestamp.isoformat()
-            }).execute()
-            
+            }
+            if interaction.timings is not None and self._timings_column:
+                row['timings'] = interaction.timings
+            try:
+                result = self.client.table('messages').insert(row).execute()
+            except Exception as e:
+                if 'timings' not in row or MISSING_COLUMN not in str(getattr(e, 'code', '') or e):
+                    raise
+                # Migration 005 not applied: keep logging messages without
+                # the breakdown instead of losing every message_id
+                logger.warning("messages.timings column missing (run migration 005); logging without timings")
+                self._timings_column = False
+                del row['timings']
+                result = self.client.table('messages').insert(row).execute()
             message_id = result.data[0]['id'] if result.data else None
             logger.info(f"Logged interaction for session {interaction.session_id}, message_id: {message_id}")
             return message_id
@@ -163,18 +252,38 @@ class SupabaseAnalytics:
             retrieval_log: Retrieval event data
         """
         try:
-            self.client.table('retrieval_logs').insert({
+            self._insert('retrieval_logs', {
                 'message_id': retrieval_log.message_id,
                 'topk_ids': retrieval_log.topk_ids,
                 'scores': retrieval_log.scores,
                 'grounded': retrieval_log.grounded
-            }).execute()
+            })
             
             logger.debug(f"Logged retrieval for message {retrieval_log.message_id}")
             
         except Exception as e:
             logger.error(f"Failed to log retrieval: {e}")
     
+    def log_tool_invocation(self, tool: str, args_hash: str = "", duration_ms: int = 0,
+                            status: str = "success"):
+        """Log a tool/endpoint invocation to the tool_invocations table.
+        
+        Args:
+            tool: Tool name (e.g. 'analytics_view')
+            args_hash: Hash of the arguments (empty if not tracked)
+            duration_ms: How long the invocation took
+            status: 'success' or an error label
+        """
+        try:
+            self._insert('tool_invocations', {
+                'tool': tool,
+                'args_hash': args_hash,
+                'duration_ms': duration_ms,
+                'status': status
+            })
+        except Exception as e:
+            logger.warning(f"Could not log tool invocation {tool}: {e}")
+    
     def log_feedback(self, message_id: int, rating: int, comment: str = "", 
                     contact_requested: bool = False, user_email: str = "",
                     user_name: str = "", user_phone: str = ""):
@@ -317,6 +426,7 @@ class SupabaseAnalytics:
                 "database_connected": True,
                 "total_messages": result.count if hasattr(result, 'count') else 0,
                 "recent_messages_24h": recent.count if hasattr(recent, 'count') else 0,
+                "write_buffer": self.buffer_stats(),
                 "timestamp": datetime.utcnow().isoformat()
             }
         
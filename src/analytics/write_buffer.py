@@ -0,0 +1,220 @@
+"""Bounded write-behind buffer for analytics inserts.
+
+Every chat request used to pay for synchronous Supabase inserts before the
+response went out. Rows nothing reads back right away (retrieval_logs,
+tool_invocations) don't need to be visible instantly, so SupabaseAnalytics
+hands them to this buffer and returns immediately; a background thread
+writes them as multi-row inserts (one request per table per flush).
+
+Flush triggers:
+    - size: `batch_size` rows are pending
+    - time: the oldest pending row is `flush_interval` seconds old
+    - shutdown: close() (registered with atexit by SupabaseAnalytics)
+    - explicit: flush(), e.g. at the end of each serverless request (the
+      thread and atexit don't run in a frozen container), from tests, or
+      before reading analytics back
+
+Ordering:
+    Rows are written per table in `table_order` (then first-seen order), so
+    foreign-key parents land before the rows that reference them. Flushes
+    are serialized, so a row is never written before rows queued ahead of
+    it in an earlier flush.
+
+When full:
+    `put()` waits up to `block_timeout` seconds for room (back-pressure,
+    default 0) and otherwise drops the row and counts it in stats()["dropped"].
+    Analytics loss is preferable to slowing down or exhausting memory on the
+    request path.
+
+Failures:
+    A failed bulk insert is retried row by row (inserts are atomic per
+    statement, so this never duplicates rows); rows that still fail are
+    logged and counted in stats()["failed"]. Nothing is retried later.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+BulkWriter = Callable[[str, List[Row]], None]
+
+
+class WriteBehindBuffer:
+    """Queue of (table, row) pairs written in batches by a background thread.
+
+    Example:
+        buffer = WriteBehindBuffer(lambda table, rows: client.table(table).insert(rows).execute())
+        buffer.put("retrieval_logs", {...})   # returns immediately
+        buffer.close()                        # writes whatever is left
+    """
+
+    def __init__(
+        self,
+        writer: BulkWriter,
+        *,
+        batch_size: int = 50,
+        flush_interval: float = 2.0,
+        max_pending: int = 1000,
+        block_timeout: float = 0.0,
+        table_order: Sequence[str] = (),
+    ):
+        """Create the buffer (the flusher thread starts on the first put).
+
+        Args:
+            writer: Inserts a list of rows into a table; raises on failure
+            batch_size: Pending rows that trigger a flush (and max rows per insert)
+            flush_interval: Max seconds a row waits before being flushed
+            max_pending: Rows held before put() starts dropping
+            block_timeout: Seconds put() waits for room before dropping
+            table_order: Tables written first, in this order (FK parents first)
+        """
+        self._writer = writer
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.block_timeout = block_timeout
+        self._table_rank = {table: rank for rank, table in enumerate(table_order)}
+
+        self._pending: Deque[Tuple[float, str, Row]] = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0}
+
+    def put(self, table: str, row: Row) -> bool:
+        """Queue one row for `table`.
+
+        Returns:
+            True if queued, False if dropped (buffer full or closed)
+        """
+        with self._cond:
+            if self._closed:
+                self._drop(table, "buffer closed")
+                return False
+            if len(self._pending) >= self.max_pending and self.block_timeout > 0:
+                self._cond.wait_for(lambda: len(self._pending) < self.max_pending or self._closed,
+                                    timeout=self.block_timeout)
+            if self._closed or len(self._pending) >= self.max_pending:
+                self._drop(table, "buffer full")
+                return False
+
+            self._pending.append((time.monotonic(), table, row))
+            self._stats["queued"] += 1
+            self._ensure_thread()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self) -> int:
+        """Write everything queued so far on the calling thread.
+
+        Returns:
+            Number of rows written successfully
+        """
+        written = 0
+        while True:
+            batch = self._drain_and_write()
+            if batch is None:
+                return written
+            written += batch
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the flusher thread and write the remaining rows."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters (queued/written/dropped/failed/flushes) plus current pending."""
+        with self._cond:
+            return dict(self._stats, pending=len(self._pending))
+
+    def _drop(self, table: str, reason: str) -> None:
+        self._stats["dropped"] += 1
+        dropped = self._stats["dropped"]
+        if dropped == 1 or dropped % 100 == 0:
+            logger.warning(f"Analytics write buffer dropped a {table} row ({reason}); {dropped} dropped so far")
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="analytics-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    if self._pending:
+                        wait = self._pending[0][0] + self.flush_interval - time.monotonic()
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                if self._closed:
+                    return  # close() writes the rest on its own thread
+            self.flush()
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.batch_size:
+            return True
+        return time.monotonic() - self._pending[0][0] >= self.flush_interval
+
+    def _drain_and_write(self) -> Optional[int]:
+        # Draining and writing under one lock keeps flushes in queue order
+        with self._write_lock:
+            with self._cond:
+                if not self._pending:
+                    return None
+                count = min(len(self._pending), self.batch_size)
+                items = [self._pending.popleft() for _ in range(count)]
+                self._cond.notify_all()  # room for blocked put() calls
+
+            by_table: Dict[str, List[Row]] = {}
+            for _, table, row in items:
+                by_table.setdefault(table, []).append(row)
+            tables = sorted(by_table, key=lambda t: self._table_rank.get(t, len(self._table_rank)))
+
+            written = failed = 0
+            for table in tables:
+                ok, bad = self._write(table, by_table[table])
+                written += ok
+                failed += bad
+
+            with self._cond:
+                self._stats["written"] += written
+                self._stats["failed"] += failed
+                self._stats["flushes"] += 1
+            return written
+
+    def _write(self, table: str, rows: List[Row]) -> Tuple[int, int]:
+        try:
+            self._writer(table, rows)
+            return len(rows), 0
+        except Exception as exc:
+            if len(rows) == 1:
+                logger.error(f"Failed to write {table} row: {exc}")
+                return 0, 1
+            logger.warning(f"Bulk insert of {len(rows)} {table} rows failed ({exc}); retrying row by row")
+
+        written = 0
+        for row in rows:
+            try:
+                self._writer(table, [row])
+                written += 1
+            except Exception as exc:
+                logger.error(f"Failed to write {table} row: {exc}")
+        return written, len(rows) - written
@@ -0,0 +1,230 @@
+"""Semantic answer cache in front of LLM generation.
+
+Many visitors ask nearly the same question ("what are Noah's skills",
+"how does this chatbot work"). Each one used to pay for a multi-second
+generate_contextual_response call. This cache returns the earlier answer
+when a new query's embedding is close enough to a cached query asked
+under identical conditions.
+
+Design:
+- **Bucket key**: role + classification flags + KB version. Answers only
+  match when the prompt would have been built the same way from the same
+  knowledge base, so a "Software Developer" never gets a casual visitor's
+  answer and a re-migrated KB never serves stale text
+- **Match**: cosine similarity of L2-normalized query embeddings >=
+  `similarity_threshold` (one small matvec per bucket, best match wins)
+- **Bounds**: LRU over all entries (`max_entries`), per-entry TTL.
+  Expired entries are pruned from the looked-up bucket on get() and from
+  every bucket on put(), so idle buckets don't hold capacity until LRU
+  eviction reaches them
+- **Counters**: per-entry hit counts plus cache-wide hits/misses/evictions
+- **Invalidation**: invalidate() drops every entry; RagEngine registers it
+  with PgVectorRetriever.on_kb_change so a KB reload clears the cache
+
+Configuration (environment):
+- ANSWER_CACHE_ENABLED: "false" disables caching (default true)
+- ANSWER_CACHE_SIZE: max entries (default 256)
+- ANSWER_CACHE_TTL_SECONDS: entry lifetime (default 3600)
+- ANSWER_CACHE_SIMILARITY: minimum cosine similarity for a hit (default 0.95)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.retrieval.embedding_index import normalize_vector
+
+logger = logging.getLogger(__name__)
+
+BucketKey = Tuple[Hashable, ...]
+
+
+@dataclass
+class CachedAnswer:
+    """One cached generation."""
+    query: str
+    answer: str
+    embedding: np.ndarray
+    created_at: float
+    hits: int = 0
+
+
+class SemanticAnswerCache:
+    """Bounded LRU + TTL cache of answers keyed by query embedding similarity.
+
+    Example usage:
+        cache = SemanticAnswerCache(similarity_threshold=0.95)
+        key = cache.make_key(role, flags, kb_version)
+        answer = cache.get(key, query_embedding)
+        if answer is None:
+            answer = generate(...)
+            cache.put(key, query, query_embedding, answer)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.95,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Create a cache.
+
+        Args:
+            max_entries: Capacity; least recently used entries are evicted
+            ttl_seconds: Entry lifetime (0 disables expiry)
+            similarity_threshold: Minimum cosine similarity between query
+                embeddings for a cached answer to be reused
+            clock: Time source (injectable for tests)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._buckets: Dict[BucketKey, List[int]] = {}
+        self._bucket_of: Dict[int, BucketKey] = {}
+        self._matrices: Dict[BucketKey, np.ndarray] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(role: str, flags: Dict[str, Any], kb_version: Optional[str]) -> BucketKey:
+        """Bucket key from role, classification flags and KB version."""
+        return (role, kb_version) + tuple(sorted(flags.items()))
+
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - entry.created_at > self.ttl_seconds
+
+    def get(self, key: BucketKey, query_embedding: Sequence[float]) -> Optional[str]:
+        """Return the best cached answer within the similarity threshold, or None."""
+        query = normalize_vector(query_embedding)
+        now = self._clock()
+        with self._lock:
+            for entry_id in [i for i in self._buckets.get(key, ()) if self._expired(self._entries[i], now)]:
+                self._remove(entry_id)
+                self.expirations += 1
+
+            entry_ids = self._buckets.get(key)
+            if entry_ids:
+                matrix = self._matrices.get(key)
+                if matrix is None:
+                    matrix = np.vstack([self._entries[i].embedding for i in entry_ids])
+                    self._matrices[key] = matrix
+                if matrix.shape[1] == query.shape[0]:
+                    similarities = matrix @ query
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.similarity_threshold:
+                        entry_id = entry_ids[best]
+                        entry = self._entries[entry_id]
+                        entry.hits += 1
+                        self._entries.move_to_end(entry_id)
+                        self.hits += 1
+                        return entry.answer
+
+            self.misses += 1
+            return None
+
+    def put(self, key: BucketKey, query: str, query_embedding: Sequence[float], answer: str) -> None:
+        """Cache a generated answer for `query` under `key`."""
+        if not answer or not len(query_embedding):
+            return
+        entry = CachedAnswer(query, answer, normalize_vector(query_embedding), self._clock())
+        with self._lock:
+            self._prune_expired(entry.created_at)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._buckets.setdefault(key, []).append(entry_id)
+            self._bucket_of[entry_id] = key
+            self._matrices.pop(key, None)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _prune_expired(self, now: float) -> None:
+        """Drop expired entries from every bucket (caller holds the lock)."""
+        if not self.ttl_seconds:
+            return
+        for entry_id in [i for i, e in self._entries.items() if self._expired(e, now)]:
+            self._remove(entry_id)
+            self.expirations += 1
+
+    def _remove(self, entry_id: int) -> None:
+        del self._entries[entry_id]
+        key = self._bucket_of.pop(entry_id)
+        bucket = self._buckets[key]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self._buckets[key]
+        self._matrices.pop(key, None)
+
+    def invalidate(self, kb_version: Optional[str] = None) -> None:
+        """Drop every entry (e.g. the KB was re-migrated).
+
+        Args:
+            kb_version: New KB version, for logging only (signature matches
+                PgVectorRetriever.on_kb_change callbacks)
+        """
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._buckets.clear()
+            self._bucket_of.clear()
+            self._matrices.clear()
+            self.invalidations += 1
+        if dropped:
+            logger.info(f"Answer cache invalidated ({dropped} entries, kb_version={kb_version})")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def top_entries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most-hit cached queries, for dashboards."""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e.hits, reverse=True)[:limit]
+            return [{"query": e.query, "hits": e.hits} for e in entries]
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for health checks and dashboards."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global cache instance shared by every RagEngine in the process
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Get or create the process-wide answer cache (None when disabled)."""
+    global _answer_cache
+    if os.getenv("ANSWER_CACHE_ENABLED", "true").strip().lower() == "false":
+        return None
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+            similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+        )
+    return _answer_cache
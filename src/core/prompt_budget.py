@@ -0,0 +1,277 @@
+"""Token budget for role prompts (system text + chat history + retrieved context).
+
+_build_role_prompt used to join every retrieved chunk in full. Some
+architecture_kb / technical_kb chunks are 5-13k characters, so a single
+request could send several thousand context tokens on top of a ~1k token
+role prompt, and every one of them is paid for in latency and cost.
+
+ResponseGenerator now assembles prompts against a PromptBudget:
+
+    total = system text (role prompt, extra instructions) + query
+          + history (newest turns first, capped at `history`)
+          + context (whatever is left)
+
+- System text and the query are never trimmed; they are measured by
+  rendering the prompt with empty context
+- History keeps the newest turns that fit in `history` tokens
+- Chunks are admitted best-score first (`_boosted_similarity`, then
+  `similarity`). A chunk that does not fit is trimmed to the remaining
+  budget if at least `min_chunk` tokens remain, otherwise dropped. Kept
+  chunks stay in retrieval order so the prompt reads the same as before
+- The resulting token counts are reported per request (see
+  capture_prompt_report) and stored in analytics metadata
+
+Token counting:
+- "estimate" (default): whitespace runs count as one character, then
+  chars / PROMPT_CHARS_PER_TOKEN. OpenAI's rule of thumb is ~4 chars per
+  token for English; 3.5 over-counts slightly, so prompts stay under budget
+- "tiktoken": exact counts for OPENAI_MODEL when tiktoken and its encoding
+  files are available. Encodings are downloaded on first use, which a cold
+  serverless start may not be able to do, so any failure falls back to the
+  estimator with one warning
+
+Configuration (environment):
+- PROMPT_TOKEN_BUDGET: total prompt tokens (default 4000, 0 = no limit)
+- PROMPT_HISTORY_TOKENS: cap for chat history (default 600)
+- PROMPT_MIN_CHUNK_TOKENS: smallest useful trimmed chunk (default 80)
+- PROMPT_TOKENIZER: "estimate" (default) or "tiktoken"
+- PROMPT_CHARS_PER_TOKEN: estimator calibration (default 3.5)
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RUN = re.compile(r"\s+")
+_TRUNCATION_MARKER = "\n[...]"
+
+
+class TokenCounter:
+    """Counts and truncates text in model tokens.
+
+    Example:
+        counter = TokenCounter()                 # calibrated estimator
+        counter.count("How does RAG work?")      # 5
+        counter.truncate(long_chunk, 200)        # <= 200 tokens, ends with "[...]"
+    """
+
+    def __init__(self, encoding: Any = None, chars_per_token: float = 3.5):
+        """Create a counter.
+
+        Args:
+            encoding: A tiktoken Encoding; None uses the estimator
+            chars_per_token: Estimator calibration (ignored with an encoding)
+        """
+        self._encoding = encoding
+        self.chars_per_token = max(1.0, chars_per_token)
+
+    @property
+    def name(self) -> str:
+        if self._encoding is not None:
+            return f"tiktoken:{self._encoding.name}"
+        return f"estimate:{self.chars_per_token:g}"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(_WHITESPACE_RUN.sub(" ", text)) / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut `text` to at most `max_tokens`, marking the cut.
+
+        Prefers a line break near the cut, and closes a ``` fence left open
+        so code blocks in trimmed chunks still render.
+        """
+        if self.count(text) <= max_tokens:
+            return text
+        room = max_tokens - self.count(_TRUNCATION_MARKER + "\n```")
+        if room <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            cut = self._encoding.decode(tokens[:room])
+        else:
+            # Raw characters never count for more than their collapsed form
+            cut = text[:int(room * self.chars_per_token)]
+        newline = cut.rfind("\n")
+        if newline > len(cut) // 2:
+            cut = cut[:newline]
+        if cut.count("```") % 2:
+            cut += "\n```"
+        return cut + _TRUNCATION_MARKER
+
+
+def _load_encoding(model: str) -> Any:
+    """tiktoken encoding for `model`, or None (logged) if unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("PROMPT_TOKENIZER=tiktoken but tiktoken is not installed; using the estimator")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # encoding files are fetched over the network on first use
+        logger.warning(f"Could not load tiktoken encoding for {model} ({exc}); using the estimator")
+        return None
+
+
+_token_counter: Optional[TokenCounter] = None
+
+
+def get_token_counter() -> TokenCounter:
+    """Process-wide TokenCounter configured from the environment."""
+    global _token_counter
+    if _token_counter is None:
+        encoding = None
+        if os.getenv("PROMPT_TOKENIZER", "estimate").strip().lower() == "tiktoken":
+            encoding = _load_encoding(os.getenv("OPENAI_MODEL", "gpt-3.5-turbo").strip())
+        _token_counter = TokenCounter(
+            encoding=encoding,
+            chars_per_token=float(os.getenv("PROMPT_CHARS_PER_TOKEN", "3.5")),
+        )
+    return _token_counter
+
+
+@dataclass
+class PromptBudget:
+    """Token limits for one role prompt.
+
+    Attributes:
+        total: Whole prompt (0 = unlimited, counts are still reported)
+        history: Cap for the chat history section
+        min_chunk: Smallest trimmed chunk worth keeping
+    """
+    total: int = 4000
+    history: int = 600
+    min_chunk: int = 80
+
+    @classmethod
+    def from_env(cls) -> "PromptBudget":
+        return cls(
+            total=int(os.getenv("PROMPT_TOKEN_BUDGET", "4000")),
+            history=int(os.getenv("PROMPT_HISTORY_TOKENS", "600")),
+            min_chunk=int(os.getenv("PROMPT_MIN_CHUNK_TOKENS", "80")),
+        )
+
+
+def fit_history(lines: Sequence[str], max_tokens: int, counter: TokenCounter) -> Tuple[List[str], int]:
+    """Newest history lines that fit in `max_tokens`, in chronological order.
+
+    Stops at the first line that does not fit, so the kept turns are always
+    the most recent contiguous ones.
+
+    Returns:
+        (kept lines, their token count)
+    """
+    kept: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        cost = counter.count(line) + 1  # + newline
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return kept, used
+
+
+def _chunk_score(chunk: Any) -> float:
+    if isinstance(chunk, dict):
+        for key in ("_boosted_similarity", "similarity", "score"):
+            value = chunk.get(key)
+            if isinstance(value, (int, float)):
+                return float(value)
+    return 0.0
+
+
+def _chunk_text(chunk: Any) -> str:
+    return chunk.get("content", str(chunk)) if isinstance(chunk, dict) else str(chunk)
+
+
+def fit_context(
+    chunks: Sequence[Any],
+    max_tokens: Optional[int],
+    counter: TokenCounter,
+    min_chunk_tokens: int = 80,
+) -> Tuple[List[str], Dict[str, int]]:
+    """Chunk texts that fit in `max_tokens`, best scores admitted first.
+
+    Args:
+        chunks: Retrieved chunks (dicts with "content" and scores, or strings)
+        max_tokens: Context allowance; None keeps everything
+        counter: Token counter
+        min_chunk_tokens: Below this remaining allowance a chunk is dropped
+            rather than trimmed
+
+    Returns:
+        (texts in retrieval order, {"context", "chunks_used",
+        "chunks_trimmed", "chunks_dropped"})
+    """
+    texts = [_chunk_text(chunk) for chunk in chunks]
+    costs = [counter.count(text) + 1 for text in texts]  # + joining newline
+    if max_tokens is None:
+        return texts, {"context": sum(costs), "chunks_used": len(texts),
+                       "chunks_trimmed": 0, "chunks_dropped": 0}
+
+    ranked = sorted(range(len(texts)), key=lambda i: _chunk_score(chunks[i]), reverse=True)
+    kept: Dict[int, str] = {}
+    remaining = max(0, max_tokens)
+    trimmed = 0
+    for i in ranked:
+        if costs[i] <= remaining:
+            kept[i] = texts[i]
+            remaining -= costs[i]
+        elif remaining >= min_chunk_tokens:
+            kept[i] = counter.truncate(texts[i], remaining - 1)
+            remaining -= counter.count(kept[i]) + 1
+            trimmed += 1
+        # else: dropped, but a smaller lower-scored chunk may still fit whole
+
+    fitted = [kept[i] for i in sorted(kept)]
+    return fitted, {
+        "context": max(0, max_tokens) - remaining,
+        "chunks_used": len(fitted),
+        "chunks_trimmed": trimmed,
+        "chunks_dropped": len(texts) - len(fitted),
+    }
+
+
+_report_sink: ContextVar[Optional[Dict[str, Any]]] = ContextVar("prompt_report_sink", default=None)
+
+
+@contextmanager
+def capture_prompt_report() -> Iterator[Dict[str, Any]]:
+    """Collect the budget report of prompts assembled inside the block.
+
+    Example:
+        with capture_prompt_report() as report:
+            answer = generator.generate_contextual_response(...)
+        report  # {"budget": 4000, "total": 2873, "chunks_dropped": 1, ...} or {}
+    """
+    report: Dict[str, Any] = {}
+    token = _report_sink.set(report)
+    try:
+        yield report
+    finally:
+        _report_sink.reset(token)
+
+
+def record_prompt_report(report: Dict[str, Any]) -> None:
+    """Hand a prompt's budget report to the enclosing capture_prompt_report, if any."""
+    sink = _report_sink.get()
+    if sink is not None:
+        sink.update(report)
@@ -18,9 +18,14 @@
 
 **KEY METHODS**:
 - embed(text) -> embedding vector via OpenAI
+- embed_many(texts) -> batched embeddings (one API call per 100 texts)
 - retrieve(query) -> dict with 'matches', 'skills', 'scores' keys
+- retrieve_many(queries) -> one retrieve()-shaped dict per query
 - generate_response(query) -> string answer with role-aware context
+- answer_cache / kb_version -> semantic answer cache used by generate_answer
 - retrieve_with_logging(query, message_id) -> retrieval with analytics
+- get_rag_engine() / reset_rag_engine() -> process-wide engine reused across requests
+- warm() / components_loaded() -> components are built lazily on first access
 
 **ARCHITECTURE BENEFITS**:
 - No file syncing across deployments
@@ -37,6 +42,7 @@ import logging
 from dataclasses import dataclass  # added for CodeDisplayMetrics
 from datetime import datetime      # added for CodeDisplayMetrics
 import time  # for latency tracking
+import threading  # guards the process-wide engine in get_rag_engine()
 
 # Clean imports using compatibility layer
 from .langchain_compat import (
@@ -46,6 +52,8 @@ from .langchain_compat import (
 
 # Import Supabase configuration
 from src.config.supabase_config import supabase_settings
+from src.retrieval.bm25_index import reciprocal_rank_fusion
+from .answer_cache import get_answer_cache
 
 # Import observability (gracefully handle if not available)
 try:
@@ -66,6 +74,45 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
+class _lazy_component:
+    """Per-instance memoized attribute, built on first access.
+
+    Thread-safe (the engine's re-entrant lock, since components depend on
+    each other) and overridable: assigning the attribute stores the value
+    directly, which tests use to inject doubles.
+    """
+
+    def __init__(self, builder):
+        self.builder = builder
+        self.name = builder.__name__
+        self.__doc__ = builder.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            pass
+        with instance._component_lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.builder(instance)
+            return instance.__dict__[self.name]
+
+
+# Components RagEngine builds on demand (see RagEngine.warm / components_loaded)
+LAZY_COMPONENTS = (
+    "embeddings",
+    "llm",
+    "response_generator",
+    "career_kb",
+    "_career_docs",
+    "code_index",
+    "code_service",
+)
+
+
 class RagEngine:
     """Complete RAG implementation using Supabase pgvector exclusively.
     ...existing docstring...
@@ -81,6 +128,11 @@ class RagEngine:
         # pgvector mode flag (defaults to True, requires Supabase)
         self.use_pgvector = kwargs.get("use_pgvector", True)
         
+        # Fuse BM25 keyword hits with vector hits in retrieve() (HYBRID_RETRIEVAL=false disables)
+        self.hybrid_retrieval = kwargs.get(
+            "hybrid_retrieval", os.getenv("HYBRID_RETRIEVAL", "true").strip().lower() != "false"
+        )
+        
         # Initialize pgvector retriever
         self.pgvector_retriever = None
         if self.use_pgvector:
@@ -89,6 +141,11 @@ class RagEngine:
                 from src.retrieval.pgvector_retriever import get_retriever
                 self.pgvector_retriever = get_retriever(similarity_threshold=0.3)  # Very low threshold for better recall
                 logger.info("pgvector retriever initialized successfully")
+                if self.hybrid_retrieval and getattr(self.pgvector_retriever, "search_mode", None) == "rpc":
+                    logger.info(
+                        "Hybrid retrieval inactive: PGVECTOR_SEARCH_MODE=rpc has no resident index "
+                        "for BM25, so retrieve() is vector-only until a local index loads"
+                    )
             except Exception as e:
                 logger.error(f"pgvector initialization failed: {e}")
                 raise RuntimeError(
@@ -96,6 +153,12 @@ class RagEngine:
                     "Ensure Supabase is configured with SUPABASE_URL and SUPABASE_KEY."
                 ) from e
         
+        # Semantic answer cache used by generate_answer (ANSWER_CACHE_ENABLED=false disables);
+        # cleared whenever the retriever reloads a changed KB
+        self.answer_cache = kwargs.get("answer_cache", get_answer_cache())
+        if self.answer_cache is not None and self.pgvector_retriever is not None:
+            self.pgvector_retriever.on_kb_change(self.answer_cache.invalidate)
+        
         # Parse initialization arguments
         if len(args) == 1 and not hasattr(self.settings, "validate_configuration"):
             # Assume it's supabase_settings if it has validate_configuration
@@ -111,42 +174,124 @@ class RagEngine:
         except Exception as e:
             logger.warning(f"Configuration validation warning: {e}")
 
-        # Initialize using factory
+        # Components are built by the factory on first access (see LAZY_COMPONENTS)
         from .rag_factory import RagEngineFactory
-        factory = RagEngineFactory(self.settings)
-        
-        # Create core components
-        self.embeddings, emb_degraded = factory.create_embeddings()
-        self.llm, llm_degraded = factory.create_llm()
-        self.degraded_mode = emb_degraded or llm_degraded
-        
-        # Create knowledge bases
-        self.career_kb = factory.create_career_kb(self._provided_career_kb)
-        self.code_index = factory.create_code_index(self._provided_code_index)
-        
-        # Initialize code service
+        self._factory = RagEngineFactory(self.settings)
+        self._component_lock = threading.RLock()
+        self._embeddings_degraded = False
+        self._llm_degraded = False
+
+    # ========== LAZY COMPONENTS ==========
+    # Why lazy: the pgvector chat path only needs the retriever, the LLM and
+    # the response generator. Building everything eagerly AST-parsed the
+    # repo for the code index, loaded the career CSV with pandas and split
+    # documents on every engine construction. Each component below is built
+    # once, on first access, and can be replaced by plain assignment.
+
+    @_lazy_component
+    def embeddings(self):
+        """LangChain embeddings client (fallback embedder in degraded mode)."""
+        embeddings, self._embeddings_degraded = self._factory.create_embeddings()
+        return embeddings
+
+    @_lazy_component
+    def llm(self):
+        """Chat model (fallback synthesizer in degraded mode)."""
+        llm, self._llm_degraded = self._factory.create_llm()
+        return llm
+
+    @property
+    def degraded_mode(self) -> bool:
+        """True if the embeddings or LLM client fell back to degraded mode."""
+        self.embeddings, self.llm  # build both so their status is known
+        return self._embeddings_degraded or self._llm_degraded
+
+    @_lazy_component
+    def career_kb(self):
+        """Career knowledge base (CSV via pandas) or the one passed to __init__."""
+        return self._factory.create_career_kb(self._provided_career_kb)
+
+    @_lazy_component
+    def code_index(self):
+        """Code index (AST-parses the repository) or the one passed to __init__."""
+        return self._factory.create_code_index(self._provided_code_index)
+
+    @_lazy_component
+    def code_service(self):
+        """Code index versioning/refresh service (throttled change detection)."""
         from src.retrieval.code_service import CodeIndexService
-        self.code_service = CodeIndexService(settings=self.settings, code_index=self.code_index)
-        self._code_index_snapshot = self.code_service._snapshot  # compatibility
-        
-        # Load and process documents (for compatibility)
-        self._career_docs = factory.load_documents(self.career_kb, self._provided_career_kb)
-        
-        # Create response generator
+        return CodeIndexService(settings=self.settings, code_index=self.code_index)
+
+    @_lazy_component
+    def _code_index_snapshot(self):
+        return self.code_service._snapshot  # compatibility
+
+    @_lazy_component
+    def _career_docs(self):
+        """Career documents split for the legacy (non-pgvector) path."""
+        return self._factory.load_documents(self.career_kb, self._provided_career_kb)
+
+    @_lazy_component
+    def response_generator(self):
+        """ResponseGenerator wrapping the LLM.
+
+        Role prompts (blocking and streamed) go straight to this LLM; only a
+        degraded LLM falls back to context synthesis. Degraded only if the
+        LLM is: the generator never touches the embeddings client, so
+        building it here would cost the chat path for nothing.
+        """
         from .response_generator import ResponseGenerator
-        self.response_generator = ResponseGenerator(
-            llm=self.llm,
-            qa_chain=None,
-            degraded_mode=self.degraded_mode
+        llm = self.llm
+        return ResponseGenerator(
+            llm=llm,
+            degraded_mode=self._llm_degraded
         )
 
+    def components_loaded(self) -> Dict[str, bool]:
+        """Which lazy components have been built so far."""
+        return {name: name in self.__dict__ for name in LAZY_COMPONENTS}
+
+    def warm(self, components: Optional[List[str]] = None) -> Dict[str, float]:
+        """Build components ahead of time (e.g. at deploy or in a warm-up ping).
+
+        Args:
+            components: Names from LAZY_COMPONENTS (default: all of them)
+
+        Returns:
+            Milliseconds spent building each component (0 if already built)
+        """
+        timings: Dict[str, float] = {}
+        for name in components or LAZY_COMPONENTS:
+            if name not in LAZY_COMPONENTS:
+                raise ValueError(f"Unknown component '{name}', expected one of {LAZY_COMPONENTS}")
+            started = time.perf_counter()
+            getattr(self, name)
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        return timings
+
     # ========== CORE RETRIEVAL ==========
     @trace_retrieval
-    def retrieve(self, query: str, top_k: int = 4):
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 4,
+        doc_ids: Optional[List[str]] = None,
+        query_embedding: Optional[List[float]] = None,
+    ):
         """Retrieve semantically relevant docs using pgvector.
 
+        Args:
+            query: User query
+            top_k: Number of chunks to return
+            doc_ids: KB partitions to search first (e.g. ['mma_kb']). If they
+                yield fewer than top_k chunks, the rest come from the whole KB.
+            query_embedding: Precomputed embedding of `query`. Otherwise the
+                query is embedded once here and shared by the partition
+                search, the top-up and the BM25 similarity lookup.
+
         **Architecture**:
         - Uses Supabase pgvector for vector similarity search
+        - Hybrid: BM25 keyword hits fused with vector hits (reciprocal rank)
         - Centralized embeddings, no local files
         - Retrieval logging for observability
         - Scales horizontally on Vercel
@@ -154,6 +299,8 @@ class RagEngine:
         **Observability**: Traced with LangSmith, metrics logged
         
         Returns dict with keys: 'matches', 'skills', 'raw', 'scores', 'chunks'
+        and 'query_embedding' (the embedding used, so later pipeline steps can
+        reuse it; None without pgvector)
         """
         start_time = time.time()
         matches: List[str] = []
@@ -163,7 +310,27 @@ class RagEngine:
         # Use pgvector for retrieval
         if self.pgvector_retriever:
             try:
-                chunks = self.pgvector_retriever.retrieve(query, top_k)
+                if query_embedding is None:
+                    query_embedding = self.pgvector_retriever.embed(query)
+                chunks = self.pgvector_retriever.retrieve(query, top_k, doc_id=doc_ids, query_embedding=query_embedding)
+                if doc_ids and len(chunks) < top_k:
+                    # Routed partitions under-filled: top up from the whole KB
+                    seen = {c['id'] for c in chunks}
+                    extra = [
+                        c for c in self.pgvector_retriever.retrieve(query, top_k, query_embedding=query_embedding)
+                        if c['id'] not in seen
+                    ]
+                    chunks = chunks + extra[:top_k - len(chunks)]
+                if self.hybrid_retrieval:
+                    # Exact identifiers (pgvector, Twilio, retrieve_chunks) embed
+                    # poorly; fuse BM25 hits in by reciprocal rank. lexical_search
+                    # applies the similarity threshold, so an empty vector result
+                    # (vague-query fallback) stays empty.
+                    lexical = self.pgvector_retriever.lexical_search(
+                        query, top_k, doc_id=doc_ids, query_embedding=query_embedding
+                    )
+                    if lexical:
+                        chunks = reciprocal_rank_fusion([chunks, lexical])[:top_k]
                 matches = [c['content'] for c in chunks]
                 scores = [c.get('similarity', 0.0) for c in chunks]
                 logger.debug(f"pgvector retrieved {len(matches)} chunks")
@@ -185,16 +352,61 @@ class RagEngine:
             except Exception as e:
                 logger.warning(f"Failed to calculate retrieval metrics: {e}")
         
+        return {**self._retrieval_result(chunks), "query_embedding": query_embedding}
+
+    @staticmethod
+    def _retrieval_result(chunks: List[Dict]) -> Dict[str, Any]:
+        """Shape retriever chunks into the dict returned by retrieve()."""
+        matches = [c['content'] for c in chunks]
         # Build skills extraction (simple heuristic)
         skills_fragments: List[str] = [m for m in matches if "skill" in m.lower()]
         return {
             "matches": matches,
             "skills": skills_fragments if skills_fragments else ["No explicit skills extracted"],
             "raw": matches,
-            "scores": scores,
+            "scores": [c.get('similarity', 0.0) for c in chunks],
             "chunks": chunks  # ← INCLUDE full chunks with metadata for source citations
         }
 
+    @property
+    def kb_version(self) -> Optional[str]:
+        """Version of the KB the retriever is serving (None if unknown)."""
+        if not self.pgvector_retriever:
+            return None
+        return getattr(self.pgvector_retriever, "kb_version", None)
+
+    # ========== BATCH RETRIEVAL ==========
+    def embed(self, text: str) -> List[float]:
+        """Embed one text via the pgvector retriever (cached)."""
+        if not self.pgvector_retriever:
+            return []
+        return self.pgvector_retriever.embed(text)
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts with one OpenAI call per 100 inputs."""
+        if not self.pgvector_retriever:
+            return [[] for _ in texts]
+        return self.pgvector_retriever.embed_many(texts)
+
+    @trace_retrieval
+    def retrieve_many(self, queries: List[str], top_k: int = 4) -> List[Dict[str, Any]]:
+        """Retrieve for several queries with one embedding call and one scoring pass.
+
+        Used by evaluation replays, cache warming and multi-query expansion,
+        which would otherwise pay one embedding round trip per query.
+
+        Returns:
+            One retrieve()-shaped dict per query, in input order
+        """
+        if not self.pgvector_retriever:
+            return [self._retrieval_result([]) for _ in queries]
+        try:
+            per_query = self.pgvector_retriever.retrieve_many(queries, top_k)
+        except Exception as e:
+            logger.error(f"pgvector batch retrieval failed: {e}")
+            raise RuntimeError(f"Retrieval failed: {e}. Ensure Supabase is configured.")
+        return [self._retrieval_result(chunks) for chunks in per_query]
+
     @trace_retrieval
     def retrieve_with_logging(self, query: str, message_id: int):
         """Retrieve with analytics logging (production method).
@@ -276,15 +488,30 @@ class RagEngine:
 
     # ========== ADVANCED RETRIEVAL ==========
     @trace_retrieval
-    def retrieve_with_code(self, query: str, role: str):
+    def retrieve_with_code(
+        self,
+        query: str,
+        role: str,
+        include_code: Optional[bool] = None,
+        query_embedding: Optional[List[float]] = None,
+        candidates: Optional[List[Dict[str, Any]]] = None,
+    ):
         """Enhanced retrieval that can include code snippets when allowed.
         
         **NEW**: Uses pgvector's role-aware retrieval when available.
         
         DEPRECATION: passing only `role` to trigger code inclusion will be removed in a future version.
         Callers should pass include_code=bool explicitly (RoleRouter now handles this).
+        
+        Args:
+            query: User query
+            role: User role (role-aware reranking, implicit code inclusion)
+            include_code: Whether to search the code index (default: by role)
+            query_embedding: Precomputed embedding of `query`
+            candidates: Chunks the pipeline already retrieved for `query`
+                (ConversationState.retrieved_chunks). They are reranked for
+                the role instead of running a second embedding + KB search.
         """
-        include_code = None
         if include_code is None and role is not None:
             logger.debug("DEPRECATION: implicit role-based code inclusion – supply include_code explicitly.")
         
@@ -297,7 +524,9 @@ class RagEngine:
                 chunks = self.pgvector_retriever.retrieve_for_role(
                     query=query,
                     role=role,
-                    top_k=5
+                    top_k=5,
+                    query_embedding=query_embedding,
+                    candidates=candidates
                 )
                 matches = [c['content'] for c in chunks]
                 skills_fragments = [m for m in matches if "skill" in m.lower()]
@@ -309,10 +538,12 @@ class RagEngine:
                 logger.debug(f"pgvector role-aware retrieval: role={role}, chunks={len(chunks)}")
             except Exception as e:
                 logger.error(f"pgvector role retrieval failed, using standard: {e}")
-                career_results = self.retrieve(query, top_k=5)
+                career_results = self.retrieve(query, top_k=5, query_embedding=query_embedding)
+        elif candidates is not None:
+            career_results = self._retrieval_result(candidates[:5])
         else:
             # Standard retrieval
-            career_results = self.retrieve(query, top_k=5)
+            career_results = self.retrieve(query, top_k=5, query_embedding=query_embedding)
 
         # Decide if code should be included
         if include_code is None:
@@ -355,7 +586,7 @@ class RagEngine:
     def code_index_version(self) -> str:
         """Return code index version hash for tracking changes."""
         if getattr(self, 'code_service', None):
-            return getattr(self.code_service, '_snapshot', 'none')
+            return self.code_service.version()
         return "none"
 
     # ========== HEALTH & MONITORING ==========
@@ -395,6 +626,40 @@ class RagEngine:
         
         return status
 
+
+# Process-wide engine reused across requests in a warm serverless container
+_rag_engine: Optional[RagEngine] = None
+_rag_engine_lock = threading.Lock()
+
+
+def get_rag_engine() -> RagEngine:
+    """Get or create the process-wide RagEngine.
+    
+    Why a shared engine:
+    - Building one creates the OpenAI/LangChain clients, AST-parses the repo
+      for the code index and loads the career CSV: hundreds of ms per request
+    - A warm Vercel container serves many requests; only the first pays that
+    - Creation is locked (double-checked), so concurrent first requests
+      build one engine; a failed build is not cached and is retried next call
+    """
+    global _rag_engine
+    engine = _rag_engine
+    if engine is None:
+        with _rag_engine_lock:
+            if _rag_engine is None:
+                _rag_engine = RagEngine()
+                logger.info("Process-wide RagEngine created")
+            engine = _rag_engine
+    return engine
+
+
+def reset_rag_engine() -> None:
+    """Drop the process-wide engine so the next get_rag_engine() rebuilds it (tests, config reloads)."""
+    global _rag_engine
+    with _rag_engine_lock:
+        _rag_engine = None
+
+
 @dataclass
 class CodeDisplayMetrics:
     """Metrics for code display operations."""
@@ -80,9 +80,11 @@ class RagEngineFactory:
             return provided_index
             
         try:
-            from src.retrieval.code_index import CodeIndex
+            from src.retrieval.code_index import REPO_ROOT, CodeIndex
+            # Loads the prebuilt artifact (scripts/build_code_index.py) and
+            # re-parses only files changed since it was built
             index_path = getattr(self.settings, "code_index_path", "vector_stores/code_index")
-            return CodeIndex(index_path)
+            return CodeIndex(REPO_ROOT, artifact_path=index_path)
         except Exception as e:
             logger.warning(f"Failed to create code index: {e}")
             return None
@@ -5,18 +5,63 @@ Supports multiple response types: basic, technical, and role-specific.
 """
 from __future__ import annotations
 
+import itertools
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
 from .langchain_compat import RetrievalQA, PromptTemplate, ChatOpenAI
+from .prompt_budget import (
+    PromptBudget,
+    TokenCounter,
+    fit_context,
+    fit_history,
+    get_token_counter,
+    record_prompt_report,
+)
+from src.observability.profiling import span
 
 logger = logging.getLogger(__name__)
 
+# Common first-person patterns to replace (see _enforce_third_person)
+THIRD_PERSON_REPLACEMENTS = [
+    ("Would you like me to email you my resume", "Would you like Noah to email you his resume"),
+    ("Would you like me to share my LinkedIn", "Would you like Noah to share his LinkedIn"),
+    ("I have experience", "Noah has experience"),
+    ("I worked at", "Noah worked at"),
+    ("I built", "Noah built"),
+    ("I'm skilled in", "Noah is skilled in"),
+    ("I am skilled in", "Noah is skilled in"),
+    ("My background", "Noah's background"),
+    ("My experience", "Noah's experience"),
+    ("My projects", "Noah's projects"),
+    ("I can help", "Noah can help"),
+    ("I developed", "Noah developed"),
+    ("I created", "Noah created"),
+    ("I designed", "Noah designed"),
+    ("My work", "Noah's work"),
+    ("My GitHub", "Noah's GitHub"),
+    ("My portfolio", "Noah's portfolio"),
+]
+
+# Streamed text held back so a pattern split across tokens is still replaced
+_THIRD_PERSON_HOLDBACK = max(len(pattern) for pattern, _ in THIRD_PERSON_REPLACEMENTS) - 1
+
 class ResponseGenerator:
-    def __init__(self, llm, qa_chain: Optional[RetrievalQA] = None, degraded_mode: bool = False):
+    def __init__(
+        self,
+        llm,
+        qa_chain: Optional[RetrievalQA] = None,
+        degraded_mode: bool = False,
+        prompt_budget: Optional[PromptBudget] = None,
+        token_counter: Optional[TokenCounter] = None,
+    ):
         self.llm = llm
+        # Kept for callers that still pass one; role prompts go to self.llm directly
         self.qa_chain = qa_chain
         self.degraded_mode = degraded_mode
+        # Role prompts are fitted to this budget (see src/core/prompt_budget.py)
+        self.prompt_budget = prompt_budget or PromptBudget.from_env()
+        self.token_counter = token_counter or get_token_counter()
 
     def generate_basic_response(self, query: str, fallback_docs: List[str] = None, chat_history: List[Dict[str, str]] = None) -> str:
         """Generate basic response using LLM with retrieved context and conversation history."""
@@ -57,7 +102,8 @@ Please provide a helpful and accurate answer based on the information provided.
 
         # Generate response using LLM
         try:
-            answer = self.llm.predict(prompt)
+            with span("llm"):
+                answer = self.llm.predict(prompt)
             
             # Ensure test expectation for 'tech stack'
             if "tech stack" not in answer.lower() and "tech stack" in query.lower():
@@ -90,20 +136,14 @@ Please provide a helpful and accurate answer based on the information provided.
         Returns:
             Generated response text
         """
-        context_parts = []
-        for item in context:
-            if isinstance(item, dict):
-                content = item.get("content", str(item))
-                context_parts.append(content)
-            else:
-                context_parts.append(str(item))
-        
-        context_str = "\n".join(context_parts)
-        prompt = self._build_role_prompt(query, context_str, role, chat_history, extra_instructions)
+        prompt, context_str, _ = self.assemble_role_prompt(
+            query, context, role, chat_history, extra_instructions
+        )
         
         try:
-            if self.qa_chain and not self.degraded_mode:
-                response = self.llm.predict(prompt)
+            if self._llm_available():
+                with span("llm"):
+                    response = self.llm.predict(prompt)
             else:
                 response = self._synthesize_fallback(query, context_str)
             
@@ -118,6 +158,119 @@ Please provide a helpful and accurate answer based on the information provided.
             logger.error(f"Response generation (context) failed: {e}")
             return "I'm having trouble generating a response right now. Please try again."
 
+    def stream_contextual_response(
+        self,
+        query: str,
+        context: List[Dict[str, Any]],
+        role: str = None,
+        chat_history: List[Dict[str, str]] = None,
+        extra_instructions: str = None
+    ) -> Iterator[str]:
+        """Streaming variant of generate_contextual_response: yields text deltas.
+
+        Same prompt, fallback and third-person rewriting; the concatenated
+        deltas equal what generate_contextual_response would return for the
+        same completion. Tokens come from llm.stream() when the LLM supports
+        it, otherwise the whole predict() result is yielded at once.
+
+        The prompt is assembled before the iterator is returned, so its
+        budget report reaches a capture_prompt_report() around this call.
+        """
+        prompt, context_str, _ = self.assemble_role_prompt(
+            query, context, role, chat_history, extra_instructions
+        )
+        return self._stream_response(query, prompt, context_str)
+
+    def _stream_response(self, query: str, prompt: str, context_str: str) -> Iterator[str]:
+        yielded = False
+        try:
+            if self._llm_available():
+                deltas = self._stream_llm(prompt)
+            else:
+                deltas = iter([self._synthesize_fallback(query, context_str)])
+            for delta in self._enforce_third_person_stream(deltas):
+                yielded = True
+                yield delta
+        except Exception as e:
+            logger.error(f"Response generation (stream) failed: {e}")
+            if not yielded:
+                yield "I'm having trouble generating a response right now. Please try again."
+
+    def assemble_role_prompt(
+        self,
+        query: str,
+        context: List[Dict[str, Any]],
+        role: str = None,
+        chat_history: List[Dict[str, str]] = None,
+        extra_instructions: str = None
+    ) -> Tuple[str, str, Dict[str, Any]]:
+        """Build the role prompt within self.prompt_budget.
+
+        The prompt is rendered once with empty context to measure the fixed
+        part (role text, instructions, query, fitted history); retrieved
+        chunks get whatever the budget leaves. The report is also handed to
+        record_prompt_report() for the caller's analytics.
+
+        Returns:
+            (prompt, fitted context string, report) where report is
+            {"budget", "system", "query", "history", "context", "total",
+             "chunks_used", "chunks_trimmed", "chunks_dropped", "tokenizer"}
+        """
+        budget, counter = self.prompt_budget, self.token_counter
+        history_lines, history_tokens = fit_history(
+            self._history_lines(chat_history), budget.history, counter
+        )
+        skeleton = self._build_role_prompt(
+            query, "", role, chat_history, extra_instructions, history_lines=history_lines
+        )
+        fixed = counter.count(skeleton)
+
+        allowance = max(0, budget.total - fixed) if budget.total > 0 else None
+        context_parts, usage = fit_context(context, allowance, counter, budget.min_chunk)
+        context_str = "\n".join(context_parts)
+        prompt = self._build_role_prompt(
+            query, context_str, role, chat_history, extra_instructions, history_lines=history_lines
+        )
+
+        query_tokens = counter.count(query)
+        report = {
+            "budget": budget.total,
+            "system": max(0, fixed - query_tokens - history_tokens),
+            "query": query_tokens,
+            "history": history_tokens,
+            **usage,
+            "total": counter.count(prompt),
+            "tokenizer": counter.name,
+        }
+        if usage["chunks_dropped"] or usage["chunks_trimmed"]:
+            logger.info(
+                f"Prompt budget {budget.total}: dropped {usage['chunks_dropped']}, "
+                f"trimmed {usage['chunks_trimmed']} of {len(context)} chunks ({report['total']} tokens)"
+            )
+        record_prompt_report(report)
+        return prompt, context_str, report
+
+    def _llm_available(self) -> bool:
+        """True if role prompts go to the LLM (otherwise _synthesize_fallback answers)."""
+        return self.llm is not None and not self.degraded_mode
+
+    def _stream_llm(self, prompt: str) -> Iterator[str]:
+        stream = getattr(self.llm, "stream", None)
+        if not callable(stream):
+            with span("llm"):
+                text = self.llm.predict(prompt)
+            yield text
+            return
+        # Spans only the wait for the first token; the rest overlaps delivery
+        with span("llm_first_token"):
+            chunks = iter(stream(prompt))
+            first = next(chunks, None)
+        for chunk in itertools.chain([first] if first is not None else [], chunks):
+            # ChatOpenAI yields message chunks; plain LLMs yield strings
+            text = getattr(chunk, "content", chunk)
+            if text:
+                yield text
+
     def generate_technical_response(self, query: str, career_matches: List[str], code_snippets: List[Dict[str, Any]], role: str) -> str:
         """Generate technical response with code integration."""
         context_parts = []
@@ -145,7 +298,8 @@ Please provide a helpful and accurate answer based on the information provided.
         prompt = self._build_technical_prompt(query, context)
         
         try:
-            response = self.llm.predict(prompt)
+            with span("llm"):
+                response = self.llm.predict(prompt)
             
             # Add follow-up question suggestion
             response = self._add_technical_followup(response, query, role)
@@ -161,7 +315,8 @@ Please provide a helpful and accurate answer based on the information provided.
         context_str: str, 
         role: str = None, 
         chat_history: List[Dict[str, str]] = None,
-        extra_instructions: str = None
+        extra_instructions: str = None,
+        history_lines: Optional[List[str]] = None
     ) -> str:
         """Build role-specific prompt with conversation history and optional display guidance.
         
@@ -172,25 +327,18 @@ Please provide a helpful and accurate answer based on the information provided.
             chat_history: Previous conversation turns
             extra_instructions: Optional guidance for response style
                 (e.g., "provide comprehensive explanation with code examples")
+            history_lines: Already formatted (budget-fitted) history; when
+                None, the lines are built from chat_history
         
         Returns:
             Formatted prompt string for LLM
         """
         # Build conversation history string for context continuity
+        if history_lines is None:
+            history_lines = self._history_lines(chat_history)
         history_context = ""
-        if chat_history and len(chat_history) > 0:
-            # Get last 4 messages for context (last 2 exchanges)
-            recent_history = chat_history[-4:] if len(chat_history) > 4 else chat_history
-            history_parts = []
-            for msg in recent_history:
-                if msg["role"] == "user":
-                    history_parts.append(f"User: {msg['content']}")
-                elif msg["role"] == "assistant":
-                    # Truncate long assistant messages for token efficiency
-                    content = msg['content'][:300] + "..." if len(msg['content']) > 300 else msg['content']
-                    history_parts.append(f"Assistant: {content}")
-            if history_context:
-                history_context = "\n\nPrevious conversation:\n" + "\n".join(history_parts) + "\n"
+        if history_lines:
+            history_context = "\n\nPrevious conversation:\n" + "\n".join(history_lines) + "\n"
         
         # Add extra instructions if provided (for display intelligence)
         instruction_addendum = ""
@@ -381,6 +529,18 @@ Please provide a helpful and accurate answer based on the information provided.
             Provide a helpful and informative response about Noah's background and experience.
             """
 
+    def _history_lines(self, chat_history: Optional[List[Dict[str, str]]]) -> List[str]:
+        """Last 4 messages (2 exchanges) as "User: ..." / "Assistant: ..." lines."""
+        history_parts = []
+        for msg in (chat_history or [])[-4:]:
+            if msg["role"] == "user":
+                history_parts.append(f"User: {msg['content']}")
+            elif msg["role"] == "assistant":
+                # Truncate long assistant messages for token efficiency
+                content = msg['content'][:300] + "..." if len(msg['content']) > 300 else msg['content']
+                history_parts.append(f"Assistant: {content}")
+        return history_parts
+
     def _build_technical_prompt(self, query: str, context: str) -> str:
         """Build technical response prompt."""
         return f"""
@@ -399,7 +559,7 @@ Please provide a helpful and accurate answer based on the information provided.
         """
 
     def _synthesize_fallback(self, query: str, context: str) -> str:
-        """Fallback response when QA chain is unavailable."""
+        """Fallback response when no LLM is available (degraded mode)."""
         if not context:
             return "I don't have enough information to answer that question about Noah."
         
@@ -432,33 +592,28 @@ Please provide a helpful and accurate answer based on the information provided.
 
     def _enforce_third_person(self, text: str) -> str:
         """Replace first-person references with third-person (Noah)."""
-        
-        # Common first-person patterns to replace
-        replacements = [
-            ("Would you like me to email you my resume", "Would you like Noah to email you his resume"),
-            ("Would you like me to share my LinkedIn", "Would you like Noah to share his LinkedIn"),
-            ("I have experience", "Noah has experience"),
-            ("I worked at", "Noah worked at"),
-            ("I built", "Noah built"),
-            ("I'm skilled in", "Noah is skilled in"),
-            ("I am skilled in", "Noah is skilled in"),
-            ("My background", "Noah's background"),
-            ("My experience", "Noah's experience"),
-            ("My projects", "Noah's projects"),
-            ("I can help", "Noah can help"),
-            ("I developed", "Noah developed"),
-            ("I created", "Noah created"),
-            ("I designed", "Noah designed"),
-            ("My work", "Noah's work"),
-            ("My GitHub", "Noah's GitHub"),
-            ("My portfolio", "Noah's portfolio"),
-        ]
-        
-        for first_person, third_person in replacements:
+        for first_person, third_person in THIRD_PERSON_REPLACEMENTS:
             text = text.replace(first_person, third_person)
         
         return text
 
+    def _enforce_third_person_stream(self, deltas: Iterable[str]) -> Iterator[str]:
+        """_enforce_third_person over streamed text.
+
+        The last _THIRD_PERSON_HOLDBACK characters stay buffered: any pattern
+        that starts before them is already complete in the buffer and has
+        been replaced, so emitted text never needs rewriting.
+        """
+        buffer = ""
+        for delta in deltas:
+            buffer = self._enforce_third_person(buffer + delta)
+            if len(buffer) > _THIRD_PERSON_HOLDBACK:
+                cut = len(buffer) - _THIRD_PERSON_HOLDBACK
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+        if buffer:
+            yield buffer
+
     def _add_technical_followup(self, response: str, query: str, role: str) -> str:
         """Add suggested follow-up with actionable choices for ALL roles.
         
@@ -9,8 +9,10 @@ This module handles all side effects triggered by conversation actions:
 Each action handler includes graceful degradation if services are unavailable.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import threading
+from typing import Any, Callable, Dict, Optional
 
 from src.flows.conversation_state import ConversationState
 from src.services.resend_service import get_resend_service
@@ -33,6 +35,25 @@ class ActionExecutor:
         self._resend_service: Optional[Any] = None
         self._storage_service: Optional[Any] = None
         self._twilio_service: Optional[Any] = None
+        # execute_async runs handlers on several pool threads at once
+        self._service_lock = threading.Lock()
+    
+    def _ensure_service(self, attr: str, factory: Callable[[], Any], label: str) -> Optional[Any]:
+        """Initialize a service once (thread-safe); False marks a failed init.
+        
+        factory wraps the module-level getter in a lambda so it is looked up
+        at call time (tests patch get_*_service on this module).
+        """
+        if getattr(self, attr) is None:
+            with self._service_lock:
+                if getattr(self, attr) is None:
+                    try:
+                        setattr(self, attr, factory())
+                    except Exception as exc:  # pragma: no cover - defensive guard
+                        logger.error("Failed to initialize %s service: %s", label, exc)
+                        setattr(self, attr, False)
+        service = getattr(self, attr)
+        return service if service is not False else None
     
     def _ensure_resend(self) -> Optional[Any]:
         """Get or initialize Resend email service.
@@ -40,13 +61,7 @@ class ActionExecutor:
         Returns:
             Resend service instance or None if initialization failed.
         """
-        if self._resend_service is None:
-            try:
-                self._resend_service = get_resend_service()
-            except Exception as exc:  # pragma: no cover - defensive guard
-                logger.error("Failed to initialize Resend service: %s", exc)
-                self._resend_service = False
-        return self._resend_service if self._resend_service is not False else None
+        return self._ensure_service("_resend_service", lambda: get_resend_service(), "Resend")
     
     def _ensure_storage(self) -> Optional[Any]:
         """Get or initialize Supabase Storage service.
@@ -54,13 +69,7 @@ class ActionExecutor:
         Returns:
             Storage service instance or None if initialization failed.
         """
-        if self._storage_service is None:
-            try:
-                self._storage_service = get_storage_service()
-            except Exception as exc:  # pragma: no cover - defensive guard
-                logger.error("Failed to initialize Storage service: %s", exc)
-                self._storage_service = False
-        return self._storage_service if self._storage_service is not False else None
+        return self._ensure_service("_storage_service", lambda: get_storage_service(), "Storage")
     
     def _ensure_twilio(self) -> Optional[Any]:
         """Get or initialize Twilio SMS service.
@@ -68,13 +77,7 @@ class ActionExecutor:
         Returns:
             Twilio service instance or None if initialization failed.
         """
-        if self._twilio_service is None:
-            try:
-                self._twilio_service = get_twilio_service()
-            except Exception as exc:  # pragma: no cover - defensive guard
-                logger.error("Failed to initialize Twilio service: %s", exc)
-                self._twilio_service = False
-        return self._twilio_service if self._twilio_service is not False else None
+        return self._ensure_service("_twilio_service", lambda: get_twilio_service(), "Twilio")
     
     def execute_send_resume(self, state: ConversationState, action: Dict[str, Any]) -> None:
         """Send resume email to recipient.
@@ -186,24 +189,64 @@ class ActionExecutor:
         if not state.pending_actions:
             return state
         
+        handlers = self._handlers()
         for action in state.pending_actions:
             action_type = action.get("type")
+            handler = handlers.get(action_type)
+            if handler is None:
+                continue
             
             try:
-                if action_type == "send_resume":
-                    self.execute_send_resume(state, action)
-                elif action_type == "notify_resume_sent":
-                    self.execute_notify_resume_sent(state, action)
-                elif action_type == "notify_contact_request":
-                    self.execute_notify_contact_request(state, action)
-                elif action_type == "send_linkedin":
-                    self.execute_send_linkedin(state, action)
+                handler(state, action)
             except Exception as exc:  # pragma: no cover - defensive guard
                 logger.error("Action %s failed: %s", action_type, exc)
         
         return state
 
 
+    async def execute_async(self, state: ConversationState) -> ConversationState:
+        """Execute pending actions concurrently (async flow variant of execute).
+        
+        Actions are independent network calls (Resend email, Twilio SMS,
+        storage signed URL), so each runs on the flow's thread pool at the
+        same time instead of one after another. Failures are logged per
+        action, as in execute.
+        
+        Args:
+            state: Conversation state with pending_actions list
+            
+        Returns:
+            Updated conversation state
+        """
+        if not state.pending_actions:
+            return state
+        
+        from src.flows.async_flow import run_in_thread
+        
+        handlers = self._handlers()
+        
+        async def run(action: Dict[str, Any]) -> None:
+            handler = handlers.get(action.get("type"))
+            if handler is None:
+                return
+            try:
+                await run_in_thread(handler, state, action)
+            except Exception as exc:  # pragma: no cover - defensive guard
+                logger.error("Action %s failed: %s", action.get("type"), exc)
+        
+        await asyncio.gather(*(run(action) for action in state.pending_actions))
+        return state
+    
+    def _handlers(self) -> Dict[str, Any]:
+        """Action type → handler(state, action)."""
+        return {
+            "send_resume": self.execute_send_resume,
+            "notify_resume_sent": self.execute_notify_resume_sent,
+            "notify_contact_request": self.execute_notify_contact_request,
+            "send_linkedin": self.execute_send_linkedin,
+        }
+
+
 # Global executor instance (reused across requests for service caching)
 _action_executor = ActionExecutor()
 
@@ -220,3 +263,17 @@ def execute_actions(state: ConversationState) -> ConversationState:
         Updated conversation state after executing actions
     """
     return _action_executor.execute(state)
+
+
+async def execute_actions_async(state: ConversationState) -> ConversationState:
+    """Async counterpart of execute_actions (actions run concurrently).
+    
+    Used by the async conversation flow (src/flows/async_flow.py).
+    
+    Args:
+        state: Conversation state with pending actions
+        
+    Returns:
+        Updated conversation state after executing actions
+    """
+    return await _action_executor.execute_async(state)
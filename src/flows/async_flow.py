@@ -0,0 +1,172 @@
+"""Asyncio runner for conversation nodes declared as a dependency graph.
+
+run_conversation_flow executes nodes strictly in sequence, so independent
+network calls (Supabase analytics insert, Resend/Twilio notifications,
+code/analytics fetches in apply_role_context) add up. Here each node names
+the nodes it depends on and starts as soon as those have finished:
+
+    greeting → classify → retrieve → generate → plan ─┬→ apply_role_context → log_and_notify
+                                                      └→ execute_actions
+
+End-to-end latency approaches the longest dependency chain instead of the
+sum of all calls.
+
+Node signatures:
+    - async nodes: `async def node(state) -> state`
+    - existing sync nodes: wrapped with sync_node(), which runs them on a
+      shared thread pool so blocking SDK calls don't stall the event loop
+
+Nodes mutate the shared ConversationState in place (as every existing node
+does); nodes that run concurrently must touch disjoint fields.
+
+Profiling:
+    Each node runs inside node_span(name), and sync nodes run with the
+    caller's contextvars, so a profile_pipeline() around the graph records
+    per-node durations and sub-spans from every thread.
+
+Deadline:
+    The whole graph runs under one request deadline (FLOW_DEADLINE_SECONDS,
+    default 25s, inside Vercel's 30s maxDuration). If a required node has not
+    finished by then, FlowDeadlineExceeded is raised. Optional nodes (side
+    effects like notifications and logging) still running at the deadline are
+    not waited for: the answer is returned on time, and sync nodes finish on
+    the thread pool in the background.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from src.flows.conversation_state import ConversationState
+from src.observability.profiling import node_span
+
+logger = logging.getLogger(__name__)
+
+AsyncNode = Callable[[ConversationState], Awaitable[Any]]
+
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("FLOW_DEADLINE_SECONDS", "25"))
+
+# Dedicated pool (not the loop's default executor): asyncio.run() joins the
+# default executor on exit, which would make a deadline wait for stragglers.
+_NODE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FLOW_IO_WORKERS", "8")),
+    thread_name_prefix="flow-node",
+)
+
+
+class FlowDeadlineExceeded(TimeoutError):
+    """A required node did not finish before the request deadline."""
+
+
+@dataclass(frozen=True)
+class FlowNode:
+    """One step of the graph.
+
+    Attributes:
+        name: Unique node name (referenced by other nodes' `after`)
+        run: Async callable taking the shared state
+        after: Names of nodes that must finish before this one starts
+        required: False for side effects the response does not wait for
+            at the deadline (failures are logged, not raised)
+    """
+    name: str
+    run: AsyncNode
+    after: Tuple[str, ...] = ()
+    required: bool = True
+
+
+def sync_node(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> AsyncNode:
+    """Adapt a sync node `fn(state, *args, **kwargs)` to the async signature."""
+    async def run(state: ConversationState) -> Any:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()  # keeps the request's profile visible in the thread
+        return await loop.run_in_executor(_NODE_EXECUTOR, context.run, functools.partial(fn, state, *args, **kwargs))
+    run.__name__ = getattr(fn, "__name__", "sync_node")
+    return run
+
+
+async def run_in_thread(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking call on the flow's thread pool (for async nodes)."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_NODE_EXECUTOR, context.run, functools.partial(fn, *args))
+
+
+def _validate(nodes: Sequence[FlowNode]) -> None:
+    seen = set()
+    for node in nodes:
+        if node.name in seen:
+            raise ValueError(f"Duplicate flow node: {node.name}")
+        missing = [dep for dep in node.after if dep not in seen]
+        if missing:
+            raise ValueError(f"Flow node {node.name} depends on {missing}, which must be declared before it")
+        seen.add(node.name)
+
+
+async def run_flow_graph(
+    state: ConversationState,
+    nodes: Sequence[FlowNode],
+    deadline_s: Optional[float] = None,
+) -> ConversationState:
+    """Run `nodes` (in dependency order) concurrently where the graph allows.
+
+    Args:
+        state: Shared conversation state, mutated by the nodes
+        nodes: Graph nodes; dependencies must be declared before dependents
+        deadline_s: Request deadline in seconds (default FLOW_DEADLINE_SECONDS)
+
+    Returns:
+        The state once all required nodes have finished
+
+    Raises:
+        FlowDeadlineExceeded: A required node was still running at the deadline
+        Exception: Whatever a required node (or one it depends on) raised
+    """
+    _validate(nodes)
+    deadline_s = DEFAULT_DEADLINE_SECONDS if deadline_s is None else deadline_s
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(node: FlowNode) -> None:
+        if node.after:
+            await asyncio.gather(*(tasks[dep] for dep in node.after))
+        started = time.perf_counter()
+        with node_span(node.name):
+            await node.run(state)
+        logger.debug(f"Flow node {node.name} finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    for node in nodes:
+        tasks[node.name] = asyncio.ensure_future(run(node))
+
+    required = [tasks[node.name] for node in nodes if node.required]
+    optional = {tasks[node.name]: node.name for node in nodes if not node.required}
+    pending = set()
+    if required:
+        _, pending = await asyncio.wait(required, timeout=deadline_s)
+    if pending:
+        for task in tasks.values():
+            task.cancel()
+        names = [node.name for node in nodes if tasks[node.name] in pending]
+        raise FlowDeadlineExceeded(f"Flow deadline of {deadline_s}s exceeded waiting for {names}")
+    for task in required:
+        task.result()  # re-raise the first required failure
+
+    # Side effects get whatever time is left of the deadline
+    if optional:
+        remaining = max(0.0, deadline_s - (loop.time() - started_at))
+        done, pending = await asyncio.wait(list(optional), timeout=remaining)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Flow node {optional[task]} failed: {task.exception()}")
+        if pending:
+            logger.warning(f"Flow deadline reached; not waiting for {sorted(optional[task] for task in pending)}")
+    return state
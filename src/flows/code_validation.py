@@ -9,6 +9,7 @@ where the retrieval system returns something that looks like code but isn't.
 """
 
 import re
+from typing import Iterable, Iterator
 
 
 CODE_VALIDATION_KEYWORDS = [
@@ -109,3 +110,63 @@ def sanitize_generated_answer(answer: str) -> str:
         return ""
 
     return "\n".join(sanitized_lines).lstrip()
+
+
+SANITIZE_PREFIX_BRACKETS = frozenset("{}()[]")
+SANITIZE_PREFIX_WORDS = ("select.", "from.")
+
+
+def _could_become_artifact(partial: str) -> bool:
+    """True if an unfinished (stripped) line could still match SANITIZE_PREFIX_PATTERNS."""
+    if set(partial) <= SANITIZE_PREFIX_BRACKETS:
+        return True
+    lowered = partial.lower()
+    return any(word.startswith(lowered) for word in SANITIZE_PREFIX_WORDS)
+
+
+def sanitize_answer_stream(deltas: Iterable[str]) -> Iterator[str]:
+    """Streaming counterpart of sanitize_generated_answer.
+    
+    Artifact patterns are matched per line, but text is only held back while
+    the unfinished first content line could still become an artifact (only
+    braces so far, or a prefix of "SELECT"/"FROM"). Ordinary answers are
+    released on their first delta; from then on deltas pass through
+    unchanged. The final answer should still be computed with
+    sanitize_generated_answer on the full text (it also drops the trailing
+    newline and normalizes line endings).
+    
+    Args:
+        deltas: Streamed LLM text chunks
+        
+    Yields:
+        Sanitized text chunks
+    """
+    head = ""
+    deltas = iter(deltas)
+    for delta in deltas:
+        head += delta
+        lines = head.splitlines(keepends=True)
+        start = None
+        for index, line in enumerate(lines):
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if line.splitlines()[0] != line:
+                # Complete line: drop it if it is an artifact
+                if any(pattern.match(stripped) for pattern in SANITIZE_PREFIX_PATTERNS):
+                    continue
+            elif _could_become_artifact(stripped):
+                break  # unfinished line might still match a pattern; wait for more
+            start = index
+            break
+        if start is None:
+            continue
+        yield "".join(lines[start:]).lstrip()
+        break
+    else:
+        cleaned = sanitize_generated_answer(head)
+        if cleaned:
+            yield cleaned
+        return
+
+    yield from deltas
@@ -3,14 +3,18 @@
 from __future__ import annotations
 
 import time
-from typing import Callable
+from typing import Any, Callable, Iterator, List, Optional, Tuple
 
 from src.core.rag_engine import RagEngine
 from src.flows.conversation_state import ConversationState
+from src.flows.action_execution import execute_actions_async
+from src.flows.async_flow import FlowNode, run_flow_graph, sync_node
+from src.observability.profiling import current_profile, node_span, profile_pipeline
 from src.flows.conversation_nodes import (
     classify_query,
     retrieve_chunks,
     generate_answer,
+    generate_answer_stream,
     plan_actions,
     apply_role_context,
     execute_actions,
@@ -21,6 +25,38 @@ from src.flows.conversation_nodes import (
 
 Node = Callable[[ConversationState], ConversationState]
 
+# (kind, payload) emitted by stream_conversation_flow
+FlowEvent = Tuple[str, Any]
+
+
+def _bind(node: Callable[..., ConversationState], *args: Any) -> Node:
+    def run(state: ConversationState) -> ConversationState:
+        return node(state, *args)
+    run.__name__ = node.__name__
+    return run
+
+
+def _unless_greeting(node: Callable[..., ConversationState], *args: Any) -> Node:
+    def run(state: ConversationState) -> ConversationState:
+        return state if state.fetch("is_greeting") else node(state, *args)
+    run.__name__ = node.__name__
+    return run
+
+
+def _log_with_timings(state: ConversationState, session_id: str, started: float) -> ConversationState:
+    """log_and_notify with the request's node/span breakdown attached.
+    
+    The timings snapshot goes into analytics_metadata["timings"] (and from
+    there into the messages row); it covers everything finished so far.
+    """
+    profile = current_profile()
+    if profile is None:
+        latency_ms = int((time.time() - started) * 1000)
+    else:
+        state.update_analytics("timings", profile.snapshot())
+        latency_ms = profile.elapsed_ms()
+    return log_and_notify(state, session_id=session_id, latency_ms=latency_ms)
+
 
 def run_conversation_flow(
     state: ConversationState,
@@ -34,21 +70,126 @@ def run_conversation_flow(
     Flow: handle_greeting → classify → retrieve → generate → plan → apply → execute → log
     
     The greeting node short-circuits if user's first query is a simple "hello".
+    Every node runs in a node_span, so analytics_metadata["timings"] holds
+    per-node durations and sub-spans (embed, fetch, score, llm, ...).
     """
     pipeline = nodes or (
-        lambda s: handle_greeting(s, rag_engine),  # Check for first-turn greetings
+        _bind(handle_greeting, rag_engine),  # Check for first-turn greetings
         classify_query,
-        lambda s: retrieve_chunks(s, rag_engine) if not s.fetch("is_greeting") else s,
-        lambda s: generate_answer(s, rag_engine) if not s.fetch("is_greeting") else s,
+        _unless_greeting(retrieve_chunks, rag_engine),
+        _unless_greeting(generate_answer, rag_engine),
         plan_actions,
-        lambda s: apply_role_context(s, rag_engine),
+        _bind(apply_role_context, rag_engine),
         execute_actions,
     )
 
     start = time.time()
-    for node in pipeline:
-        state = node(state)
+    with profile_pipeline():
+        for node in pipeline:
+            with node_span(getattr(node, "__name__", type(node).__name__)):
+                state = node(state)
+        with node_span("log_and_notify"):
+            return _log_with_timings(state, session_id, start)
+
+
+def stream_conversation_flow(
+    state: ConversationState,
+    rag_engine: RagEngine,
+    *,
+    session_id: str,
+) -> Iterator[FlowEvent]:
+    """Generator variant of run_conversation_flow for streaming responses.
+    
+    Runs the same pipeline, but the answer is yielded while the LLM writes it:
+    
+        ("token", text)     answer deltas from generate_answer_stream
+        ("context", text)   role-context blocks apply_role_context appended
+        ("done", state)     final state, after execute_actions + log_and_notify
+    
+    The answer streamed by "token" events is state.answer before role context
+    is applied. If apply_role_context replaces it rather than appending (the
+    live analytics placeholder), no "context" event is sent and the final
+    state's answer is authoritative.
+    
+    The generate_answer timing includes the time spent sending tokens.
+    """
+    start = time.time()
+    with profile_pipeline():
+        with node_span("handle_greeting"):
+            state = handle_greeting(state, rag_engine)
+        with node_span("classify_query"):
+            state = classify_query(state)
+
+        if state.fetch("is_greeting"):
+            if state.answer:
+                yield ("token", state.answer)
+        else:
+            with node_span("retrieve_chunks"):
+                state = retrieve_chunks(state, rag_engine)
+            with node_span("generate_answer"):
+                for delta in generate_answer_stream(state, rag_engine):
+                    yield ("token", delta)
+
+        base_answer = state.answer or ""
+        with node_span("plan_actions"):
+            state = plan_actions(state)
+        with node_span("apply_role_context"):
+            state = apply_role_context(state, rag_engine)
+        answer = state.answer or ""
+        if len(answer) > len(base_answer) and answer.startswith(base_answer):
+            yield ("context", answer[len(base_answer):])
+
+        with node_span("execute_actions"):
+            state = execute_actions(state)
+        with node_span("log_and_notify"):
+            state = _log_with_timings(state, session_id, start)
+    yield ("done", state)
+
+
+def conversation_graph(rag_engine: RagEngine, *, session_id: str, started: float) -> List[FlowNode]:
+    """The conversation pipeline as a dependency graph for run_flow_graph.
+    
+    Same nodes as run_conversation_flow. After plan_actions, apply_role_context
+    (code/analytics/import lookups) and execute_actions (Resend, Twilio,
+    signed URLs; actions run concurrently) touch disjoint fields and run side
+    by side. The messages insert only needs the final answer, so it starts as
+    soon as apply_role_context is done, alongside execute_actions; its
+    timings cover the nodes finished by then. Side effects are optional: the
+    response does not wait for them past the deadline.
+    """
+    def log(state: ConversationState) -> ConversationState:
+        return _log_with_timings(state, session_id, started)
+
+    return [
+        FlowNode("handle_greeting", sync_node(handle_greeting, rag_engine)),
+        FlowNode("classify_query", sync_node(classify_query), after=("handle_greeting",)),
+        FlowNode("retrieve_chunks", sync_node(_unless_greeting(retrieve_chunks, rag_engine)), after=("classify_query",)),
+        FlowNode("generate_answer", sync_node(_unless_greeting(generate_answer, rag_engine)), after=("retrieve_chunks",)),
+        FlowNode("plan_actions", sync_node(plan_actions), after=("generate_answer",)),
+        FlowNode("apply_role_context", sync_node(apply_role_context, rag_engine), after=("plan_actions",)),
+        FlowNode("execute_actions", execute_actions_async, after=("plan_actions",), required=False),
+        FlowNode("log_and_notify", sync_node(log), after=("apply_role_context",), required=False),
+    ]
 
-    elapsed_ms = int((time.time() - start) * 1000)
-    state = log_and_notify(state, session_id=session_id, latency_ms=elapsed_ms)
-    return state
+
+async def run_conversation_flow_async(
+    state: ConversationState,
+    rag_engine: RagEngine,
+    *,
+    session_id: str,
+    deadline_s: Optional[float] = None,
+) -> ConversationState:
+    """Async variant of run_conversation_flow: independent nodes run concurrently.
+    
+    See src/flows/async_flow.py for the graph runner and deadline semantics.
+    Sync callers: asyncio.run(run_conversation_flow_async(...)).
+    
+    The returned analytics_metadata["timings"] is re-snapshotted once the
+    graph is done, so it also covers execute_actions and log_and_notify
+    (which may still have been running when the messages row was written).
+    """
+    nodes = conversation_graph(rag_engine, session_id=session_id, started=time.time())
+    with profile_pipeline() as profile:
+        state = await run_flow_graph(state, nodes, deadline_s=deadline_s)
+        state.update_analytics("timings", profile.snapshot())
+        return state
@@ -24,6 +24,7 @@ from src.flows.query_classification import classify_query
 from src.flows.core_nodes import (
     retrieve_chunks,
     generate_answer,
+    generate_answer_stream,
     apply_role_context,
     log_and_notify
 )
@@ -31,6 +32,7 @@ from src.flows.action_planning import plan_actions
 from src.flows.action_execution import execute_actions
 from src.flows.code_validation import (
     is_valid_code_snippet,
+    sanitize_answer_stream,
     sanitize_generated_answer
 )
 from src.flows.greetings import get_role_greeting, should_show_greeting, is_first_turn
@@ -61,6 +63,7 @@ __all__ = [
     "classify_query",
     "retrieve_chunks",
     "generate_answer",
+    "generate_answer_stream",
     "plan_actions",
     "apply_role_context",
     "execute_actions",
@@ -71,4 +74,5 @@ __all__ = [
     "should_show_greeting",
     "is_valid_code_snippet",
     "sanitize_generated_answer",
+    "sanitize_answer_stream",
 ]
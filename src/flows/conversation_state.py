@@ -10,6 +10,8 @@ class ConversationState:
     query: str
     chat_history: List[Dict[str, str]] = field(default_factory=list)
     retrieved_chunks: List[Dict[str, Any]] = field(default_factory=list)
+    # Embedding of `query` from retrieve_chunks, reused by later nodes
+    query_embedding: Optional[List[float]] = None
     answer: Optional[str] = None
     pending_actions: List[Dict[str, Any]] = field(default_factory=list)
     analytics_metadata: Dict[str, Any] = field(default_factory=dict)
@@ -3,6 +3,7 @@
 This module contains the essential conversation flow nodes:
 1. retrieve_chunks - Get relevant knowledge from the database
 2. generate_answer - Create LLM response with retrieved context  
+   (generate_answer_stream yields it token by token)
 3. apply_role_context - Add role-specific content (code, data, links)
 4. log_and_notify - Save analytics and trigger notifications
 
@@ -14,13 +15,21 @@ For the full flow, see: docs/context/SYSTEM_ARCHITECTURE_SUMMARY.md
 
 import logging
 import os
+from typing import Any, Dict, Iterator, List, Optional
 
 from src.flows.conversation_state import ConversationState
+from src.flows.query_classification import partitions_for_query_type
 from src.core.rag_engine import RagEngine
+from src.core.answer_cache import SemanticAnswerCache
+from src.core.prompt_budget import capture_prompt_report
 from src.analytics.supabase_analytics import supabase_analytics, UserInteractionData
 from src.flows import content_blocks
 from src.flows.data_reporting import render_full_data_report
-from src.flows.code_validation import is_valid_code_snippet, sanitize_generated_answer
+from src.flows.code_validation import (
+    is_valid_code_snippet,
+    sanitize_answer_stream,
+    sanitize_generated_answer,
+)
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -60,21 +69,34 @@ def retrieve_chunks(state: ConversationState, rag_engine: RagEngine, top_k: int
     If the query was expanded (vague query like "engineering"), we use the
     expanded version for better retrieval quality.
     
+    Queries classified as mma/career/technical are routed to their KB
+    partitions (see QUERY_TYPE_PARTITIONS), so only those chunks are scored.
+    The engine tops results up from the whole KB if a partition is thin.
+    
     Args:
         state: Current conversation state with the query
         rag_engine: RAG engine instance (handles embeddings + vector search)
         top_k: How many chunks to retrieve (default 4)
         
     Returns:
-        Updated state with retrieved_chunks, retrieval_matches, and retrieval_scores
+        Updated state with retrieved_chunks, retrieval_matches, retrieval_scores
+        and (when the original query was searched) query_embedding, which
+        the answer cache and code-snippet retrieval reuse
     """
     # Use expanded query if available (for vague queries like "engineering")
     query_for_retrieval = state.fetch("expanded_query", state.query)
     
-    results = rag_engine.retrieve(query_for_retrieval, top_k=top_k)
+    doc_ids = partitions_for_query_type(state.fetch("query_type"))
+    if doc_ids:
+        results = rag_engine.retrieve(query_for_retrieval, top_k=top_k, doc_ids=doc_ids)
+    else:
+        results = rag_engine.retrieve(query_for_retrieval, top_k=top_k)
     state.add_retrieved_chunks(results.get("chunks", []))
     state.stash("retrieval_matches", results.get("matches", []))
     state.stash("retrieval_scores", results.get("scores", []))
+    embedding = results.get("query_embedding")
+    if query_for_retrieval == state.query and isinstance(embedding, list) and embedding:
+        state.query_embedding = embedding
     
     # Log if we used expansion
     if state.fetch("vague_query_expanded", False):
@@ -83,22 +105,61 @@ def retrieve_chunks(state: ConversationState, rag_engine: RagEngine, top_k: int
     return state
 
 
-def generate_answer(state: ConversationState, rag_engine: RagEngine) -> ConversationState:
-    """Generate an assistant response using retrieved context.
+# Classification flags that change how the answer prompt is built; cached
+# answers are only reused when all of them match
+ANSWER_CACHE_FLAGS = (
+    "query_type",
+    "needs_longer_response",
+    "teaching_moment",
+    "code_display_requested",
+    "code_would_help",
+    "data_would_help",
+)
+
+
+_kb_version_missing_logged = False
+
+
+def _answer_cache_lookup(state: ConversationState, rag_engine: RagEngine):
+    """Return (cache, key, query_embedding, cached_answer) for this turn.
+
+    cache is None when the turn is not cacheable: caching disabled, prior
+    chat history (the answer depends on it), or an unknown KB version.
+    """
+    global _kb_version_missing_logged
+    cache = getattr(rag_engine, "answer_cache", None)
+    if not isinstance(cache, SemanticAnswerCache) or state.chat_history:
+        return None, None, None, None
+    kb_version = getattr(rag_engine, "kb_version", None)
+    if not isinstance(kb_version, str):
+        # e.g. PGVECTOR_SEARCH_MODE=rpc: no resident index, so no version to key on
+        if not _kb_version_missing_logged:
+            _kb_version_missing_logged = True
+            logger.info("Answer cache disabled: retriever reports no KB version (rpc search mode?)")
+        return None, None, None, None
+
+    try:
+        query_embedding = state.query_embedding or rag_engine.embed(state.query)
+    except Exception as e:
+        logger.warning(f"Answer cache skipped, embedding failed: {e}")
+        return None, None, None, None
+    if not query_embedding:
+        return None, None, None, None
+
+    flags = {name: state.fetch(name, False) for name in ANSWER_CACHE_FLAGS}
+    key = cache.make_key(state.role, flags, kb_version)
+    return cache, key, query_embedding, cache.get(key, query_embedding)
+
+
+def _plan_generation(state: ConversationState, rag_engine: RagEngine) -> Optional[Dict[str, Any]]:
+    """Handle the no-LLM special cases, or describe the generation to run.
     
-    This is where the LLM creates the actual answer to the user's question.
-    It uses the chunks we retrieved in the previous step as context.
+    Shared by generate_answer and generate_answer_stream.
     
-    Special cases:
-    - For data display requests, we skip LLM generation and fetch live analytics
-    - For vague queries with insufficient context, we provide a helpful fallback
-    
-    Args:
-        state: Current conversation state with query + retrieved chunks
-        rag_engine: RAG engine with response generator
-        
     Returns:
-        Updated state with generated answer
+        None if the answer was already set (data display placeholder, vague
+        or low-quality retrieval fallback, answer cache hit); otherwise
+        {"request": generator kwargs, "cache": (answer_cache, key, embedding)}
     """
     retrieved_chunks = state.retrieved_chunks or []
     
@@ -106,7 +167,7 @@ def generate_answer(state: ConversationState, rag_engine: RagEngine) -> Conversa
     # Just set a placeholder for now
     if state.fetch("data_display_requested", False):
         state.set_answer("Fetching live analytics data from Supabase...")
-        return state
+        return None
     
     # Check if we have sufficient context
     # If vague query was expanded but we still have no good matches, help the user
@@ -127,7 +188,7 @@ I'm here to help you understand Noah's capabilities and how generative AI applic
         state.set_answer(fallback_answer)
         state.stash("fallback_used", True)
         logger.info(f"Used fallback for vague query '{original_query}' with no matches")
-        return state
+        return None
     
     # Check for very low retrieval quality (all scores below threshold)
     retrieval_scores = state.fetch("retrieval_scores", [])
@@ -147,7 +208,15 @@ Or ask me to explain how I work - I love teaching about RAG, vector search, and
         state.set_answer(fallback_answer)
         state.stash("fallback_used", True)
         logger.info(f"Used fallback for low-quality retrieval (scores: {retrieval_scores})")
-        return state
+        return None
+    
+    # Semantic answer cache: skip generation for near-duplicate questions
+    answer_cache, cache_key, query_embedding, cached_answer = _answer_cache_lookup(state, rag_engine)
+    if cached_answer is not None:
+        state.set_answer(cached_answer)
+        state.stash("answer_cache_hit", True)
+        logger.info(f"Answer cache hit for '{state.query}'")
+        return None
     
     # Use the LLM to generate a response with retrieved context
     # Add display intelligence based on query classification
@@ -199,19 +268,104 @@ Or ask me to explain how I work - I love teaching about RAG, vector search, and
     # Build the instruction suffix
     instruction_suffix = " ".join(extra_instructions) if extra_instructions else None
     
-    answer = rag_engine.response_generator.generate_contextual_response(
-        query=state.query,
-        context=retrieved_chunks,
-        role=state.role,
-        chat_history=state.chat_history,
-        extra_instructions=instruction_suffix
-    )
-    
+    return {
+        "request": {
+            "query": state.query,
+            "context": retrieved_chunks,
+            "role": state.role,
+            "chat_history": state.chat_history,
+            "extra_instructions": instruction_suffix,
+        },
+        "cache": (answer_cache, cache_key, query_embedding),
+    }
+
+
+def _store_prompt_report(state: ConversationState, report: Dict[str, Any]) -> None:
+    # Token budget usage of the generated prompt (empty for generators
+    # that don't assemble prompts through prompt_budget, e.g. test fakes)
+    if report:
+        state.update_analytics("prompt_budget", dict(report))
+
+
+def _store_answer(state: ConversationState, plan: Dict[str, Any], answer: str) -> ConversationState:
     # Clean up any SQL artifacts that leaked from retrieval
-    state.set_answer(sanitize_generated_answer(answer))
+    answer = sanitize_generated_answer(answer)
+    state.set_answer(answer)
+    answer_cache, cache_key, query_embedding = plan["cache"]
+    if answer_cache is not None:
+        answer_cache.put(cache_key, state.query, query_embedding, answer)
     return state
 
 
+def generate_answer(state: ConversationState, rag_engine: RagEngine) -> ConversationState:
+    """Generate an assistant response using retrieved context.
+    
+    This is where the LLM creates the actual answer to the user's question.
+    It uses the chunks we retrieved in the previous step as context.
+    
+    Special cases:
+    - For data display requests, we skip LLM generation and fetch live analytics
+    - For vague queries with insufficient context, we provide a helpful fallback
+    - A near-identical earlier question (same role, classification flags and
+      KB version, no chat history) reuses its answer from rag_engine.answer_cache
+
+    The prompt is fitted to the generator's token budget; its usage (tokens
+    per section, chunks trimmed/dropped) lands in
+    analytics_metadata["prompt_budget"] (and messages.tokens_prompt when
+    counted with tiktoken, see log_and_notify).
+
+    Args:
+        state: Current conversation state with query + retrieved chunks
+        rag_engine: RAG engine with response generator
+
+    Returns:
+        Updated state with generated answer
+    """
+    plan = _plan_generation(state, rag_engine)
+    if plan is None:
+        return state
+    
+    with capture_prompt_report() as report:
+        answer = rag_engine.response_generator.generate_contextual_response(**plan["request"])
+    _store_prompt_report(state, report)
+    return _store_answer(state, plan, answer)
+
+
+def generate_answer_stream(state: ConversationState, rag_engine: RagEngine) -> Iterator[str]:
+    """Streaming variant of generate_answer: yields answer text as it is generated.
+    
+    Same special cases as generate_answer (those answers are yielded in one
+    piece). When the generator is exhausted, state.answer holds the complete
+    sanitized answer, exactly as generate_answer would have set it.
+    
+    Args:
+        state: Current conversation state with query + retrieved chunks
+        rag_engine: RAG engine with response generator
+        
+    Yields:
+        Answer text deltas
+    """
+    plan = _plan_generation(state, rag_engine)
+    if plan is None:
+        if state.answer:
+            yield state.answer
+        return
+    
+    raw: List[str] = []
+    
+    def collect(deltas: Iterator[str]) -> Iterator[str]:
+        for delta in deltas:
+            raw.append(delta)
+            yield delta
+    
+    generator = rag_engine.response_generator
+    with capture_prompt_report() as report:
+        deltas = generator.stream_contextual_response(**plan["request"])
+    _store_prompt_report(state, report)
+    yield from sanitize_answer_stream(collect(deltas))
+    _store_answer(state, plan, "".join(raw))
+
+
 def apply_role_context(state: ConversationState, rag_engine: RagEngine) -> ConversationState:
     """Add role-specific content blocks to the answer.
     
@@ -345,14 +499,22 @@ def apply_role_context(state: ConversationState, rag_engine: RagEngine) -> Conve
         state.stash("offer_sent", True)
 
     if "send_resume" in actions:
-        resume_link = state.fetch("resume_signed_url", RESUME_DOWNLOAD_URL)
-        components.append(f"\n\nDownload Noah's resume: {resume_link}")
+        # Always the public link: the signed URL is created by execute_actions
+        # for the email, which may still be running (async flow)
+        components.append(f"\n\nDownload Noah's resume: {RESUME_DOWNLOAD_URL}")
         state.stash("offer_sent", True)
 
     # Code snippets (for developers and technical hiring managers)
     if "include_code_snippets" in actions or "display_code_snippet" in actions:
         try:
-            results = rag_engine.retrieve_with_code(state.query, role=state.role)
+            # Rerank the chunks retrieve_chunks already found instead of
+            # embedding the query and searching the KB a second time
+            results = rag_engine.retrieve_with_code(
+                state.query,
+                role=state.role,
+                query_embedding=state.query_embedding,
+                candidates=state.retrieved_chunks,
+            )
             snippets = results.get("code_snippets", []) if results else []
         except Exception as e:
             logger.warning(f"Code retrieval failed: {e}")
@@ -458,6 +620,18 @@ def apply_role_context(state: ConversationState, rag_engine: RagEngine) -> Conve
     return state
 
 
+def _counted_prompt_tokens(state: ConversationState) -> Optional[int]:
+    """Prompt tokens for messages.tokens_prompt, if they are exact.
+
+    tokens_prompt tracks OpenAI usage for cost, so the chars/token estimate
+    (the default counter) stays in analytics_metadata["prompt_budget"] only.
+    """
+    report = state.analytics_metadata.get("prompt_budget", {})
+    if str(report.get("tokenizer", "")).startswith("tiktoken:"):
+        return report.get("total")
+    return None
+
+
 def log_and_notify(
     state: ConversationState,
     session_id: str,
@@ -486,7 +660,9 @@ def log_and_notify(
             answer=state.answer or "",
             query_type=state.fetch("query_type", "general"),
             latency_ms=latency_ms,
-            success=success
+            success=success,
+            tokens_prompt=_counted_prompt_tokens(state),
+            timings=state.analytics_metadata.get("timings")
         )
         message_id = supabase_analytics.log_interaction(interaction)
         state.update_analytics("message_id", message_id)
@@ -0,0 +1,127 @@
+"""Multi-pattern keyword matcher (Aho-Corasick automaton).
+
+classify_query used to test ~150 phrases with a dozen separate
+`any(keyword in lowered for keyword in ...)` scans per query. KeywordMatcher
+compiles every vocabulary into one automaton at import time; a single pass
+over the query returns every category with at least one phrase in it.
+
+Semantics:
+- Plain phrases match as substrings, exactly like `keyword in text`
+  ("vs" matches "cvs", "node" matches "nodes")
+- Phrases listed under `word_bounded` must match as whole words
+  (`\\b...\\b`). The automaton finds them as substrings; only when one is
+  present is a precompiled boundary regex run to confirm it.
+
+Why a full DFA instead of the textbook goto/fail walk:
+- Failure transitions are folded into each state's transition table at
+  build time, so the scan is one dict lookup per character
+- Each state carries a category bitmask (its own phrases plus everything
+  reachable through failure links), so overlapping phrases across
+  categories ("how does" vs "how does it") are all reported
+
+Why not one alternation regex:
+- Python's `re` tries alternatives one by one at each position; reporting
+  overlapping matches needs a lookahead at every position, which
+  benchmarked ~100x slower than this automaton for our vocabulary
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+
+class KeywordMatcher:
+    """Match named phrase lists against text in one pass.
+
+    Example:
+        matcher = KeywordMatcher({"career": ["resume", "cv"], "mma": ["fight"]})
+        matcher.match("can i see the resume?")  # frozenset({"career"})
+    """
+
+    def __init__(
+        self,
+        vocabulary: Mapping[str, Iterable[str]],
+        word_bounded: Optional[Mapping[str, Iterable[str]]] = None,
+    ):
+        """Compile the vocabularies.
+
+        Args:
+            vocabulary: category → phrases matched as substrings
+            word_bounded: category → phrases matched as whole words only
+        """
+        self.categories: List[str] = list(dict.fromkeys([*vocabulary, *(word_bounded or {})]))
+        bit = {category: 1 << i for i, category in enumerate(self.categories)}
+
+        # Phrase → bitmask. Word-bounded phrases get a "candidate" bit that
+        # is confirmed with a regex after the scan.
+        phrase_masks: Dict[str, int] = {}
+        for category, phrases in vocabulary.items():
+            for phrase in phrases:
+                phrase_masks[phrase.lower()] = phrase_masks.get(phrase.lower(), 0) | bit[category]
+
+        self._bounded: List[tuple] = []  # (candidate bit, category bit, regex)
+        for category, phrases in (word_bounded or {}).items():
+            phrases = [phrase.lower() for phrase in phrases]
+            candidate = 1 << (len(self.categories) + len(self._bounded))
+            pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, phrases)) + r")\b")
+            self._bounded.append((candidate, bit[category], pattern))
+            for phrase in phrases:
+                phrase_masks[phrase] = phrase_masks.get(phrase, 0) | candidate
+        self._category_mask = (1 << len(self.categories)) - 1
+
+        self._delta, self._masks = self._compile(phrase_masks)
+        self._cache: Dict[int, FrozenSet[str]] = {}
+
+    @staticmethod
+    def _compile(phrase_masks: Mapping[str, int]):
+        """Build the trie, then fold failure links into a full DFA."""
+        goto: List[Dict[str, int]] = [{}]
+        masks: List[int] = [0]
+        for phrase, mask in phrase_masks.items():
+            state = 0
+            for char in phrase:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    goto.append({})
+                    masks.append(0)
+                    nxt = goto[state][char] = len(goto) - 1
+                state = nxt
+            masks[state] |= mask
+
+        # Breadth-first: a state's failure target is always finished first
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            masks[state] |= masks[fail[state]]
+            # Missing transitions follow the failure state's (already complete) row
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for char, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(char, 0)
+                queue.append(child)
+        return delta, masks
+
+    def mask(self, text: str) -> int:
+        """Category bitmask for `text` (bit i = self.categories[i])."""
+        delta, masks = self._delta, self._masks
+        state = found = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            found |= masks[state]
+        for candidate, category_bit, pattern in self._bounded:
+            if found & candidate and pattern.search(text):
+                found |= category_bit
+        return found & self._category_mask
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Names of every category with a phrase in `text` (already lowercased)."""
+        found = self.mask(text)
+        hits = self._cache.get(found)
+        if hits is None:
+            hits = self._cache[found] = frozenset(
+                category for i, category in enumerate(self.categories) if found >> i & 1
+            )
+        return hits
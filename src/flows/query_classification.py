@@ -10,13 +10,27 @@ Types we detect:
 - MMA queries (Noah's fight history)
 - Fun queries (hobbies, fun facts)
 
+Partition routing:
+- QUERY_TYPE_PARTITIONS maps query types to the KB partitions (doc_ids)
+  retrieve_chunks searches first
+
+Keyword matching:
+- Every keyword list is compiled at import time into one KeywordMatcher
+  (Aho-Corasick automaton); classify_query scans the query once and gets
+  all matching vocabularies back, instead of one any(...) scan per list
+
 Vague query expansion:
 - Detects single-word or very short queries that need context enrichment
 - Expands them into fuller questions to improve retrieval quality
 """
 
+import logging
 import re
+
 from src.flows.conversation_state import ConversationState
+from src.flows.keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
 
 
 # Vague query expansion mappings
@@ -42,6 +56,23 @@ VAGUE_QUERY_EXPANSIONS = {
 }
 
 
+# Knowledge base partitions (kb_chunks.doc_id) searched first for each query
+# type. Types not listed (general, fun, data, mma) search the whole KB.
+# Only route to doc_ids that scripts/migrate_all_kb_to_supabase.py ingests:
+# mma_kb and imports_kb are not in kb_chunks, so routing to them would search
+# an empty partition and always fall through to the whole-KB top-up.
+QUERY_TYPE_PARTITIONS = {
+    "career": ("career_kb",),
+    "technical": ("technical_kb", "architecture_kb"),
+}
+
+
+def partitions_for_query_type(query_type):
+    """Return the doc_ids to route a query type to, or None for the whole KB."""
+    partitions = QUERY_TYPE_PARTITIONS.get(query_type or "")
+    return list(partitions) if partitions else None
+
+
 DATA_DISPLAY_KEYWORDS = [
     "display data",
     "show data",
@@ -55,10 +86,110 @@ DATA_DISPLAY_KEYWORDS = [
     "can you display",
 ]
 
+# Queries that need a longer, teaching-focused response
+TEACHING_KEYWORDS = [
+    "why", "how does", "how did", "how do", "explain", "walk me through",
+    "what is", "what are", "what's the difference", "compare",
+    "help me understand", "break down", "teach me", "show me how",
+    "architecture", "design", "pattern", "principle", "strategy",
+    "trade-off", "tradeoff", "benefit", "advantage", "disadvantage",
+    "when to use", "when should", "best practice", "enterprise"
+]
+
+# Explicit requests to see code
+CODE_DISPLAY_KEYWORDS = [
+    "show code", "display code", "show me code", "show the code",
+    "show implementation", "display implementation",
+    "how do you", "how does it", "how is it",
+    "show me the", "show retrieval", "show api",
+    "code snippet", "code example", "source code"
+]
+
+# Topics where code clarifies the answer for technical roles, even without "show me"
+# Per PROJECT_REFERENCE_OVERVIEW: "proactively displays code snippets when they clarify concepts"
+PROACTIVE_CODE_TOPICS = [
+    # Implementation questions (even without "show me")
+    "implement", "build", "create", "develop", "write",
+    # Architecture/design questions that benefit from code
+    "rag pipeline", "vector search", "retrieval", "embedding", "orchestration",
+    "langgraph", "conversation flow", "node", "pipeline",
+    # Technical concepts best shown with code
+    "api route", "endpoint", "function", "class", "method",
+    "pgvector", "supabase query", "database", "migration",
+    "prompt engineering", "llm call", "generation",
+    # Patterns that need examples
+    "pattern", "approach", "technique", "strategy"
+]
+
+# Import/stack explanation triggers (why did you choose X?)
+IMPORT_KEYWORDS = [
+    "why use", "why choose", "why did you use", "why did you choose",
+    "what imports", "explain imports", "your imports", "dependencies",
+    "why supabase", "why openai", "why langchain", "why vercel",
+    "why pgvector", "why twilio", "why resend",
+    "justify", "trade-off", "alternative", "vs", "instead of",
+    "enterprise", "production", "scale", "library", "libraries"
+]
+
+# Specific library mentions (an import question when paired with a question word)
+LIBRARY_NAMES = [
+    "supabase", "openai", "pgvector", "langchain", "langgraph",
+    "vercel", "resend", "twilio", "langsmith", "streamlit"
+]
+QUESTION_WORDS = ["why", "what", "how", "explain"]
+
+# Whole words only ("bout" must not match "about")
+MMA_KEYWORDS = ["mma", "fight", "ufc", "bout", "cage"]
+FUN_KEYWORDS = ["fun fact", "hobby", "interesting fact", "hot dog"]
+
+# Questions about performance, usage, trends benefit from actual data
+PROACTIVE_DATA_TOPICS = [
+    # Performance/metrics questions
+    "how many", "how much", "how often", "frequency",
+    "performance", "metrics", "statistics", "stats",
+    "usage", "activity", "engagement", "interactions",
+    # Trend/pattern questions
+    "trend", "pattern", "over time", "growth",
+    "most common", "popular", "typical", "average",
+    # Comparison questions that need numbers
+    "compare", "difference between", "vs",
+    # Success/outcome questions
+    "success rate", "conversion", "effectiveness"
+]
+
+TECHNICAL_TERMS = ["code", "technical", "stack", "architecture", "implementation", "retrieval"]
+# "how does [product/system/chatbot] work" is technical too
+HOW_PHRASES = ["how does", "how did", "explain how"]
+SYSTEM_WORDS = ["product", "system", "chatbot", "assistant", "rag", "pipeline", "work", "built"]
+CAREER_TERMS = ["career", "resume", "cv", "experience", "achievement", "work"]
+
+TECHNICAL_ROLES = ("Software Developer", "Hiring Manager (technical)")
+
+# Every vocabulary above, compiled once into a single automaton
+QUERY_MATCHER = KeywordMatcher(
+    {
+        "data_display": DATA_DISPLAY_KEYWORDS,
+        "teaching": TEACHING_KEYWORDS,
+        "code_display": CODE_DISPLAY_KEYWORDS,
+        "proactive_code": PROACTIVE_CODE_TOPICS,
+        "import": IMPORT_KEYWORDS,
+        "library": LIBRARY_NAMES,
+        "question": QUESTION_WORDS,
+        "fun": FUN_KEYWORDS,
+        "proactive_data": PROACTIVE_DATA_TOPICS,
+        "technical": TECHNICAL_TERMS,
+        "how": HOW_PHRASES,
+        "system": SYSTEM_WORDS,
+        "career": CAREER_TERMS,
+    },
+    word_bounded={"mma": MMA_KEYWORDS},
+)
+DATA_DISPLAY_MATCHER = KeywordMatcher({"data_display": DATA_DISPLAY_KEYWORDS})
+
 
 def _is_data_display_request(lowered_query: str) -> bool:
     """Check if query requests data/analytics display."""
-    return any(keyword in lowered_query for keyword in DATA_DISPLAY_KEYWORDS)
+    return bool(DATA_DISPLAY_MATCHER.mask(lowered_query))
 
 
 def _expand_vague_query(query: str) -> str:
@@ -120,129 +251,55 @@ def classify_query(state: ConversationState) -> ConversationState:
         state.stash("expanded_query", expanded_query)
         state.stash("vague_query_expanded", True)
         # Log the expansion for debugging
-        import logging
-        logger = logging.getLogger(__name__)
         logger.info(f"Expanded vague query: '{original_query}' → '{expanded_query}'")
     
     lowered = state.query.lower()
+    # One pass over the query finds every vocabulary it touches
+    hits = QUERY_MATCHER.match(lowered)
     
     # Detect when a longer teaching-focused response is needed
     # These queries require depth, explanation, and educational context
-    teaching_keywords = [
-        "why", "how does", "how did", "how do", "explain", "walk me through",
-        "what is", "what are", "what's the difference", "compare",
-        "help me understand", "break down", "teach me", "show me how",
-        "architecture", "design", "pattern", "principle", "strategy",
-        "trade-off", "tradeoff", "benefit", "advantage", "disadvantage",
-        "when to use", "when should", "best practice", "enterprise"
-    ]
-    if any(keyword in lowered for keyword in teaching_keywords):
+    if "teaching" in hits:
         state.stash("needs_longer_response", True)
         state.stash("teaching_moment", True)
     
     # Code display triggers (explicit requests to see code)
-    code_display_keywords = [
-        "show code", "display code", "show me code", "show the code",
-        "show implementation", "display implementation",
-        "how do you", "how does it", "how is it",
-        "show me the", "show retrieval", "show api",
-        "code snippet", "code example", "source code"
-    ]
-    if any(keyword in lowered for keyword in code_display_keywords):
+    if "code_display" in hits:
         state.stash("code_display_requested", True)
         state.stash("query_type", "technical")
     
-    # PROACTIVE code detection - when code would clarify the answer for technical roles
-    # Per PROJECT_REFERENCE_OVERVIEW: "proactively displays code snippets when they clarify concepts"
+    # PROACTIVE code detection - only for technical roles
     # Per DATA_COLLECTION_AND_SCHEMA_REFERENCE: "If user is technical and seems unsure → proactively show code"
-    proactive_code_topics = [
-        # Implementation questions (even without "show me")
-        "implement", "build", "create", "develop", "write",
-        # Architecture/design questions that benefit from code
-        "rag pipeline", "vector search", "retrieval", "embedding", "orchestration",
-        "langgraph", "conversation flow", "node", "pipeline",
-        # Technical concepts best shown with code
-        "api route", "endpoint", "function", "class", "method",
-        "pgvector", "supabase query", "database", "migration",
-        "prompt engineering", "llm call", "generation",
-        # Patterns that need examples
-        "pattern", "approach", "technique", "strategy" 
-    ]
-    
-    # Only proactively show code for technical roles
-    if state.role in ["Software Developer", "Hiring Manager (technical)"]:
-        if any(topic in lowered for topic in proactive_code_topics):
-            state.stash("code_would_help", True)
-            state.stash("query_type", "technical")
-            # Log for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Proactive code detection: query '{state.query}' would benefit from code examples")
+    if state.role in TECHNICAL_ROLES and "proactive_code" in hits:
+        state.stash("code_would_help", True)
+        state.stash("query_type", "technical")
+        logger.info(f"Proactive code detection: query '{state.query}' would benefit from code examples")
     
     # Import/stack explanation triggers (why did you choose X?)
-    import_keywords = [
-        "why use", "why choose", "why did you use", "why did you choose",
-        "what imports", "explain imports", "your imports", "dependencies",
-        "why supabase", "why openai", "why langchain", "why vercel",
-        "why pgvector", "why twilio", "why resend",
-        "justify", "trade-off", "alternative", "vs", "instead of",
-        "enterprise", "production", "scale", "library", "libraries"
-    ]
-    
-    # Specific library mentions
-    library_names = [
-        "supabase", "openai", "pgvector", "langchain", "langgraph", 
-        "vercel", "resend", "twilio", "langsmith", "streamlit"
-    ]
-    
-    if any(keyword in lowered for keyword in import_keywords):
-        state.stash("import_explanation_requested", True)
-        state.stash("query_type", "technical")
-    elif any(lib in lowered for lib in library_names) and any(word in lowered for word in ["why", "what", "how", "explain"]):
+    if "import" in hits or ("library" in hits and "question" in hits):
         state.stash("import_explanation_requested", True)
         state.stash("query_type", "technical")
     
     # Query type classification
-    if any(re.search(r"\\b" + k + r"\\b", lowered) for k in ["mma", "fight", "ufc", "bout", "cage"]):
+    if "mma" in hits:
         state.stash("query_type", "mma")
-    elif any(term in lowered for term in ["fun fact", "hobby", "interesting fact", "hot dog"]):
+    elif "fun" in hits:
         state.stash("query_type", "fun")
-    elif _is_data_display_request(lowered):
+    elif "data_display" in hits:
         state.stash("data_display_requested", True)
         state.stash("query_type", "data")
-    else:
+    elif "proactive_data" in hits:
         # PROACTIVE data detection - when analytics/metrics would clarify the answer
-        # Questions about performance, usage, trends benefit from actual data
-        proactive_data_topics = [
-            # Performance/metrics questions
-            "how many", "how much", "how often", "frequency",
-            "performance", "metrics", "statistics", "stats",
-            "usage", "activity", "engagement", "interactions",
-            # Trend/pattern questions
-            "trend", "pattern", "over time", "growth",
-            "most common", "popular", "typical", "average",
-            # Comparison questions that need numbers
-            "compare", "difference between", "vs",
-            # Success/outcome questions
-            "success rate", "conversion", "effectiveness"
-        ]
-        
-        if any(topic in lowered for topic in proactive_data_topics):
-            state.stash("data_would_help", True)
-            state.stash("query_type", "data")
-            # Log for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Proactive data detection: query '{state.query}' would benefit from analytics")
+        state.stash("data_would_help", True)
+        state.stash("query_type", "data")
+        logger.info(f"Proactive data detection: query '{state.query}' would benefit from analytics")
     
     # Detect "how does [product/system/chatbot] work" queries as technical
-    if any(term in lowered for term in ["code", "technical", "stack", "architecture", "implementation", "retrieval"]) \
-         or (("how does" in lowered or "how did" in lowered or "explain how" in lowered) 
-             and any(word in lowered for word in ["product", "system", "chatbot", "assistant", "rag", "pipeline", "work", "built"])):
+    if "technical" in hits or ("how" in hits and "system" in hits):
         # Override if not already set
         if not state.fetch("query_type"):
             state.stash("query_type", "technical")
-    elif any(term in lowered for term in ["career", "resume", "cv", "experience", "achievement", "work"]):
+    elif "career" in hits:
         if not state.fetch("query_type"):
             state.stash("query_type", "career")
     elif not state.fetch("query_type"):
@@ -61,6 +61,13 @@ from .evaluators import (
     evaluate_response
 )
 
+from .profiling import (
+    profile_pipeline,
+    span,
+    node_span,
+    latency_summary
+)
+
 __all__ = [
     # Tracing
     'trace_rag_call',
@@ -81,4 +88,10 @@ __all__ = [
     'evaluate_relevance',
     'evaluate_answer_quality',
     'evaluate_response',
+    
+    # Profiling
+    'profile_pipeline',
+    'span',
+    'node_span',
+    'latency_summary',
 ]
@@ -0,0 +1,225 @@
+"""Per-request pipeline profiling: node durations, sub-spans and histograms.
+
+run_conversation_flow used to record a single elapsed_ms, which says a
+request was slow but not whether classification, embedding, pgvector,
+the LLM, role-context enrichment or action execution was the slow part.
+
+Usage:
+    with profile_pipeline() as profile:          # one per request (flow runners)
+        with node_span("retrieve_chunks"):        # each conversation node
+            with span("embed"):                   # sub-steps, anywhere below
+                ...
+        state.update_analytics("timings", profile.snapshot())
+
+    latency_summary()  # {"total": {"count", "p50_ms", "p95_ms", ...}, "node.retrieve_chunks": ...}
+
+Design notes:
+- Clock: time.perf_counter_ns (monotonic, ns resolution, no float drift)
+- The active profile lives in a ContextVar, so span() calls deep inside
+  the retriever or response generator need no extra arguments. async_flow
+  runs sync nodes with the caller's context, so threads record into the
+  same profile. Outside a profile, span() is a near no-op.
+- Spans with the same name accumulate (two embed calls → summed ms and a
+  count), which is what matters for finding where the time goes
+- Finished profiles feed process-wide LatencyHistograms (fixed log-spaced
+  buckets, O(1) per observation, bounded memory) for p50/p95/p99 summaries
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+# Bucket upper bounds in ms (the last bucket is open-ended)
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000,
+                    3000, 5000, 7500, 10000, 15000, 20000, 30000)
+
+
+def _ms(duration_ns: int) -> float:
+    return round(duration_ns / 1_000_000, 2)
+
+
+class PipelineProfile:
+    """Durations recorded during one request.
+
+    Attributes:
+        nodes: node name → ns spent in that conversation node
+        spans: span name → [total ns, calls] for sub-steps (embed, fetch, llm, ...)
+    """
+
+    def __init__(self):
+        self.started_ns = time.perf_counter_ns()
+        self.nodes: Dict[str, int] = {}
+        self.spans: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()  # concurrent nodes record from several threads
+
+    def record_node(self, name: str, duration_ns: int) -> None:
+        with self._lock:
+            self.nodes[name] = self.nodes.get(name, 0) + duration_ns
+
+    def record_span(self, name: str, duration_ns: int) -> None:
+        with self._lock:
+            entry = self.spans.setdefault(name, [0, 0])
+            entry[0] += duration_ns
+            entry[1] += 1
+
+    def elapsed_ms(self) -> int:
+        """Whole milliseconds since the profile started."""
+        return (time.perf_counter_ns() - self.started_ns) // 1_000_000
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-ready breakdown (persisted to messages.timings).
+
+        Returns:
+            {"total_ms": 1834.2,
+             "nodes": {"classify_query": 0.4, "retrieve_chunks": 212.7, ...},
+             "spans": {"embed": {"ms": 180.1, "count": 1}, "llm": {...}, ...}}
+        """
+        with self._lock:
+            return {
+                "total_ms": _ms(time.perf_counter_ns() - self.started_ns),
+                "nodes": {name: _ms(ns) for name, ns in self.nodes.items()},
+                "spans": {name: {"ms": _ms(ns), "count": count} for name, (ns, count) in self.spans.items()},
+            }
+
+
+_current_profile: ContextVar[Optional[PipelineProfile]] = ContextVar("pipeline_profile", default=None)
+
+
+def current_profile() -> Optional[PipelineProfile]:
+    """The profile of the request being handled on this context, if any."""
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_pipeline() -> Iterator[PipelineProfile]:
+    """Profile one request; on exit its durations go into the histograms."""
+    profile = PipelineProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        get_latency_histograms().observe_profile(profile)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a sub-step (embed, fetch, score, llm, ...) of the current request."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profile.record_span(name, time.perf_counter_ns() - started)
+
+
+@contextmanager
+def node_span(name: str) -> Iterator[None]:
+    """Time one conversation node of the current request."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profile.record_node(name, time.perf_counter_ns() - started)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (ms) with percentile estimates.
+
+    Percentiles are interpolated inside the bucket that contains them, so
+    they are accurate to the bucket width (e.g. 200-300ms) — plenty for
+    spotting which stage dominates p95, at constant memory per series.
+    """
+
+    def __init__(self, bounds_ms=BUCKET_BOUNDS_MS):
+        self.bounds = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max_ms
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return round(min(estimate, self.max_ms), 2)
+            seen += bucket_count
+        return round(self.max_ms, 2)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class LatencyHistograms:
+    """Process-wide histograms keyed by series ("total", "node.<name>", "span.<name>")."""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, series: str, value_ms: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(series)
+            if histogram is None:
+                histogram = self._histograms[series] = LatencyHistogram()
+            histogram.observe(value_ms)
+
+    def observe_profile(self, profile: PipelineProfile) -> None:
+        timings = profile.snapshot()
+        self.observe("total", timings["total_ms"])
+        for name, ms in timings["nodes"].items():
+            self.observe(f"node.{name}", ms)
+        for name, entry in timings["spans"].items():
+            self.observe(f"span.{name}", entry["ms"])
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {series: histogram.summary() for series, histogram in sorted(self._histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+_latency_histograms = LatencyHistograms()
+
+
+def get_latency_histograms() -> LatencyHistograms:
+    """Process-wide pipeline latency histograms."""
+    return _latency_histograms
+
+
+def latency_summary() -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99/max per series for requests handled by this process."""
+    return _latency_histograms.summary()
@@ -0,0 +1,374 @@
+"""Approximate nearest-neighbour indexes for VectorStore.
+
+Backends (chosen by create_ann_index / ANN_BACKEND):
+- **faiss** (`FaissHNSWIndex`): HNSW graph from faiss, used automatically
+  when faiss is installed
+- **ivf** (`IVFIndex`): pure-NumPy inverted file index with k-means coarse
+  quantization, so local development and tests get sub-linear search
+  without native dependencies
+- **flat**: `IVFIndex` that never trains, i.e. exact vectorized search
+
+All backends speak the subset of the faiss index API VectorStore uses:
+`add(x)`, `search(x, k) -> (distances, labels)`, `reset()`, `ntotal`,
+plus `save(path)` / `load(path)` for persistence under vector_stores/.
+Distances are squared L2, like faiss.IndexFlatL2. Missing results are
+padded with label -1 and distance FLOAT32_MAX, also like faiss.
+
+How IVF works:
+    train: k-means over the vectors → `nlist` centroids
+    add:   each vector joins the inverted list of its nearest centroid
+    search: score the query against the centroids, then scan only the
+            `nprobe` closest lists exactly
+
+Recall/latency knobs:
+- nprobe (IVF): lists scanned per query. Higher = better recall, slower.
+  nprobe == nlist is exact search. Env: ANN_NPROBE (default 8)
+- ef_search (HNSW): candidate queue size. Env: ANN_EF_SEARCH (default 64)
+- nlist (IVF): lists created at training (default ≈ sqrt(N))
+"""
+
+import json
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import faiss  # type: ignore
+    FAISS_AVAILABLE = True
+except Exception:
+    faiss = None
+    FAISS_AVAILABLE = False
+
+ANN_BACKENDS = ("auto", "faiss", "ivf", "flat")
+DEFAULT_ANN_BACKEND = os.getenv("ANN_BACKEND", "auto").strip().lower()
+DEFAULT_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+DEFAULT_EF_SEARCH = int(os.getenv("ANN_EF_SEARCH", "64"))
+
+# IVF trains its coarse quantizer once this many vectors exist; below that
+# an exact scan is both faster and perfectly accurate
+DEFAULT_TRAIN_THRESHOLD = 1024
+
+# Retrain when the index has grown this much since the last training, so
+# lists stay balanced under incremental inserts
+RETRAIN_GROWTH = 4.0
+
+KMEANS_ITERATIONS = 10
+KMEANS_MAX_TRAIN_POINTS_PER_LIST = 256
+
+FLOAT32_MAX = np.finfo(np.float32).max
+
+
+def _squared_l2(queries: np.ndarray, vectors: np.ndarray, vector_norms: np.ndarray) -> np.ndarray:
+    """Squared L2 distances [Q, N] via ||q||² - 2 q·v + ||v||²."""
+    query_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+    distances = query_norms - 2.0 * (queries @ vectors.T) + vector_norms[None, :]
+    np.maximum(distances, 0.0, out=distances)
+    return distances
+
+
+def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k smallest distances in a 1-D array, ascending."""
+    n = distances.shape[0]
+    if k < n:
+        part = np.argpartition(distances, k - 1)[:k]
+    else:
+        part = np.arange(n)
+    return part[np.argsort(distances[part], kind='stable')]
+
+
+def kmeans(vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means returning float32[nlist, d] centroids.
+
+    Trains on a random sample of at most KMEANS_MAX_TRAIN_POINTS_PER_LIST
+    points per list (what faiss does too); empty clusters are re-seeded
+    from random points.
+    """
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample_size = min(n, nlist * KMEANS_MAX_TRAIN_POINTS_PER_LIST)
+    sample = vectors[rng.choice(n, sample_size, replace=False)] if sample_size < n else vectors
+    centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmin(
+            _squared_l2(sample, centroids, np.einsum('ij,ij->i', centroids, centroids)), axis=1
+        )
+        counts = np.bincount(assignments, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+        empty = np.flatnonzero(~nonempty)
+        if empty.size:
+            centroids[empty] = sample[rng.choice(sample.shape[0], empty.size, replace=False)]
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Pure-NumPy inverted file index (k-means coarse quantizer + exact list scan).
+
+    Example usage:
+        index = IVFIndex(dimension=1536, nprobe=8)
+        index.add(vectors)                       # trains automatically when large enough
+        distances, labels = index.search(queries, 5)
+        index.save("vector_stores/career_ivf")
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        nlist: Optional[int] = None,
+        nprobe: int = DEFAULT_NPROBE,
+        train_threshold: Optional[int] = DEFAULT_TRAIN_THRESHOLD,
+        seed: int = 0,
+    ):
+        """Create an empty index.
+
+        Args:
+            dimension: Vector dimension
+            nlist: Number of inverted lists (default ≈ sqrt(N) at training time)
+            nprobe: Lists scanned per query (recall/latency knob)
+            train_threshold: Vector count that triggers training; None = never
+                train (exact "flat" search)
+            seed: k-means seed, for reproducible indexes
+        """
+        self.d = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.seed = seed
+        self.reset()
+
+    # --- faiss-compatible surface -------------------------------------------------
+    @property
+    def ntotal(self) -> int:
+        return self._count
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def reset(self) -> None:
+        self._vectors = np.zeros((0, self.d), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._count = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int64)
+        self._lists: List[np.ndarray] = []
+        self._trained_at = 0
+
+    def add(self, vectors: np.ndarray) -> None:
+        """Append vectors; ids are assigned sequentially from ntotal.
+
+        Once trained, new vectors join their nearest list (incremental
+        insert). Storage grows geometrically, so repeated small adds are
+        amortized O(1) per vector.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.d)
+        if vectors.shape[0] == 0:
+            return
+        start = self._count
+        self._reserve(start + vectors.shape[0])
+        self._vectors[start:start + vectors.shape[0]] = vectors
+        self._norms[start:start + vectors.shape[0]] = np.einsum('ij,ij->i', vectors, vectors)
+        self._count += vectors.shape[0]
+
+        if self.is_trained and self._count < self._trained_at * RETRAIN_GROWTH:
+            self._assign_range(start, self._count)
+        elif self.train_threshold is not None and self._count >= self.train_threshold:
+            self.train()
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Batch k-NN search.
+
+        Args:
+            queries: float32[Q, d]
+            k: Neighbours per query
+
+        Returns:
+            (distances float32[Q, k], labels int64[Q, k]), padded with
+            FLOAT32_MAX / -1 when fewer than k vectors are reachable
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.d)
+        q = queries.shape[0]
+        distances = np.full((q, k), FLOAT32_MAX, dtype=np.float32)
+        labels = np.full((q, k), -1, dtype=np.int64)
+        if self._count == 0 or k <= 0:
+            return distances, labels
+
+        if not self.is_trained or self.nprobe >= len(self._lists):
+            all_distances = _squared_l2(queries, self._vectors[:self._count], self._norms[:self._count])
+            for row in range(q):
+                top = _top_k(all_distances[row], k)
+                distances[row, :top.size] = all_distances[row, top]
+                labels[row, :top.size] = top
+            return distances, labels
+
+        centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        probe = np.argsort(_squared_l2(queries, self.centroids, centroid_norms), axis=1)[:, :self.nprobe]
+        for row in range(q):
+            candidates = np.concatenate([self._lists[c] for c in probe[row]])
+            if candidates.size == 0:
+                continue
+            candidate_distances = _squared_l2(
+                queries[row:row + 1], self._vectors[candidates], self._norms[candidates]
+            )[0]
+            top = _top_k(candidate_distances, k)
+            distances[row, :top.size] = candidate_distances[top]
+            labels[row, :top.size] = candidates[top]
+        return distances, labels
+
+    # --- training -----------------------------------------------------------------
+    def train(self) -> None:
+        """(Re)build the coarse quantizer over all stored vectors."""
+        if self._count == 0:
+            return
+        nlist = self.nlist or max(1, int(np.sqrt(self._count)))
+        nlist = min(nlist, self._count)
+        vectors = self._vectors[:self._count]
+        self.centroids = kmeans(vectors, nlist, seed=self.seed)
+        self._assignments = np.zeros(0, dtype=np.int64)
+        self._lists = [np.zeros(0, dtype=np.int64) for _ in range(nlist)]
+        self._trained_at = self._count
+        self._assign_range(0, self._count)
+        logger.debug(f"IVF index trained: {self._count} vectors, {nlist} lists")
+
+    def _assign_range(self, start: int, stop: int) -> None:
+        centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        assignments = np.argmin(
+            _squared_l2(self._vectors[start:stop], self.centroids, centroid_norms), axis=1
+        )
+        self._assignments = np.concatenate([self._assignments, assignments])
+        ids = np.arange(start, stop, dtype=np.int64)
+        for list_id in np.unique(assignments):
+            self._lists[list_id] = np.concatenate([self._lists[list_id], ids[assignments == list_id]])
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= self._vectors.shape[0]:
+            return
+        new_capacity = max(capacity, 2 * self._vectors.shape[0], 64)
+        vectors = np.zeros((new_capacity, self.d), dtype=np.float32)
+        norms = np.zeros(new_capacity, dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        norms[:self._count] = self._norms[:self._count]
+        self._vectors, self._norms = vectors, norms
+
+    # --- persistence --------------------------------------------------------------
+    def save(self, path: str) -> None:
+        """Write the index to `path` (a .npz file)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        params = {
+            "d": self.d, "nlist": self.nlist, "nprobe": self.nprobe,
+            "train_threshold": self.train_threshold, "seed": self.seed,
+            "trained_at": self._trained_at,
+        }
+        np.savez(
+            path,
+            vectors=self._vectors[:self._count],
+            centroids=self.centroids if self.centroids is not None else np.zeros((0, self.d), dtype=np.float32),
+            assignments=self._assignments,
+            params=np.array(json.dumps(params)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Load an index written by save()."""
+        with np.load(path if path.endswith('.npz') else path + '.npz') as data:
+            params = json.loads(str(data["params"]))
+            index = cls(
+                params["d"], nlist=params["nlist"], nprobe=params["nprobe"],
+                train_threshold=params["train_threshold"], seed=params["seed"],
+            )
+            vectors = data["vectors"]
+            index._reserve(vectors.shape[0])
+            index._vectors[:vectors.shape[0]] = vectors
+            index._norms[:vectors.shape[0]] = np.einsum('ij,ij->i', vectors, vectors)
+            index._count = vectors.shape[0]
+            if data["centroids"].shape[0]:
+                index.centroids = data["centroids"]
+                index._assignments = data["assignments"].astype(np.int64)
+                index._trained_at = params["trained_at"]
+                order = np.argsort(index._assignments, kind='stable')
+                bounds = np.searchsorted(index._assignments[order], np.arange(index.centroids.shape[0] + 1))
+                index._lists = [order[bounds[i]:bounds[i + 1]] for i in range(index.centroids.shape[0])]
+        return index
+
+
+class FaissHNSWIndex:
+    """faiss HNSW graph index behind the same interface as IVFIndex."""
+
+    def __init__(self, dimension: int, m: int = 32, ef_search: int = DEFAULT_EF_SEARCH, index=None):
+        if not FAISS_AVAILABLE:
+            raise ImportError("faiss is not installed")
+        self.d = dimension
+        self.m = m
+        self._index = index if index is not None else faiss.IndexHNSWFlat(dimension, m)
+        self.ef_search = ef_search
+
+    @property
+    def ef_search(self) -> int:
+        return int(self._index.hnsw.efSearch)
+
+    @ef_search.setter
+    def ef_search(self, value: int) -> None:
+        self._index.hnsw.efSearch = int(value)
+
+    @property
+    def ntotal(self) -> int:
+        return int(self._index.ntotal)
+
+    def add(self, vectors: np.ndarray) -> None:
+        self._index.add(np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.d))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        distances, labels = self._index.search(np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.d), k)
+        distances[labels < 0] = FLOAT32_MAX
+        return distances, labels
+
+    def reset(self) -> None:
+        self._index = faiss.IndexHNSWFlat(self.d, self.m)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        faiss.write_index(self._index, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FaissHNSWIndex":
+        index = faiss.read_index(path)
+        return cls(index.d, m=index.hnsw.nb_neighbors(1), ef_search=index.hnsw.efSearch, index=index)
+
+
+def create_ann_index(
+    dimension: int,
+    backend: str = DEFAULT_ANN_BACKEND,
+    nlist: Optional[int] = None,
+    nprobe: int = DEFAULT_NPROBE,
+    ef_search: int = DEFAULT_EF_SEARCH,
+):
+    """Build the best available ANN index for `backend`.
+
+    "auto" uses faiss HNSW when faiss is installed and the NumPy IVF index
+    otherwise.
+    """
+    if backend not in ANN_BACKENDS:
+        raise ValueError(f"backend must be one of {ANN_BACKENDS}, got '{backend}'")
+    if backend == "faiss" or (backend == "auto" and FAISS_AVAILABLE):
+        return FaissHNSWIndex(dimension, ef_search=ef_search)
+    if backend == "flat":
+        return IVFIndex(dimension, train_threshold=None)
+    return IVFIndex(dimension, nlist=nlist, nprobe=nprobe)
+
+
+def load_ann_index(path: str):
+    """Load an index saved by either backend (IVF files end in .npz)."""
+    if path.endswith('.npz') or os.path.exists(path + '.npz'):
+        return IVFIndex.load(path)
+    return FaissHNSWIndex.load(path)
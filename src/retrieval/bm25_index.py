@@ -0,0 +1,159 @@
+"""In-memory BM25 inverted index for hybrid lexical + vector retrieval.
+
+Exact identifiers ("pgvector", "Twilio", "retrieve_chunks", "Tesla") often
+embed poorly: the query vector lands near generic prose about databases or
+careers instead of the chunk that literally names the thing. A lexical
+index catches those, and reciprocal-rank fusion merges both rankings
+without having to calibrate BM25 scores against cosine similarities.
+
+Compact postings (CSR layout, built once per index load):
+    vocab:    term → term id
+    indptr:   int64[V + 1], postings of term t are [indptr[t], indptr[t+1])
+    rows:     int32[nnz], chunk row per posting
+    weights:  float32[nnz], precomputed BM25 contribution idf·tf·(k1+1)/(tf+k1·norm)
+
+Scoring a query is then one slice-and-add per query term, microseconds
+for the KB sizes we have.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Identifiers keep their underscores so "retrieve_chunks" stays one term
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+# High-frequency words that only add noise to lexical matching
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have he his how i in is it its "
+    "me my noah of on or s so that the this to was what when where which who why "
+    "will with you your".split()
+)
+
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/identifier tokens without stopwords."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts (row i = text i).
+
+    Example usage:
+        bm25 = BM25Index.from_texts(index.contents)
+        rows, scores = bm25.search("why pgvector", top_k=5)
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        rows: np.ndarray,
+        weights: np.ndarray,
+        num_docs: int,
+    ):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.rows = rows
+        self.weights = weights
+        self.num_docs = num_docs
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Tokenize `texts` and build CSR postings with precomputed weights."""
+        doc_terms = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(texts) and lengths.sum() else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for row, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        vocab: Dict[str, int] = {}
+        indptr = [0]
+        rows: List[int] = []
+        weights: List[float] = []
+        n = len(texts)
+        for term_id, (term, term_postings) in enumerate(sorted(postings.items())):
+            vocab[term] = term_id
+            df = len(term_postings)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            for row, tf in term_postings:
+                norm = 1.0 - b + b * lengths[row] / avg_length
+                rows.append(row)
+                weights.append(idf * tf * (k1 + 1.0) / (tf + k1 * norm))
+            indptr.append(len(rows))
+
+        return cls(
+            vocab,
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(rows, dtype=np.int32),
+            np.asarray(weights, dtype=np.float32),
+            n,
+        )
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for `query` (float32[num_docs])."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, stop = self.indptr[term_id], self.indptr[term_id + 1]
+            # Each row appears at most once per term, so fancy-index add is safe
+            scores[self.rows[start:stop]] += self.weights[start:stop]
+        return scores
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        rows: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows with a positive BM25 score.
+
+        Args:
+            query: Query text
+            top_k: Maximum rows to return
+            rows: Restrict to these row numbers (e.g. one doc_id partition)
+
+        Returns:
+            (rows int64[m], scores float32[m]) sorted by score, m <= top_k
+        """
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if rows is not None:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        if candidates.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        order = np.argsort(-scores[candidates], kind='stable')[:top_k]
+        return candidates[order], scores[candidates[order]]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[dict]], k: int = RRF_K, key: str = 'id') -> List[dict]:
+    """Merge ranked chunk lists by reciprocal-rank fusion.
+
+    Each chunk scores sum(1 / (k + rank)) over the lists it appears in.
+    The first occurrence of a chunk supplies its dict, so vector results
+    (listed first) keep their fields.
+
+    Returns:
+        Fresh chunk dicts with an added `rrf_score`, best first
+    """
+    fused: Dict[object, dict] = {}
+    scores: Dict[object, float] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            chunk_key = chunk.get(key)
+            if chunk_key not in fused:
+                fused[chunk_key] = chunk
+                scores[chunk_key] = 0.0
+            scores[chunk_key] += 1.0 / (k + rank)
+    ordered = sorted(fused, key=lambda chunk_key: scores[chunk_key], reverse=True)
+    return [{**fused[chunk_key], 'rrf_score': scores[chunk_key]} for chunk_key in ordered]
@@ -1,64 +1,416 @@
-import os
+"""Searchable index of functions and classes in the repository's Python files.
+
+Building the index means AST-parsing every .py file (~350ms for this repo).
+To keep that off the request path the index is serialized to a compact
+artifact, built by scripts/build_code_index.py:
+
+    vector_stores/code_index/index.json.gz
+        {"version": 1, "files": {path: {hash, mtime_ns, size, text, raw_entries}}}
+
+- **text**: the file source, stored once; each entry's `content` is sliced
+  from it on load, so line-number citations match the file exactly
+- **hash**: sha256 of the file bytes. refresh() re-parses only files whose
+  hash changed (size/mtime are checked first so unchanged files are not
+  even read), drops deleted files and parses new ones
+- **order**: files and entries keep rglob / ast.walk order, so search_code
+  and search_by_keywords rank ties exactly as a from-scratch build does
+
+Search (see _TokenIndex):
+    postings: lowercased \\w+ token → entry ids, built lazily on first search
+    (per-entry token sets are cached on the file records, so a refresh
+    only re-tokenizes changed files), plus trigram → tokens
+        ↓  term "retriev" / "noah's"
+    exact token hit + tokens found via the term's trigrams → candidate ids
+        ↓  exact `term in content` check on candidates only (if needed)
+    scores per entry → heapq.nlargest top-k → only the winners are copied
+
+Results are identical to the original full scan (substring semantics,
+score-then-index-order ranking), but a query touches only the entries
+that match instead of lowercasing every entry's content per keyword.
+
+Example usage:
+    index = CodeIndex(REPO_ROOT, artifact_path="vector_stores/code_index")
+    index.search_code("retrieve_chunks")
+    index.refresh()                      # after edits: re-parse changed files only
+    index.refresh(["src/a.py"])          # ...or just the files a watcher reported
+    index.save()                         # rewrite the artifact
+"""
+
 import ast
-from typing import List, Dict, Any, Optional
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import logging
+import os
+import re
+from collections import defaultdict
 from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Repository root (this file lives in src/retrieval/)
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+ARTIFACT_FILENAME = "index.json.gz"
+ARTIFACT_VERSION = 1
+
+GITHUB_BLOB_URL = "https://github.com/iNoahCodeGuy/NoahsAIAssistant/blob/main"
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> FrozenSet[str]:
+    """Distinct maximal word runs of already-lowercased text."""
+    return frozenset(_WORD_RE.findall(text))
+
+
+class _SubstringPostings:
+    """token → entry ids, looked up by substring through a trigram index.
+
+    Every token is also filed under each of its trigrams. A term of GRAM or
+    more characters takes its candidate tokens from its rarest trigram and
+    confirms them with `term in token`, so a query never iterates over the
+    vocabulary. Shorter terms ("db", "_") can't use trigrams: their token
+    lists are computed once by a vocabulary scan and memoized.
+    """
+
+    GRAM = 3
+
+    def __init__(self, postings: Dict[str, List[int]]) -> None:
+        self.postings = postings
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        for token in postings:
+            for start in range(len(token) - self.GRAM + 1):
+                self.grams[token[start:start + self.GRAM]].add(token)
+        self._short_terms: Dict[str, List[str]] = {}
+
+    def _tokens_containing(self, term: str) -> Iterable[str]:
+        if len(term) < self.GRAM:
+            tokens = self._short_terms.get(term)
+            if tokens is None:
+                tokens = self._short_terms[term] = [token for token in self.postings if term in token]
+            return tokens
+        rarest: Optional[Set[str]] = None
+        for start in range(len(term) - self.GRAM + 1):
+            tokens = self.grams.get(term[start:start + self.GRAM])
+            if not tokens:
+                return ()
+            if rarest is None or len(tokens) < len(rarest):
+                rarest = tokens
+        if len(term) == self.GRAM:
+            return rarest
+        return [token for token in rarest if term in token]
+
+    def matches(self, term: str) -> Set[int]:
+        """Entry ids of every token containing `term`."""
+        # Exact token: direct hit, no n-gram work
+        ids: Set[int] = set(self.postings.get(term, ()))
+        for token in self._tokens_containing(term):
+            if token != term:
+                ids.update(self.postings[token])
+        return ids
+
+
+class _TokenIndex:
+    """Inverted index over CodeIndex entries with exact substring semantics.
+
+    A term made of word characters can only occur inside a maximal word run
+    of the content, so "entries whose content contains the term" is the
+    union of postings of every vocabulary token containing it (found via
+    _SubstringPostings' trigram index). Terms with punctuation ("noah's",
+    "work?") use the intersection over their word runs as candidates and
+    verify with a substring test.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], entry_tokens: List[FrozenSet[str]]):
+        self.entries = entries
+        self.contents = [item["content"].lower() for item in entries]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for entry_id, tokens in enumerate(entry_tokens):
+            for token in tokens:
+                postings[token].append(entry_id)
+        self.postings = _SubstringPostings(dict(postings))
+        # Lowercased name → entry ids (names are matched by substring too)
+        name_postings: Dict[str, List[int]] = defaultdict(list)
+        for entry_id, item in enumerate(entries):
+            name_postings[item["name"].lower()].append(entry_id)
+        self.name_postings = _SubstringPostings(dict(name_postings))
+
+    def name_matches(self, term: str) -> Set[int]:
+        """Entry ids whose lowercased name contains `term`."""
+        return self.name_postings.matches(term)
+
+    def content_matches(self, term: str) -> Set[int]:
+        """Entry ids whose lowercased content contains `term`."""
+        runs = _WORD_RE.findall(term)
+        if not runs:
+            return {i for i, content in enumerate(self.contents) if term in content}
+        candidates: Optional[Set[int]] = None
+        for run in sorted(set(runs), key=len, reverse=True):
+            ids = self.postings.matches(run)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        if runs == [term]:
+            return candidates
+        return {i for i in candidates if term in self.contents[i]}
+
+    def top(self, scores: Dict[int, int], max_results: int) -> List[Dict[str, Any]]:
+        """Best `max_results` entries by score (ties in index order), as result dicts."""
+        best = heapq.nlargest(max_results, sorted(scores), key=scores.__getitem__)
+        results = []
+        for entry_id in best:
+            item = self.entries[entry_id]
+            results.append({
+                **item,
+                "score": scores[entry_id],
+                "citation": f"{item['file']}:{item['line_start']}-{item['line_end']}",
+                "github_url": f"{GITHUB_BLOB_URL}/{item['file']}#L{item['line_start']}"
+            })
+        return results
+
 
 class CodeIndex:
-    def __init__(self, repo_path: str = "."):
+    def __init__(self, repo_path: str = ".", artifact_path: Optional[str] = None):
+        """Load the prebuilt artifact if present, then bring it up to date.
+
+        Args:
+            repo_path: Repository root to index
+            artifact_path: Artifact directory (or .json.gz file); relative
+                paths resolve against repo_path. None = always build in memory.
+        """
         self.repo_path = Path(repo_path)
+        self.artifact_path = self._resolve_artifact_path(artifact_path)
         self.index = {}
-        self._build_index()
-    
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._search_index: Optional[_TokenIndex] = None
+        self._search_source: Optional[tuple] = None  # (index dict, len) the search index was built from
+        self.loaded_from_artifact = self._load_artifact()
+        self.refresh()
+
+    def _resolve_artifact_path(self, artifact_path: Optional[str]) -> Optional[Path]:
+        if not artifact_path:
+            return None
+        path = Path(artifact_path)
+        if not path.is_absolute():
+            path = self.repo_path / path
+        if path.suffix != ".gz":
+            path = path / ARTIFACT_FILENAME
+        return path
+
+    # --- Building ----------------------------------------------------------------
     def _build_index(self):
-        """Build searchable index of code files with line numbers."""
-        for file_path in self.repo_path.rglob("*.py"):
-            if "venv" in str(file_path) or "__pycache__" in str(file_path):
-                continue
-                
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    
-                # Index functions and classes with line numbers
-                tree = ast.parse(''.join(lines))
-                for node in ast.walk(tree):
-                    if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                        self.index[f"{file_path.relative_to(self.repo_path)}:{node.name}"] = {
-                            "file": str(file_path.relative_to(self.repo_path)),
-                            "name": node.name,
-                            "line_start": node.lineno,
-                            "line_end": getattr(node, 'end_lineno', node.lineno + 10),
-                            "type": "function" if isinstance(node, ast.FunctionDef) else "class",
-                            "content": ''.join(lines[node.lineno-1:getattr(node, 'end_lineno', node.lineno + 10)])
-                        }
-            except Exception as e:
+        """Rebuild the whole index from source (ignores any artifact)."""
+        self._files = {}
+        self.refresh()
+
+    def _source_files(self) -> List[Path]:
+        return [
+            file_path for file_path in self.repo_path.rglob("*.py")
+            if "venv" not in str(file_path) and "__pycache__" not in str(file_path)
+        ]
+
+    @staticmethod
+    def _entries(relative: str, lines: List[str], raw_entries: List[list]) -> List[tuple]:
+        """(key, item) pairs for parsed nodes, content sliced from the file lines."""
+        return [
+            (f"{relative}:{name}", {
+                "file": relative,
+                "name": name,
+                "line_start": line_start,
+                "line_end": line_end,
+                "type": node_type,
+                "content": ''.join(lines[line_start - 1:line_end]),
+            })
+            for name, line_start, line_end, node_type in raw_entries
+        ]
+
+    def _parse_file(self, relative: str, raw: bytes) -> Dict[str, Any]:
+        """Parse one file's functions and classes with line numbers."""
+        text = ""
+        raw_entries: List[list] = []
+        try:
+            # Same decoding and newline handling as open(path, 'r', encoding='utf-8')
+            text = io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8').read()
+            tree = ast.parse(text)
+            for node in ast.walk(tree):
+                if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                    raw_entries.append([
+                        node.name,
+                        node.lineno,
+                        getattr(node, 'end_lineno', node.lineno + 10),
+                        "function" if isinstance(node, ast.FunctionDef) else "class",
+                    ])
+        except Exception:
+            raw_entries = []  # unparsable files contribute nothing, as before
+        lines = io.StringIO(text).readlines()
+        return {"text": text, "raw_entries": raw_entries, "entries": self._entries(relative, lines, raw_entries)}
+
+    def _load_file(self, relative: str) -> tuple:
+        """(record, parsed) for one file; the cached record is reused if unchanged.
+
+        record is None when the file can no longer be read.
+        """
+        file_path = self.repo_path / relative
+        cached = self._files.get(relative)
+        try:
+            stat = file_path.stat()
+            if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                return cached, False
+            raw = file_path.read_bytes()
+        except OSError:
+            return None, False
+        digest = hashlib.sha256(raw).hexdigest()
+        parsed = not (cached and cached["hash"] == digest)
+        if parsed:
+            record = self._parse_file(relative, raw)
+            record["hash"] = digest
+        else:
+            record = cached
+        record["mtime_ns"], record["size"] = stat.st_mtime_ns, stat.st_size
+        return record, parsed
+
+    def _rebuild_entries(self):
+        self.index = {}
+        for record in self._files.values():
+            for key, item in record["entries"]:
+                self.index[key] = item
+
+    def refresh(self, paths: Optional[Iterable[str]] = None) -> int:
+        """Re-parse files whose content hash changed; drop deleted files.
+
+        Args:
+            paths: Relative paths already known to be modified (e.g. reported
+                by CodeIndexService's change detector). Only these files are
+                checked and the tree is not walked. If one of them is new or
+                gone the file set changed, and a full refresh runs instead so
+                files keep rglob order.
+
+        Returns:
+            Number of files parsed (0 = index was already current)
+        """
+        if paths is not None:
+            paths = list(dict.fromkeys(paths))
+            if all(path in self._files and (self.repo_path / path).is_file() for path in paths):
+                return self._refresh_paths(paths)
+
+        files: Dict[str, Dict[str, Any]] = {}
+        parsed = 0
+        for file_path in self._source_files():
+            relative = str(file_path.relative_to(self.repo_path))
+            record, reparsed = self._load_file(relative)
+            if record is None:
                 continue
-    
+            files[relative] = record
+            parsed += reparsed
+
+        changed = parsed > 0 or files.keys() != self._files.keys()
+        self._files = files
+        if changed or not self.index:
+            self._rebuild_entries()
+        if parsed:
+            logger.info(f"Code index refreshed: {parsed} file(s) parsed, {len(self.index)} entries")
+        return parsed
+
+    def _refresh_paths(self, paths: List[str]) -> int:
+        parsed = 0
+        for relative in paths:
+            record, reparsed = self._load_file(relative)
+            if record is None:  # deleted since the caller looked
+                return self.refresh()
+            self._files[relative] = record  # same key, so file order is kept
+            parsed += reparsed
+        if parsed:
+            self._rebuild_entries()
+            logger.info(f"Code index refreshed: {parsed} of {len(paths)} changed file(s) parsed, {len(self.index)} entries")
+        return parsed
+
+    def file_stats(self) -> Dict[str, tuple]:
+        """{relative path: (mtime_ns, size)} for every indexed file."""
+        return {relative: (record["mtime_ns"], record["size"]) for relative, record in self._files.items()}
+
+    # --- Artifact ----------------------------------------------------------------
+    def _load_artifact(self) -> bool:
+        if self.artifact_path is None or not self.artifact_path.is_file():
+            return False
+        try:
+            with gzip.open(self.artifact_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != ARTIFACT_VERSION:
+                logger.warning(f"Ignoring code index artifact {self.artifact_path}: version {data.get('version')}")
+                return False
+            for relative, record in data["files"].items():
+                record["entries"] = self._entries(relative, io.StringIO(record["text"]).readlines(), record["raw_entries"])
+            self._files = data["files"]
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load code index artifact {self.artifact_path}: {e}")
+            self._files = {}
+            return False
+
+    def save(self, artifact_path: Optional[str] = None) -> Path:
+        """Write the artifact atomically (temp file + rename)."""
+        path = self._resolve_artifact_path(artifact_path) if artifact_path else self.artifact_path
+        if path is None:
+            raise ValueError("No artifact_path configured for CodeIndex.save()")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": ARTIFACT_VERSION,
+            "files": {
+                relative: {key: record[key] for key in ("hash", "mtime_ns", "size", "text", "raw_entries")}
+                for relative, record in self._files.items()
+            },
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        # mtime=0 keeps the gzip bytes deterministic for unchanged sources
+        with open(tmp_path, "wb") as raw_file, gzip.GzipFile(filename="", fileobj=raw_file, mode="wb", mtime=0) as f:
+            f.write(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        os.replace(tmp_path, path)
+        return path
+
+    # --- Search ------------------------------------------------------------------
+    def _token_index(self) -> _TokenIndex:
+        """Inverted index for the current self.index (rebuilt when it changes)."""
+        if (
+            self._search_index is None
+            or self._search_source[0] is not self.index
+            or self._search_source[1] != len(self.index)
+        ):
+            tokens_by_item: Dict[int, FrozenSet[str]] = {}
+            for record in self._files.values():
+                if "tokens" not in record:
+                    record["tokens"] = [_tokens(item["content"].lower()) for _, item in record["entries"]]
+                for (_, item), tokens in zip(record["entries"], record["tokens"]):
+                    tokens_by_item[id(item)] = tokens
+            entries = list(self.index.values())
+            entry_tokens = [
+                tokens_by_item.get(id(item)) or _tokens(item["content"].lower()) for item in entries
+            ]
+            self._search_index = _TokenIndex(entries, entry_tokens)
+            self._search_source = (self.index, len(self.index))
+        return self._search_index
+
     def search_code(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
-        """Search for code snippets matching the query."""
-        results = []
+        """Search for code snippets matching the query.
+
+        Scoring: +10 if the whole query appears in the name, +5 if any query
+        word appears in the content.
+        """
         query_lower = query.lower()
-        
-        for key, item in self.index.items():
-            # Score based on name match and content relevance
-            score = 0
-            if query_lower in item["name"].lower():
-                score += 10
-            if any(term in item["content"].lower() for term in query_lower.split()):
-                score += 5
-                
-            if score > 0:
-                results.append({
-                    **item,
-                    "score": score,
-                    "citation": f"{item['file']}:{item['line_start']}-{item['line_end']}",
-                    "github_url": f"https://github.com/iNoahCodeGuy/NoahsAIAssistant/blob/main/{item['file']}#L{item['line_start']}"
-                })
-        
-        # Sort by score and return top results
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:max_results]
-    
+        index = self._token_index()
+        scores: Dict[int, int] = defaultdict(int)
+        for entry_id in index.name_matches(query_lower):
+            scores[entry_id] += 10
+        content_hits: Set[int] = set()
+        for term in query_lower.split():
+            content_hits |= index.content_matches(term)
+        for entry_id in content_hits:
+            scores[entry_id] += 5
+        return index.top(scores, max_results)
+
     def get_file_snippet(self, file_path: str, line_start: int, line_end: int) -> str:
         """Get specific lines from a file."""
         try:
@@ -74,29 +426,18 @@ class CodeIndex:
         # Simple deterministic placeholder result
         return {'code': f'Matching snippet for fragment: {code_fragment}'}
 
-    def search_by_keywords(self, keywords: List[str], max_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for code snippets matching multiple keywords."""
-        results = []
-        
-        for key, item in self.index.items():
-            score = 0
-            content_lower = item["content"].lower()
-            name_lower = item["name"].lower()
-            
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-                if keyword_lower in name_lower:
-                    score += 15
-                if keyword_lower in content_lower:
-                    score += 5
-            
-            if score > 0:
-                results.append({
-                    **item,
-                    "score": score,
-                    "citation": f"{item['file']}:{item['line_start']}-{item['line_end']}",
-                    "github_url": f"https://github.com/iNoahCodeGuy/NoahsAIAssistant/blob/main/{item['file']}#L{item['line_start']}"
-                })
-        
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:max_results]
\ No newline at end of file
+    def search_by_keywords(self, keywords: Iterable[str], max_results: int = 5) -> List[Dict[str, Any]]:
+        """Search for code snippets matching multiple keywords.
+
+        Scoring per keyword: +15 if it appears in the name, +5 if it appears
+        in the content.
+        """
+        index = self._token_index()
+        scores: Dict[int, int] = defaultdict(int)
+        for keyword in keywords:
+            keyword_lower = keyword.lower()
+            for entry_id in index.name_matches(keyword_lower):
+                scores[entry_id] += 15
+            for entry_id in index.content_matches(keyword_lower):
+                scores[entry_id] += 5
+        return index.top(scores, max_results)
@@ -2,33 +2,131 @@
 version hashing, and technical response context assembly.
 
 This isolates code-specific evolution from the core RagEngine.
+
+Change detection (SourceChangeDetector):
+    ensure_current() runs on every code-snippet request, so it must not walk
+    the tree each time. The detector re-scans at most once per
+    CODE_INDEX_CHECK_SECONDS (default 10s; 0 = every call) and returns the
+    exact files that were modified, added or removed since the last scan.
+    Only those are fed into CodeIndex.refresh(paths), so a single edited
+    file costs one stat + one parse instead of a full rebuild. Between
+    checks the hot path is a clock read.
+
+    Why not directory mtimes or inotify? A directory's mtime only moves when
+    entries are added/removed/renamed, not when a file is edited in place,
+    so it cannot replace the per-file stat. inotify has no stdlib binding
+    and the deployed (serverless) filesystem is read-only anyway - the
+    interval exists for local development, and production can set
+    disable_auto_rebuild to skip checks entirely.
 """
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import logging
 import hashlib
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHECK_SECONDS = 10.0
+
+# {relative path: (mtime_ns, size)}
+SourceSnapshot = Dict[str, Tuple[int, int]]
+
+
+@dataclass
+class SourceChanges:
+    """Files that changed between two detector scans (relative paths)."""
+    modified: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.modified or self.added or self.removed)
+
+
+class SourceChangeDetector:
+    """Throttled detection of changed .py files under a repository root.
+
+    Scans the same file set CodeIndex indexes (every *.py outside venv and
+    __pycache__ directories), pruning excluded directories instead of
+    walking into them.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        check_interval: Optional[float] = None,
+        snapshot: Optional[SourceSnapshot] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.root = Path(root)
+        if check_interval is None:
+            check_interval = float(os.getenv("CODE_INDEX_CHECK_SECONDS", str(DEFAULT_CHECK_SECONDS)))
+        self.check_interval = check_interval
+        self._clock = clock
+        self.snapshot: SourceSnapshot = snapshot if snapshot is not None else self.scan()
+        self._last_check = clock()
+
+    @staticmethod
+    def _excluded(name: str) -> bool:
+        return "venv" in name or "__pycache__" in name
+
+    def scan(self) -> SourceSnapshot:
+        snapshot: SourceSnapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not self._excluded(d)]
+            for name in filenames:
+                if not name.endswith(".py") or self._excluded(name):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[os.path.relpath(path, self.root)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, force: bool = False) -> Optional[SourceChanges]:
+        """Changes since the previous scan, or None if the interval has not elapsed."""
+        now = self._clock()
+        if not force and now - self._last_check < self.check_interval:
+            return None
+        self._last_check = now
+        current = self.scan()
+        previous = self.snapshot
+        changes = SourceChanges(
+            modified=[path for path, stat in current.items() if path in previous and previous[path] != stat],
+            added=[path for path in current if path not in previous],
+            removed=[path for path in previous if path not in current],
+        )
+        self.snapshot = current
+        return changes
+
+
 class CodeIndexService:
-    def __init__(self, settings=None, code_index=None):
+    def __init__(self, settings=None, code_index=None, check_interval: Optional[float] = None):
         self.settings = settings
         self.code_index = code_index  # instance of CodeIndex or None
-        self._snapshot: Dict[str, float] = {}
-        self.snapshot_sources()
+        from src.retrieval.code_index import REPO_ROOT, CodeIndex
+        root, seed = REPO_ROOT, None
+        if isinstance(code_index, CodeIndex):
+            # CodeIndex already stat'ed every file it indexed; reuse that as the baseline
+            root, seed = code_index.repo_path, code_index.file_stats()
+        self.detector = SourceChangeDetector(root, check_interval=check_interval, snapshot=seed)
+
+    @property
+    def _snapshot(self) -> SourceSnapshot:
+        return self.detector.snapshot
 
     # --- Snapshot & Versioning --------------------------------------------------
-    def snapshot_sources(self):
-        self._snapshot = {}
-        base = Path('.')
-        for py in base.rglob('src/**/*.py'):
-            try:
-                stat = py.stat()
-                self._snapshot[str(py)] = stat.st_mtime
-            except Exception:
-                continue
+    def snapshot_sources(self) -> SourceSnapshot:
+        """Force a full re-scan, bypassing the check interval."""
+        self.detector.snapshot = self.detector.scan()
+        return self.detector.snapshot
 
     def version(self) -> str:
         if not self._snapshot:
@@ -38,34 +136,42 @@ class CodeIndexService:
         return hashlib.sha256(concat.encode('utf-8')).hexdigest()[:12]
 
     # --- Rebuild Detection ------------------------------------------------------
-    def ensure_current(self):
+    def ensure_current(self, force: bool = False) -> Optional[SourceChanges]:
+        """Refresh the code index for files changed since the last check.
+
+        Returns the detected changes, or None when checks are disabled or the
+        check interval has not elapsed yet.
+        """
         # Respect optional flag
         try:
             if getattr(self.settings, 'disable_auto_rebuild', False):
-                return
+                return None
         except Exception:
             pass
-        base = Path('.')
-        changed = False
-        for py in base.rglob('src/**/*.py'):
+        changes = self.detector.poll(force=force)
+        if not changes:
+            return changes
+        if self.code_index is not None:
             try:
-                mtime = py.stat().st_mtime
-                old = self._snapshot.get(str(py))
-                if old is None or mtime > old:
-                    changed = True
-                    break
-            except Exception:
-                continue
-        if changed:
-            # Always update snapshot first so version changes even if rebuild fails
-            self.snapshot_sources()
-            if self.code_index is not None:
-                try:
-                    from src.retrieval.code_index import CodeIndex
-                    self.code_index = CodeIndex(getattr(self.settings, 'code_index_path', 'vector_stores/code_index'))
+                refresh = getattr(self.code_index, 'refresh', None)
+                if callable(refresh):
+                    # Modified files only: re-parse just those; added/removed: re-walk
+                    paths = None if changes.added or changes.removed else changes.modified
+                    parsed = refresh(paths) if paths is not None else refresh()
+                    logger.info(
+                        f"Code index refreshed: {len(changes.modified)} modified, {len(changes.added)} added, "
+                        f"{len(changes.removed)} removed ({parsed} file(s) re-parsed)"
+                    )
+                else:
+                    from src.retrieval.code_index import REPO_ROOT, CodeIndex
+                    self.code_index = CodeIndex(
+                        REPO_ROOT,
+                        artifact_path=getattr(self.settings, 'code_index_path', 'vector_stores/code_index')
+                    )
                     logger.info("Code index rebuilt after source changes detected")
-                except Exception as e:
-                    logger.warning(f"Failed rebuilding code index: {e}")
+            except Exception as e:
+                logger.warning(f"Failed rebuilding code index: {e}")
+        return changes
 
     # --- Snippet Retrieval ------------------------------------------------------
     def retrieve_snippets(self, query: str, role: Optional[str], max_results: int = 3) -> List[Dict[str, Any]]:
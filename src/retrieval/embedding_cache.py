@@ -0,0 +1,218 @@
+"""Query-embedding cache in front of the OpenAI embeddings API.
+
+Every retrieval starts with `embeddings.create`, a 100-400ms network round
+trip. Many queries repeat verbatim: suggested questions, the
+VAGUE_QUERY_EXPANSIONS targets in query_classification.py, health checks.
+This cache lets those skip the network entirely.
+
+Design:
+- **Key**: embedding model + normalized text (trimmed, whitespace-collapsed,
+  lowercased), so "What are Noah's skills? " and "what are noah's skills?"
+  share one entry while different models never collide
+- **Memory tier**: OrderedDict LRU bounded by `max_entries`, entries expire
+  after `ttl_seconds`
+- **Persistent tier (optional)**: SQLite file (stdlib, no extra dependency)
+  storing float32 blobs. Survives process restarts; on Vercel point it at
+  /tmp to survive warm invocations of the same container
+- **Counters**: hits/misses/evictions for observability
+
+Configuration (environment):
+- EMBEDDING_CACHE_SIZE: max in-memory entries (default 1024)
+- EMBEDDING_CACHE_TTL_SECONDS: entry lifetime (default 86400)
+- EMBEDDING_CACHE_PATH: SQLite path for the persistent tier (unset = memory only)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize query text for cache keying."""
+    return " ".join(text.split()).lower()
+
+
+class EmbeddingCache:
+    """Bounded LRU + TTL cache for query embeddings.
+
+    Example usage:
+        cache = EmbeddingCache(max_entries=512, ttl_seconds=3600)
+        vector = cache.get("text-embedding-3-small", query)
+        if vector is None:
+            vector = call_openai(query)
+            cache.put("text-embedding-3-small", query, vector)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400,
+        persist_path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Create a cache.
+
+        Args:
+            max_entries: In-memory capacity; least recently used entries are evicted
+            ttl_seconds: Entry lifetime in both tiers (0 disables expiry)
+            persist_path: Optional SQLite file for the persistent tier
+            clock: Time source (injectable for tests)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[float, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.persistent_hits = 0
+
+        if persist_path:
+            self._open_persistent_tier(persist_path)
+
+    # --- Persistent tier ---------------------------------------------------------
+    def _open_persistent_tier(self, path: str) -> None:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " vector BLOB NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        except Exception as e:
+            # A broken disk cache must never break retrieval
+            logger.warning(f"Embedding cache persistence disabled ({path}): {e}")
+            self._db = None
+
+    def _persistent_get(self, key: str, now: float) -> Optional[Tuple[float, Tuple[float, ...]]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        blob, created_at = row
+        if self._expired(created_at, now):
+            return None
+        return created_at, tuple(np.frombuffer(blob, dtype=np.float32).tolist())
+
+    def _persistent_put(self, key: str, vector: Tuple[float, ...], created_at: float) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                (key, np.asarray(vector, dtype=np.float32).tobytes(), created_at),
+            )
+            self._db.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    # --- Core API ----------------------------------------------------------------
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return f"{model}\x1f{normalize_text(text)}"
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return a cached embedding (fresh list) or None on miss."""
+        key = self.make_key(model, text)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0], now):
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                entry = self._persistent_get(key, now)
+                if entry is not None:
+                    self.persistent_hits += 1
+                    self._store(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, model: str, text: str, embedding: List[float]) -> None:
+        """Cache an embedding in memory (and on disk when configured)."""
+        if not embedding:
+            return
+        key = self.make_key(model, text)
+        entry = (self._clock(), tuple(float(x) for x in embedding))
+        with self._lock:
+            self._store(key, entry)
+            self._persistent_put(key, entry[1], entry[0])
+
+    def _store(self, key: str, entry: Tuple[float, Tuple[float, ...]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the persistent tier is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for health checks and dashboards."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+
+# Global cache instance shared by every retriever in the process
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the process-wide embedding cache from environment config."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400")),
+            persist_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+        )
+    return _embedding_cache
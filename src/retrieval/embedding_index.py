@@ -0,0 +1,479 @@
+"""In-process embedding index for pgvector knowledge base chunks.
+
+Holds every `kb_chunks` embedding as one contiguous, pre-normalized float32
+NumPy matrix with parallel id/doc_id/section/content arrays.
+
+Why an in-process index:
+- The KB is small (hundreds to low thousands of chunks), so the whole matrix
+  fits comfortably in memory (~6 KB per 1536-dim chunk)
+- Scoring every chunk is one matrix-vector product instead of a Python loop
+- Top-k selection uses argpartition (O(N)) instead of a full sort
+- The matrix is only rebuilt when the KB changes, not on every query
+
+Architecture:
+    kb_chunks rows (id, doc_id, section, content, embedding)
+        ↓  EmbeddingIndex.from_rows()
+    matrix: float32[N, D] (L2-normalized rows)
+        ↓  search(query_embedding)
+    scores = matrix @ normalize(query)  → cosine similarity
+        ↓
+    argpartition top-k → sort k → chunk dicts
+
+Partitions:
+    Rows are grouped by doc_id (career_kb, technical_kb, architecture_kb,
+    mma_kb, ...) into contiguous row ranges. search(doc_ids=[...]) scores
+    only those ranges (matrix slices are views, no copies), so a filtered
+    query does proportionally less work and always gets up to k results
+    from the requested sources.
+
+Compact storage (optional, see EmbeddingIndex.quantize):
+    coarse: float16[N, D] or int8[N, D] + float32 per-row scales (resident)
+    matrix: float32[N, D] moved to a memory-mapped file (snapshot or spill)
+        ↓  search(query_embedding)
+    coarse scores for all N → top `rescore_candidates` rows
+        ↓
+    exact float32 rescoring of those rows only → top-k
+
+Matryoshka prefilter (optional, quantize(prefix_dims=256)):
+    text-embedding-3 vectors keep most of their ranking quality when
+    truncated to a prefix and re-normalized, so the coarse matrix can hold
+    only the first 256/512 dims (any storage mode). The coarse pass then
+    reads 3-6x fewer values per chunk; the top candidates are still
+    rescored at full dimension, so returned similarities stay exact.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_embedding(raw: Any) -> Optional[np.ndarray]:
+    """Convert a Supabase embedding value into a float32 vector.
+
+    PostgREST returns pgvector columns as strings like "[0.1,0.2,...]",
+    while tests and RPC payloads may hand us plain lists.
+    """
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    vec = np.asarray(raw, dtype=np.float32)
+    if vec.ndim != 1 or vec.size == 0:
+        return None
+    return vec
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place-safe fashion (zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def normalize_vector(vector: Sequence[float]) -> np.ndarray:
+    """Return a float32, L2-normalized copy of a single embedding."""
+    vec = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    if norm == 0.0:
+        return vec
+    return vec / norm
+
+
+# Resident storage formats for the coarse scoring matrix
+STORAGE_MODES = ("float32", "float16", "int8")
+
+# Rows converted to float32 at a time during coarse scoring (bounds scratch memory)
+COARSE_BLOCK_ROWS = 256
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row symmetric int8 quantization.
+
+    Each row is scaled so its largest magnitude maps to 127.
+
+    Returns:
+        (codes int8[N, D], scales float32[N]) with row ≈ codes * scale
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _spill_to_memmap(matrix: np.ndarray, spill_dir: Optional[str] = None) -> np.ndarray:
+    """Move a float32 matrix into an unlinked temp file and memory-map it.
+
+    Only the rows touched during rescoring are paged back in, so the full
+    precision copy stops counting against the resident memory budget.
+    """
+    fd, path = tempfile.mkstemp(prefix="kb_index_", suffix=".f32", dir=spill_dir)
+    os.close(fd)
+    spilled = np.memmap(path, dtype=np.float32, mode="w+", shape=matrix.shape)
+    spilled[:] = matrix
+    spilled.flush()
+    spilled = np.memmap(path, dtype=np.float32, mode="r", shape=matrix.shape)
+    try:
+        os.unlink(path)  # mapping stays valid; file disappears with the process
+    except OSError:
+        pass
+    return spilled
+
+
+def _partition_ranges(doc_ids: np.ndarray) -> Dict[str, List[Tuple[int, int]]]:
+    """Map each doc_id to the [start, stop) row ranges it occupies."""
+    partitions: Dict[str, List[Tuple[int, int]]] = {}
+    start = 0
+    for row in range(1, len(doc_ids) + 1):
+        if row == len(doc_ids) or doc_ids[row] != doc_ids[start]:
+            partitions.setdefault(doc_ids[start], []).append((start, row))
+            start = row
+    return partitions
+
+
+class EmbeddingIndex:
+    """Resident, vectorized similarity index over KB chunks.
+
+    Example usage:
+        index = EmbeddingIndex.from_rows(rows, version="278:2025-10-16T...")
+        chunks = index.search(query_embedding, top_k=3, threshold=0.6)
+    """
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        ids: Sequence[int],
+        doc_ids: Sequence[str],
+        sections: Sequence[str],
+        contents: Sequence[str],
+        version: Optional[str] = None,
+        normalized: bool = False,
+    ):
+        """Create an index from already-aligned arrays.
+
+        Args:
+            matrix: float32[N, D] embedding matrix (normalized here if needed)
+            ids: kb_chunks primary keys, one per row
+            doc_ids: Source document per row (career_kb, technical_kb, ...)
+            sections: Section name per row
+            contents: Chunk text per row
+            version: Opaque KB version string used for change detection
+            normalized: Rows are already L2-normalized (e.g. a memory-mapped
+                snapshot); skip normalization so the matrix is not copied
+        """
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError(f"Embedding matrix must be 2-D, got shape {matrix.shape}")
+        n = matrix.shape[0]
+        if not (len(ids) == len(doc_ids) == len(sections) == len(contents) == n):
+            raise ValueError("EmbeddingIndex arrays must all have one entry per matrix row")
+
+        self.matrix = normalize_rows(matrix) if n and not normalized else matrix
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=object)
+        self.sections = np.asarray(sections, dtype=object)
+        self.contents = np.asarray(contents, dtype=object)
+        self.version = version
+        self.partitions = _partition_ranges(self.doc_ids)
+        self._rows_by_id: Optional[Dict[int, int]] = None
+
+        # Per-chunk role keyword counts [N, roles], attached at load time
+        # (see role_affinity.role_keyword_matrix)
+        self.role_features: Optional[np.ndarray] = None
+
+        # BM25 postings over `contents`, attached at load time (see bm25_index)
+        self.lexical = None
+
+        # Compact coarse-scoring matrix (see quantize()); None = score self.matrix directly
+        self.storage = "float32"
+        self.coarse: Optional[np.ndarray] = None
+        self.coarse_scales: Optional[np.ndarray] = None
+        self.rescore_candidates = 0
+        self.prefix_dims: Optional[int] = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], version: Optional[str] = None) -> "EmbeddingIndex":
+        """Build an index from `kb_chunks` rows as returned by Supabase.
+
+        Rows without a usable embedding are skipped (they can never match).
+        Rows whose dimension disagrees with the first embedding are skipped
+        with a warning rather than breaking the whole index. Rows are
+        grouped by doc_id (stable) so each partition is one contiguous slice.
+        """
+        rows = sorted(rows, key=lambda row: row.get('doc_id') or '')
+        vectors: List[np.ndarray] = []
+        ids: List[int] = []
+        doc_ids: List[str] = []
+        sections: List[str] = []
+        contents: List[str] = []
+        dims: Optional[int] = None
+
+        for row in rows:
+            vec = _parse_embedding(row.get('embedding'))
+            if vec is None:
+                continue
+            if dims is None:
+                dims = vec.size
+            elif vec.size != dims:
+                logger.warning(f"Skipping chunk {row.get('id')}: embedding has {vec.size} dims, expected {dims}")
+                continue
+            vectors.append(vec)
+            ids.append(int(row['id']))
+            doc_ids.append(row.get('doc_id') or '')
+            sections.append(row.get('section') or '')
+            contents.append(row.get('content') or '')
+
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, dims or 0), dtype=np.float32)
+        return cls(matrix, ids, doc_ids, sections, contents, version=version)
+
+    def __len__(self) -> int:
+        return int(self.matrix.shape[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.ndim == 2 else 0
+
+    def score(self, query_embedding: Sequence[float]) -> np.ndarray:
+        """Cosine similarity of the query against every chunk (one matvec)."""
+        query = normalize_vector(query_embedding)
+        return self.matrix @ query
+
+    def top_k_indices(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Row indices of the `top_k` highest scores, best first."""
+        n = scores.shape[0]
+        if top_k <= 0 or n == 0:
+            return np.empty(0, dtype=np.int64)
+        if top_k < n:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(n)
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def rows_for_ids(self, ids: Iterable[int]) -> np.ndarray:
+        """Row numbers for kb_chunks ids (-1 for ids not in the index)."""
+        if self._rows_by_id is None:
+            self._rows_by_id = {int(chunk_id): row for row, chunk_id in enumerate(self.ids)}
+        return np.array([self._rows_by_id.get(int(i), -1) for i in ids], dtype=np.int64)
+
+    def chunk(self, row: int, similarity: float) -> Dict[str, Any]:
+        """Materialize a chunk dict for one row (fresh dict per call)."""
+        return {
+            'id': int(self.ids[row]),
+            'doc_id': self.doc_ids[row],
+            'section': self.sections[row],
+            'content': self.contents[row],
+            'similarity': float(similarity),
+        }
+
+    def quantize(
+        self,
+        storage: str,
+        rescore_candidates: int = 64,
+        spill_dir: Optional[str] = None,
+        prefix_dims: Optional[int] = None,
+    ) -> "EmbeddingIndex":
+        """Switch to compact storage with exact rescoring.
+
+        The coarse pass scores every chunk against a float16 or int8 copy of
+        the matrix; only the best `rescore_candidates` rows are rescored with
+        full float32 precision. For float16/int8 the float32 matrix stays
+        memory-mapped (the KB snapshot already is; otherwise it is spilled to
+        a temp file), so resident memory is 2 bytes/dim (float16) or 1
+        byte/dim (int8) instead of 4. A float32 prefix keeps it in memory.
+
+        Args:
+            storage: "float32" (no-op), "float16" or "int8"
+            rescore_candidates: Rows rescored exactly per query (>= top_k)
+            spill_dir: Directory for the float32 spill file (default: tmp)
+            prefix_dims: Score the coarse pass on only the first `prefix_dims`
+                dimensions, re-normalized (Matryoshka truncation). None or a
+                value >= the index dimension keeps every dimension.
+
+        Returns:
+            self, for chaining
+        """
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"storage must be one of {STORAGE_MODES}, got '{storage}'")
+        if prefix_dims is not None and prefix_dims <= 0:
+            raise ValueError(f"prefix_dims must be positive, got {prefix_dims}")
+        if prefix_dims is not None and prefix_dims >= self.dimensions:
+            prefix_dims = None
+        if (storage == "float32" and prefix_dims is None) or len(self) == 0:
+            return self
+
+        source = self.matrix if prefix_dims is None else normalize_rows(np.array(self.matrix[:, :prefix_dims]))
+        if storage == "int8":
+            self.coarse, self.coarse_scales = quantize_int8(source)
+        else:
+            self.coarse, self.coarse_scales = source.astype(np.dtype(storage), copy=False), None
+        # A float32 prefix is a speed setting, not a memory one: the full
+        # matrix stays resident so rescoring doesn't page it back in
+        if storage != "float32" and not isinstance(self.matrix, np.memmap) and not isinstance(self.matrix.base, np.memmap):
+            self.matrix = _spill_to_memmap(self.matrix, spill_dir)
+        self.storage = storage
+        self.rescore_candidates = rescore_candidates
+        self.prefix_dims = prefix_dims
+        return self
+
+    @property
+    def resident_bytes(self) -> int:
+        """Bytes of embedding data that must stay in memory for scoring."""
+        if self.coarse is None:
+            return int(self.matrix.nbytes)
+        scales = self.coarse_scales.nbytes if self.coarse_scales is not None else 0
+        mapped = isinstance(self.matrix, np.memmap) or isinstance(self.matrix.base, np.memmap)
+        return int(self.coarse.nbytes + scales + (0 if mapped else self.matrix.nbytes))
+
+    def _coarse_scores(self, queries: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Approximate scores [Q, stop-start] from the compact matrix, block by block.
+
+        `queries` must already be truncated to the coarse dimension (see _scores).
+        """
+        if self.coarse.dtype == np.float32:
+            # Nothing to widen: one matmul over the slice, no block copies
+            return queries @ self.coarse[start:stop].T
+        scores = np.empty((queries.shape[0], stop - start), dtype=np.float32)
+        for block_start in range(start, stop, COARSE_BLOCK_ROWS):
+            block_stop = min(block_start + COARSE_BLOCK_ROWS, stop)
+            block = self.coarse[block_start:block_stop].astype(np.float32)
+            block_scores = queries @ block.T
+            if self.coarse_scales is not None:
+                block_scores *= self.coarse_scales[block_start:block_stop]
+            scores[:, block_start - start:block_stop - start] = block_scores
+        return scores
+
+    def _row_ranges(self, doc_ids: Optional[Union[str, Sequence[str]]]) -> List[Tuple[int, int]]:
+        """Row ranges to score: everything, or only the requested partitions."""
+        if doc_ids is None:
+            return [(0, len(self))]
+        if isinstance(doc_ids, str):
+            doc_ids = [doc_ids]
+        ranges: List[Tuple[int, int]] = []
+        for doc_id in dict.fromkeys(doc_ids):
+            ranges.extend(self.partitions.get(doc_id, ()))
+        return ranges
+
+    def partition_rows(self, doc_ids: Optional[Union[str, Sequence[str]]]) -> Optional[np.ndarray]:
+        """Row numbers of the requested partitions (None = every row)."""
+        if doc_ids is None:
+            return None
+        ranges = self._row_ranges(doc_ids)
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+    def _scores(self, queries: np.ndarray, ranges: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores [Q, M] over the selected row ranges plus their row numbers [M].
+
+        Scores are coarse (quantized and/or prefix-truncated) when compact
+        storage is enabled and exact otherwise.
+        """
+        parts: List[np.ndarray] = []
+        rows: List[np.ndarray] = []
+        coarse_queries = queries
+        if self.prefix_dims is not None:
+            coarse_queries = normalize_rows(np.array(queries[:, :self.prefix_dims]))
+        for start, stop in ranges:
+            if self.coarse is not None:
+                parts.append(self._coarse_scores(coarse_queries, start, stop))
+            else:
+                parts.append(queries @ self.matrix[start:stop].T)
+            rows.append(np.arange(start, stop))
+        if not parts:
+            return np.empty((queries.shape[0], 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0], rows[0]
+        return np.concatenate(parts, axis=1), np.concatenate(rows)
+
+    def _top_k_for_query(
+        self,
+        query: np.ndarray,
+        scores: np.ndarray,
+        rows: np.ndarray,
+        top_k: int,
+        threshold: float,
+    ) -> List[Dict[str, Any]]:
+        """Select top-k rows for one normalized query given its scores.
+
+        With compact storage, `scores` are coarse; the candidate rows are
+        rescored exactly against the float32 matrix before the final cut.
+        """
+        if self.coarse is not None:
+            candidates = np.sort(rows[self.top_k_indices(scores, max(top_k, self.rescore_candidates))])
+            exact = np.asarray(self.matrix[candidates]) @ query
+            order = self.top_k_indices(exact, top_k)
+            return [self.chunk(candidates[i], exact[i]) for i in order if exact[i] > threshold]
+
+        order = self.top_k_indices(scores, top_k)
+        return [self.chunk(rows[i], scores[i]) for i in order if scores[i] > threshold]
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int = 3,
+        threshold: float = 0.0,
+        doc_ids: Optional[Union[str, Sequence[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return up to `top_k` chunks with similarity above `threshold`.
+
+        Args:
+            query_embedding: Raw (unnormalized) query embedding
+            top_k: Maximum number of chunks to return
+            threshold: Minimum cosine similarity (exclusive)
+            doc_ids: Only score these partitions (None = whole index)
+
+        Returns:
+            Chunk dicts sorted by similarity, highest first
+        """
+        if len(self) == 0:
+            return []
+        if len(query_embedding) != self.dimensions:
+            raise ValueError(
+                f"Query embedding has {len(query_embedding)} dims, index has {self.dimensions}"
+            )
+
+        query = normalize_vector(query_embedding)
+        scores, rows = self._scores(query[None, :], self._row_ranges(doc_ids))
+        return self._top_k_for_query(query, scores[0], rows, top_k, threshold)
+
+    def search_many(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        top_k: int = 3,
+        threshold: float = 0.0,
+        doc_ids: Optional[Union[str, Sequence[str]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Batch version of `search`: one matrix-matrix product for Q queries.
+
+        Args:
+            query_embeddings: Q raw query embeddings of the index dimension
+            top_k: Maximum number of chunks per query
+            threshold: Minimum cosine similarity (exclusive)
+            doc_ids: Only score these partitions (None = whole index)
+
+        Returns:
+            One result list per query, in input order
+        """
+        if not len(query_embeddings):
+            return []
+        if len(self) == 0:
+            return [[] for _ in query_embeddings]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.dimensions:
+            raise ValueError(
+                f"Query embeddings have shape {queries.shape}, index has {self.dimensions} dims"
+            )
+
+        queries = normalize_rows(queries)
+        scores, rows = self._scores(queries, self._row_ranges(doc_ids))
+        return [
+            self._top_k_for_query(queries[q], scores[q], rows, top_k, threshold)
+            for q in range(queries.shape[0])
+        ]
@@ -0,0 +1,133 @@
+"""Versioned on-disk snapshot of the KB embedding index.
+
+Without a snapshot, a cold start (new Vercel container) must page every
+kb_chunks row out of Supabase and JSON-parse ~1536 floats per chunk before
+the first question can be answered. The snapshot turns that into a
+memory-mapped read of a raw float32 matrix.
+
+Layout (one directory, default vector_stores/kb_snapshot/):
+    embeddings.npy  float32[N, D] matrix, rows already L2-normalized
+    metadata.json   {format_version, kb_version, embedding_model, dimensions,
+                     count, created_at, ids, doc_ids, sections, contents}
+
+Lifecycle:
+1. scripts/migrate_all_kb_to_supabase.py writes it after every migration
+   (or on demand with --snapshot-only)
+2. PgVectorRetriever memory-maps it on first retrieval
+3. If its kb_version no longer matches Supabase, the retriever ignores it
+   and loads from Supabase as before (the snapshot is an accelerator, never
+   a source of truth)
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from src.retrieval.embedding_index import EmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MATRIX_FILENAME = "embeddings.npy"
+METADATA_FILENAME = "metadata.json"
+DEFAULT_SNAPSHOT_DIR = os.getenv("KB_SNAPSHOT_DIR", "vector_stores/kb_snapshot")
+
+
+def write_snapshot(index: EmbeddingIndex, directory: str, embedding_model: str) -> str:
+    """Write `index` to `directory` atomically.
+
+    Both files are written to temporary names and renamed into place, with
+    the metadata last, so a reader never sees a matrix paired with the wrong
+    metadata.
+
+    Returns:
+        The snapshot directory
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix_path = os.path.join(directory, MATRIX_FILENAME)
+    metadata_path = os.path.join(directory, METADATA_FILENAME)
+
+    metadata = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "kb_version": index.version,
+        "embedding_model": embedding_model,
+        "dimensions": index.dimensions,
+        "count": len(index),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "ids": [int(i) for i in index.ids],
+        "doc_ids": list(index.doc_ids),
+        "sections": list(index.sections),
+        "contents": list(index.contents),
+    }
+
+    tmp_matrix = matrix_path + ".tmp.npy"
+    np.save(tmp_matrix, np.ascontiguousarray(index.matrix, dtype=np.float32))
+    os.replace(tmp_matrix, matrix_path)
+
+    tmp_metadata = metadata_path + ".tmp"
+    with open(tmp_metadata, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+    os.replace(tmp_metadata, metadata_path)
+
+    logger.info(f"Wrote KB snapshot: {len(index)} chunks (version={index.version}) → {directory}")
+    return directory
+
+
+def read_snapshot_version(directory: str) -> Optional[str]:
+    """Return the kb_version recorded in a snapshot, or None if absent."""
+    try:
+        with open(os.path.join(directory, METADATA_FILENAME), encoding="utf-8") as f:
+            return json.load(f).get("kb_version")
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(directory: str, embedding_model: Optional[str] = None) -> Optional[EmbeddingIndex]:
+    """Memory-map a snapshot into an EmbeddingIndex.
+
+    Args:
+        directory: Snapshot directory
+        embedding_model: Reject snapshots built with a different model
+
+    Returns:
+        The index (matrix backed by the page cache), or None when the
+        snapshot is missing, incompatible or corrupt
+    """
+    matrix_path = os.path.join(directory, MATRIX_FILENAME)
+    metadata_path = os.path.join(directory, METADATA_FILENAME)
+    if not (os.path.exists(matrix_path) and os.path.exists(metadata_path)):
+        return None
+
+    try:
+        with open(metadata_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            logger.warning(f"Ignoring KB snapshot with format {metadata.get('format_version')}")
+            return None
+        if embedding_model and metadata.get("embedding_model") != embedding_model:
+            logger.warning(
+                f"Ignoring KB snapshot built with {metadata.get('embedding_model')} (expected {embedding_model})"
+            )
+            return None
+
+        matrix = np.load(matrix_path, mmap_mode="r")
+        if matrix.dtype != np.float32 or matrix.shape != (metadata["count"], metadata["dimensions"]):
+            logger.warning(f"Ignoring KB snapshot: matrix {matrix.dtype}{matrix.shape} disagrees with metadata")
+            return None
+
+        return EmbeddingIndex(
+            matrix,
+            metadata["ids"],
+            metadata["doc_ids"],
+            metadata["sections"],
+            metadata["contents"],
+            version=metadata.get("kb_version"),
+            normalized=True,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to load KB snapshot from {directory}: {e}")
+        return None
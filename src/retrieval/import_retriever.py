@@ -3,13 +3,20 @@
 This module provides tier-appropriate explanations for every library and framework
 used in the stack. It retrieves from imports_kb.csv based on user role and returns
 explanations with enterprise context.
+
+The CSV is parsed once per process into an ImportsIndex (rows keyed by
+(import, tier), per-tier rows with precomputed lowercase token sets for
+keyword scoring). Lookups only stat the file; the index is rebuilt when its
+mtime changes, so edits to imports_kb.csv are picked up without a restart.
 """
 
 import csv
 import logging
 import os
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -48,26 +55,115 @@ def _get_imports_kb_path() -> Path:
 IMPORTS_KB_PATH = _get_imports_kb_path()
 
 
-def _load_imports_kb() -> List[Dict[str, str]]:
+def _load_imports_kb(path: Optional[Path] = None) -> List[Dict[str, str]]:
     """Load import justifications from CSV file.
     
+    Args:
+        path: CSV to read (defaults to IMPORTS_KB_PATH)
+        
     Returns:
         List of dictionaries containing import metadata and explanations
     """
+    path = path or IMPORTS_KB_PATH
     imports = []
     try:
-        with open(IMPORTS_KB_PATH, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             for row in reader:
                 imports.append(row)
-        logger.info(f"Loaded {len(imports)} import explanations from {IMPORTS_KB_PATH}")
+        logger.info(f"Loaded {len(imports)} import explanations from {path}")
     except FileNotFoundError:
-        logger.warning(f"Imports KB not found at {IMPORTS_KB_PATH}")
+        logger.warning(f"Imports KB not found at {path}")
     except Exception as e:
         logger.error(f"Error loading imports KB: {e}")
     return imports
 
 
+@dataclass(frozen=True)
+class ImportsIndex:
+    """Parsed imports_kb.csv, indexed for lookups and keyword scoring.
+
+    Attributes:
+        rows: CSV rows in file order
+        by_key: (lowercase import, tier) → first matching row
+        import_names: Unique import names in file order
+        by_tier: tier → [(row, lowercase explanation tokens)] in file order
+    """
+    rows: List[Dict[str, str]]
+    by_key: Dict[Tuple[str, str], Dict[str, str]]
+    import_names: List[str]
+    by_tier: Dict[str, List[Tuple[Dict[str, str], FrozenSet[str]]]]
+
+    @classmethod
+    def build(cls, rows: List[Dict[str, str]]) -> "ImportsIndex":
+        by_key: Dict[Tuple[str, str], Dict[str, str]] = {}
+        by_tier: Dict[str, List[Tuple[Dict[str, str], FrozenSet[str]]]] = {}
+        for row in rows:
+            by_key.setdefault((row["import"].lower(), row["tier"]), row)
+            by_tier.setdefault(row["tier"], []).append(
+                (row, frozenset(row["explanation"].lower().split()))
+            )
+        import_names = list(dict.fromkeys(row["import"] for row in rows))
+        return cls(rows=rows, by_key=by_key, import_names=import_names, by_tier=by_tier)
+
+
+class ImportsKBStore:
+    """Process-wide holder of the ImportsIndex, reloaded when the CSV's mtime changes."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime_ns: Optional[int] = None
+        self._index: Optional[ImportsIndex] = None
+
+    def _stat_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self) -> ImportsIndex:
+        """Current index; one stat() per call, CSV parsed only when it changed."""
+        mtime_ns = self._stat_mtime()
+        index = self._index
+        if index is not None and mtime_ns == self._mtime_ns:
+            return index
+        with self._lock:
+            if self._index is None or mtime_ns != self._mtime_ns:
+                self._index = ImportsIndex.build(_load_imports_kb(self.path))
+                self._mtime_ns = mtime_ns
+            return self._index
+
+
+_imports_store: Optional[ImportsKBStore] = None
+
+
+def get_imports_index() -> ImportsIndex:
+    """Indexed imports KB for IMPORTS_KB_PATH (shared across requests)."""
+    global _imports_store
+    store = _imports_store
+    if store is None or store.path != Path(IMPORTS_KB_PATH):
+        store = _imports_store = ImportsKBStore(IMPORTS_KB_PATH)
+    return store.get()
+
+
+def _find_explanation(index: ImportsIndex, import_name: str, tier: str) -> Optional[Dict[str, str]]:
+    key = import_name.lower()
+    match = index.by_key.get((key, tier))
+    if match is not None:
+        return match
+    
+    # Fallback to tier 1 if specific tier not found
+    if tier != "1":
+        match = index.by_key.get((key, "1"))
+        if match is not None:
+            logger.info(f"Falling back to tier 1 for {import_name}")
+            return match
+    
+    logger.warning(f"No explanation found for import: {import_name}")
+    return None
+
+
 def get_import_explanation(
     import_name: str,
     role: str,
@@ -83,26 +179,12 @@ def get_import_explanation(
     Returns:
         Dictionary with explanation fields, or None if not found
     """
-    imports = _load_imports_kb()
-    
     # Determine tier from role if not explicitly provided
     if tier is None:
         tier = ROLE_TO_TIER.get(role, "1")
     
-    # Find matching import at specified tier
-    for imp in imports:
-        if imp["import"].lower() == import_name.lower() and imp["tier"] == tier:
-            return imp
-    
-    # Fallback to tier 1 if specific tier not found
-    if tier != "1":
-        for imp in imports:
-            if imp["import"].lower() == import_name.lower() and imp["tier"] == "1":
-                logger.info(f"Falling back to tier 1 for {import_name}")
-                return imp
-    
-    logger.warning(f"No explanation found for import: {import_name}")
-    return None
+    match = _find_explanation(get_imports_index(), import_name, tier)
+    return dict(match) if match is not None else None
 
 
 def get_all_imports_for_role(role: str) -> List[Dict[str, str]]:
@@ -113,19 +195,17 @@ def get_all_imports_for_role(role: str) -> List[Dict[str, str]]:
         
     Returns:
         List of import explanation dictionaries at appropriate tier
+        (in imports_kb.csv order)
     """
-    imports = _load_imports_kb()
+    index = get_imports_index()
     tier = ROLE_TO_TIER.get(role, "1")
     
-    # Get unique import names
-    import_names = list(set(imp["import"] for imp in imports))
-    
-    # Get tier-appropriate explanation for each
+    # Get tier-appropriate explanation for each unique import
     results = []
-    for name in import_names:
-        explanation = get_import_explanation(name, role, tier)
+    for name in index.import_names:
+        explanation = _find_explanation(index, name, tier)
         if explanation:
-            results.append(explanation)
+            results.append(dict(explanation))
     
     return results
 
@@ -141,16 +221,14 @@ def search_import_explanations(query: str, role: str, top_k: int = 3) -> List[Di
     Returns:
         List of relevant import explanations
     """
-    imports = _load_imports_kb()
+    index = get_imports_index()
     tier = ROLE_TO_TIER.get(role, "1")
     lowered_query = query.lower()
+    query_words = set(lowered_query.split())
     
     # Score each import by relevance
     scored_imports = []
-    for imp in imports:
-        if imp["tier"] != tier:
-            continue
-        
+    for imp, explanation_words in index.by_tier.get(tier, []):
         score = 0
         import_name = imp["import"].lower()
         
@@ -162,12 +240,8 @@ def search_import_explanations(query: str, role: str, top_k: int = 3) -> List[Di
         if imp["category"].lower() in lowered_query:
             score += 5
         
-        # Keyword matches in explanation
-        explanation_text = imp["explanation"].lower()
-        query_words = set(lowered_query.split())
-        explanation_words = set(explanation_text.split())
-        common_words = query_words & explanation_words
-        score += len(common_words)
+        # Keyword matches in explanation (token sets precomputed at load)
+        score += len(query_words & explanation_words)
         
         # Alternative mentions (e.g., "pinecone" matches pgvector alternative)
         if "alternative" in imp and lowered_query in imp["enterprise_alternative"].lower():
@@ -178,7 +252,7 @@ def search_import_explanations(query: str, role: str, top_k: int = 3) -> List[Di
     
     # Sort by score and return top_k
     scored_imports.sort(key=lambda x: x[0], reverse=True)
-    return [imp for _, imp in scored_imports[:top_k]]
+    return [dict(imp) for _, imp in scored_imports[:top_k]]
 
 
 def detect_import_in_query(query: str) -> Optional[str]:
@@ -22,17 +22,81 @@ Architecture:
     Return chunks + similarity scores
         ↓
     Log to retrieval_logs (for evaluation)
+
+Search modes (PGVECTOR_SEARCH_MODE):
+    "local" (default): The KB is small enough to score in memory, so the
+        retriever keeps a resident EmbeddingIndex (contiguous float32 matrix
+        of normalized chunk embeddings). It is loaded from kb_chunks once,
+        re-checked against the KB version at most every
+        `index_refresh_interval` seconds, and reloaded only when the KB
+        actually changed. On a cold start the index is memory-mapped from
+        the KB snapshot (vector_stores/kb_snapshot/) when its version is
+        current.
+    "rpc": Sends only the query vector to search_kb_chunks (migration 004)
+        and gets back k rows. doc_id filtering and the threshold run in SQL
+        against the ivfflat index, so this mode scales past what fits in
+        memory. Falls back to the local index if the RPC call fails.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+import numpy as np
 from openai import OpenAI
 
 from src.config.supabase_config import get_supabase_client, supabase_settings
 from src.analytics.supabase_analytics import supabase_analytics, RetrievalLogData
+from src.observability.profiling import span
+from src.retrieval.bm25_index import BM25Index
+from src.retrieval.embedding_cache import EmbeddingCache, get_embedding_cache
+from src.retrieval.embedding_index import STORAGE_MODES, EmbeddingIndex, normalize_vector
+from src.retrieval.role_affinity import (
+    DEFAULT_ROLE_WEIGHTS,
+    PROFILE_COLUMNS,
+    role_keyword_matrix,
+    role_profile,
+)
+from src.retrieval.embedding_snapshot import DEFAULT_SNAPSHOT_DIR, load_snapshot, write_snapshot
 
 logger = logging.getLogger(__name__)
 
+# How many kb_chunks rows to fetch per PostgREST request when loading the index
+INDEX_PAGE_SIZE = 1000
+
+# Seconds between KB version checks (a cheap count/max(updated_at) query)
+DEFAULT_INDEX_REFRESH_SECONDS = float(os.getenv("KB_INDEX_REFRESH_SECONDS", "300"))
+
+# OpenAI accepts up to this many inputs per embeddings.create call
+# (same batch size as scripts/migrate_all_kb_to_supabase.py)
+EMBED_BATCH_SIZE = 100
+
+# Resident storage for the in-process index: float32, float16 or int8
+# (compact modes rescore a small candidate set at full precision)
+DEFAULT_INDEX_STORAGE = os.getenv("KB_INDEX_STORAGE", "float32").strip().lower()
+
+# Matryoshka prefilter: score the first N dims, rescore candidates at full
+# dimension (0 = off). 256 or 512 suit text-embedding-3-small.
+DEFAULT_INDEX_PREFIX_DIMS = int(os.getenv("KB_INDEX_PREFIX_DIMS", "0"))
+
+# Candidates rescored at full precision/dimension per query in compact modes
+DEFAULT_RESCORE_CANDIDATES = int(os.getenv("KB_INDEX_RESCORE_CANDIDATES", "64"))
+
+# "local" = in-process EmbeddingIndex, "rpc" = server-side search_kb_chunks
+SEARCH_MODES = ("local", "rpc")
+DEFAULT_SEARCH_MODE = os.getenv("PGVECTOR_SEARCH_MODE", "local").strip().lower()
+
+
+def to_vector_literal(embedding: List[float]) -> str:
+    """Serialize an embedding as a pgvector text literal ("[0.1,0.2,...]").
+    
+    PostgREST hands RPC arguments to Postgres as text, and pgvector's input
+    function parses this form directly. Sending a JSON array instead is what
+    made the original RPC path unreliable.
+    """
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
 
 class PgVectorRetriever:
     """pgvector-based retrieval service using Supabase.
@@ -64,7 +128,20 @@ class PgVectorRetriever:
         )
     """
     
-    def __init__(self, similarity_threshold: float = 0.60):
+    def __init__(
+        self,
+        similarity_threshold: float = 0.60,
+        openai_client: Optional[Any] = None,
+        supabase_client: Optional[Any] = None,
+        index_refresh_interval: float = DEFAULT_INDEX_REFRESH_SECONDS,
+        search_mode: str = DEFAULT_SEARCH_MODE,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        snapshot_dir: Optional[str] = DEFAULT_SNAPSHOT_DIR,
+        index_storage: str = DEFAULT_INDEX_STORAGE,
+        index_prefix_dims: int = DEFAULT_INDEX_PREFIX_DIMS,
+        rescore_candidates: int = DEFAULT_RESCORE_CANDIDATES,
+        role_weights: Optional[Dict[str, float]] = None
+    ):
         """Initialize retriever with OpenAI and Supabase clients.
         
         Args:
@@ -72,6 +149,24 @@ class PgVectorRetriever:
                 Default 0.60 balances precision and recall for diverse queries.
                 Lower (0.5-0.55) for broader results.
                 Higher (0.70+) for strict matching.
+            openai_client: Optional pre-built OpenAI client (tests inject fakes)
+            supabase_client: Optional pre-built Supabase client (tests inject fakes)
+            index_refresh_interval: Seconds between KB version checks for the
+                in-process embedding index (0 = check on every query)
+            search_mode: "local" (in-process index) or "rpc" (server-side
+                search_kb_chunks). See module docstring.
+            embedding_cache: Query-embedding cache (defaults to the
+                process-wide cache from get_embedding_cache())
+            snapshot_dir: Directory of the memory-mapped KB snapshot written by
+                the migration script (None disables snapshot loading)
+            index_storage: "float32", "float16" or "int8" resident storage
+                for the in-process index (see EmbeddingIndex.quantize)
+            index_prefix_dims: Coarse-score only this many leading embedding
+                dims before full-dimension rescoring (0 = all dims)
+            rescore_candidates: Candidates rescored exactly per query when
+                compact storage or a prefix prefilter is enabled
+            role_weights: Per-profile keyword boost for retrieve_for_role
+                ("technical", "career", "casual"); merged over the defaults
         
         Why 0.60:
         - Lowered from 0.7 to 0.60 to improve recall on technical queries
@@ -79,21 +174,41 @@ class PgVectorRetriever:
         - Captures semantically similar queries without requiring exact phrasing
         - Trade-off: Slight increase in false positives, but better user experience
         """
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"search_mode must be one of {SEARCH_MODES}, got '{search_mode}'")
+        if index_storage not in STORAGE_MODES:
+            raise ValueError(f"index_storage must be one of {STORAGE_MODES}, got '{index_storage}'")
+        
         self.similarity_threshold = similarity_threshold
-        self.openai_client = OpenAI(api_key=supabase_settings.api_key)
-        self.supabase_client = get_supabase_client()
+        self.search_mode = search_mode
+        self.openai_client = openai_client or OpenAI(api_key=supabase_settings.api_key)
+        self.supabase_client = supabase_client or get_supabase_client()
         
         # Embedding model configuration
         self.embedding_model = "text-embedding-3-small"
         self.embedding_dimensions = 1536
-        
-        logger.info(f"PgVectorRetriever initialized with threshold={similarity_threshold}")
+        self.embedding_cache = embedding_cache if embedding_cache is not None else get_embedding_cache()
+        
+        # In-process embedding index (lazy: loaded on first retrieval)
+        self.index_refresh_interval = index_refresh_interval
+        self.snapshot_dir = snapshot_dir
+        self.index_storage = index_storage
+        self.index_prefix_dims = index_prefix_dims
+        self.rescore_candidates = rescore_candidates
+        self.role_weights = {**DEFAULT_ROLE_WEIGHTS, **(role_weights or {})}
+        self._index: Optional[EmbeddingIndex] = None
+        self._index_checked_at = 0.0
+        self._index_lock = threading.Lock()
+        self._kb_change_listeners: List[Callable[[Optional[str]], None]] = []
+        
+        logger.info(f"PgVectorRetriever initialized with threshold={similarity_threshold}, search_mode={search_mode}")
     
-    def embed(self, text: str) -> List[float]:
+    def embed(self, text: str, use_cache: bool = True) -> List[float]:
         """Generate embedding vector for text.
         
         Args:
             text: Input text to embed
+            use_cache: Serve repeat queries from the embedding cache
             
         Returns:
             1536-dimensional embedding vector
@@ -108,32 +223,104 @@ class PgVectorRetriever:
         - Returns empty list on failure (caller should check)
         - Logs error for observability
         - Allows graceful degradation
+        
+        Caching:
+        - retrieve, retrieve_for_role and retrieve_and_log all embed through
+          here, so suggested questions and vague-query expansions skip the
+          100-400ms OpenAI round trip after the first ask
+        - Failures are never cached
         """
+        if use_cache:
+            cached = self.embedding_cache.get(self.embedding_model, text)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=text
-            )
-            return response.data[0].embedding
+            with span("embed"):
+                response = self.openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=text
+                )
+            embedding = response.data[0].embedding
+            if use_cache:
+                self.embedding_cache.put(self.embedding_model, text, embedding)
+            return embedding
         
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}")
             return []
     
+    def embed_many(self, texts: List[str], use_cache: bool = True) -> List[List[float]]:
+        """Embed several texts with one embeddings.create call per batch.
+        
+        Args:
+            texts: Input texts (duplicates are embedded once)
+            use_cache: Serve/populate the embedding cache
+            
+        Returns:
+            One embedding per input text, in input order. Texts whose batch
+            failed get an empty list, mirroring embed().
+            
+        Why batch:
+        - Evaluation replays, cache warming and multi-query expansion would
+          otherwise pay one 100-400ms round trip per text
+        - The endpoint takes up to EMBED_BATCH_SIZE inputs per request
+        """
+        results: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        seen = set()
+        for text in texts:
+            if text in seen:
+                continue
+            seen.add(text)
+            cached = self.embedding_cache.get(self.embedding_model, text) if use_cache else None
+            if cached is not None:
+                results[text] = cached
+            else:
+                missing.append(text)
+        
+        for start in range(0, len(missing), EMBED_BATCH_SIZE):
+            batch = missing[start:start + EMBED_BATCH_SIZE]
+            try:
+                with span("embed"):
+                    response = self.openai_client.embeddings.create(
+                        model=self.embedding_model,
+                        input=batch
+                    )
+                # Response items carry their input position; don't rely on order
+                for position, item in enumerate(response.data):
+                    index = getattr(item, 'index', position)
+                    results[batch[index]] = item.embedding
+                    if use_cache:
+                        self.embedding_cache.put(self.embedding_model, batch[index], item.embedding)
+            except Exception as e:
+                logger.error(f"Batch embedding generation failed ({len(batch)} texts): {e}")
+        
+        return [results.get(text, []) for text in texts]
+    
     def retrieve(
         self,
         query: str,
         top_k: int = 3,
         threshold: Optional[float] = None,
-        doc_id: Optional[str] = None
+        doc_id: Optional[Union[str, Sequence[str]]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
-        """Retrieve similar chunks from Supabase using pgvector.
+        """Retrieve similar chunks from the KB.
+        
+        Scores the query against the resident in-process embedding index
+        (one matrix-vector product + argpartition) instead of downloading
+        kb_chunks on every query. The index reloads when the KB changes.
+        A doc_id filter selects index partitions *before* top-k, so only
+        those chunks are scored and up to top_k matches always come back.
         
         Args:
             query: Search query text
             top_k: Number of results to return (default 3)
             threshold: Override default similarity threshold
-            doc_id: Filter by document ID (e.g., 'career_kb', 'code_index')
+            doc_id: Restrict to one document ID or a list of them (e.g.
+                'career_kb' or ['technical_kb', 'architecture_kb'])
+            query_embedding: Precomputed embedding of `query` (skips embed())
             
         Returns:
             List of chunk dicts with keys:
@@ -154,75 +341,360 @@ class PgVectorRetriever:
         if threshold is None:
             threshold = self.similarity_threshold
         
-        # Generate query embedding
-        embedding = self.embed(query)
+        # Generate query embedding (unless the caller already has it)
+        embedding = query_embedding if query_embedding is not None else self.embed(query)
         if not embedding:
             logger.warning("Empty embedding, returning no results")
             return []
         
-        # Convert to list of native Python floats
-        embedding = [float(x) for x in embedding]
+        if self.search_mode == "rpc":
+            try:
+                return self._retrieve_rpc(embedding, top_k, threshold, doc_id)
+            except Exception as e:
+                logger.warning(f"search_kb_chunks RPC failed, falling back to local index: {e}")
         
         try:
-            # WORKAROUND: PostgREST has issues with the RPC function
-            # So we fetch all chunks and compute similarity client-side
-            logger.debug(f"Fetching all chunks for client-side similarity calculation")
+            with span("fetch"):
+                index = self._ensure_index()
+            with span("score"):
+                chunks = index.search(embedding, top_k=top_k, threshold=threshold, doc_ids=doc_id or None)
             
-            # Fetch all chunks with embeddings
-            # Increased limit to accommodate all KBs: career_kb (20) + technical_kb (13) + architecture_kb (245) = 278 total
-            result = self.supabase_client.table('kb_chunks')\
-                .select('id, doc_id, section, content, embedding')\
-                .limit(500)\
-                .execute()
+            logger.debug(f"Retrieved {len(chunks)} chunks for query: '{query[:50]}...' (in-process index)")
+            return chunks
+        
+        except Exception as e:
+            logger.error(f"pgvector retrieval failed: {e}")
+            return []
+    
+    def lexical_search(
+        self,
+        query: str,
+        top_k: int = 3,
+        doc_id: Optional[Union[str, Sequence[str]]] = None,
+        query_embedding: Optional[List[float]] = None,
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """BM25 keyword search over the resident index.
+        
+        Catches exact identifiers ("pgvector", "Twilio", "retrieve_chunks")
+        that embed poorly. Each hit carries its true cosine `similarity`
+        (the query embedding comes from the embedding cache, so this adds
+        no API call after retrieve()) plus its `bm25_score`. Hits below the
+        similarity threshold are dropped, same as in retrieve(), so fusing
+        them in never admits chunks the vector search would have rejected.
+        
+        Args:
+            threshold: Override default similarity threshold
+        
+        Returns:
+            Chunks ranked by BM25 (empty in RPC mode before any local load,
+            or on failure)
+        """
+        if threshold is None:
+            threshold = self.similarity_threshold
+        
+        try:
+            if self.search_mode == "rpc" and self._index is None:
+                return []
+            index = self._ensure_index()
+            if index.lexical is None or len(index) == 0:
+                return []
             
-            if not result.data:
-                logger.warning("No chunks found in database")
+            with span("lexical"):
+                rows, bm25_scores = index.lexical.search(query, top_k, rows=index.partition_rows(doc_id or None))
+            if rows.size == 0:
                 return []
             
-            # Calculate cosine similarity client-side
-            import numpy as np
-            query_vec = np.array(embedding)
+            embedding = query_embedding if query_embedding is not None else self.embed(query)
+            if embedding and len(embedding) == index.dimensions:
+                similarities = np.asarray(index.matrix[np.sort(rows)]) @ normalize_vector(embedding)
+                similarity_by_row = dict(zip(np.sort(rows).tolist(), similarities.tolist()))
+            else:
+                similarity_by_row = {}
+            
+            return [
+                {**index.chunk(row, similarity_by_row.get(row, 0.0)), 'bm25_score': float(score)}
+                for row, score in zip(rows.tolist(), bm25_scores.tolist())
+                if similarity_by_row.get(row, 0.0) >= threshold
+            ]
+        
+        except Exception as e:
+            logger.error(f"Lexical retrieval failed: {e}")
+            return []
+    
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        threshold: Optional[float] = None,
+        doc_id: Optional[Union[str, Sequence[str]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Retrieve for several queries at once.
+        
+        All queries are embedded with embed_many() and, in local mode,
+        scored together as one matrix-matrix product against the resident
+        index. RPC mode issues one search_kb_chunks call per query (the
+        query vectors are still embedded in one batch).
+        
+        Args:
+            queries: Search query texts
+            top_k, threshold, doc_id: Same as retrieve()
             
-            chunks_with_similarity = []
-            for chunk in result.data:
-                if not chunk.get('embedding'):
-                    continue
-                
-                # Parse embedding
-                chunk_emb = chunk['embedding']
-                if isinstance(chunk_emb, str):
-                    import json
-                    chunk_emb = json.loads(chunk_emb)
-                
-                # Calculate cosine similarity
-                chunk_vec = np.array(chunk_emb)
-                similarity = 1 - np.dot(query_vec, chunk_vec) / (
-                    np.linalg.norm(query_vec) * np.linalg.norm(chunk_vec)
+        Returns:
+            One chunk list per query, in input order (empty on failure)
+        """
+        if threshold is None:
+            threshold = self.similarity_threshold
+        if not queries:
+            return []
+        
+        embeddings = self.embed_many(queries)
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        pending = [i for i, embedding in enumerate(embeddings) if embedding]
+        if len(pending) < len(queries):
+            logger.warning(f"{len(queries) - len(pending)} of {len(queries)} queries have no embedding")
+        
+        if self.search_mode == "rpc":
+            remaining = []
+            for i in pending:
+                try:
+                    results[i] = self._retrieve_rpc(embeddings[i], top_k, threshold, doc_id)
+                except Exception as e:
+                    logger.warning(f"search_kb_chunks RPC failed, falling back to local index: {e}")
+                    remaining.append(i)
+            pending = remaining
+        
+        if not pending:
+            return results
+        
+        try:
+            with span("fetch"):
+                index = self._ensure_index()
+            with span("score"):
+                batched = index.search_many(
+                    [embeddings[i] for i in pending], top_k=top_k, threshold=threshold, doc_ids=doc_id or None
                 )
-                similarity = 1 - similarity  # Convert distance to similarity
-                
-                chunks_with_similarity.append({
-                    'id': chunk['id'],
-                    'doc_id': chunk['doc_id'],
-                    'section': chunk['section'],
-                    'content': chunk['content'],
-                    'similarity': float(similarity)
-                })
+            for i, chunks in zip(pending, batched):
+                results[i] = chunks
+        except Exception as e:
+            logger.error(f"pgvector batch retrieval failed: {e}")
+        
+        return results
+    
+    def _retrieve_rpc(
+        self,
+        embedding: List[float],
+        top_k: int,
+        threshold: float,
+        doc_id: Optional[Union[str, Sequence[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Server-side top-k via the search_kb_chunks RPC (migration 004).
+        
+        Only the query vector goes up and only k rows come back. The
+        threshold and doc_id filter are applied in SQL, next to the
+        ivfflat index, so results are never under-filled by a client-side
+        post-filter.
+        
+        Raises:
+            Exception: Propagates PostgREST errors so retrieve() can fall back
+        """
+        with span("fetch"):
+            result = self.supabase_client.rpc('search_kb_chunks', {
+                'query_embedding': to_vector_literal(embedding),
+                'match_threshold': float(threshold),
+                'match_count': int(top_k),
+                'filter_doc_ids': ([doc_id] if isinstance(doc_id, str) else list(doc_id)) if doc_id else None
+            }).execute()
+        
+        chunks = [
+            {
+                'id': row['id'],
+                'doc_id': row['doc_id'],
+                'section': row['section'],
+                'content': row['content'],
+                'similarity': float(row['similarity'])
+            }
+            for row in (result.data or [])
+        ]
+        logger.debug(f"Retrieved {len(chunks)} chunks via search_kb_chunks RPC")
+        return chunks
+    
+    # ========== IN-PROCESS INDEX ==========
+    def _fetch_kb_version(self) -> str:
+        """Return an opaque version string for the current kb_chunks contents.
+        
+        Uses row count plus the newest updated_at, which changes whenever the
+        migration script deletes/re-inserts or updates chunks. This is one
+        tiny query instead of downloading every embedding.
+        """
+        result = self.supabase_client.table('kb_chunks')\
+            .select('updated_at', count='exact')\
+            .order('updated_at', desc=True)\
+            .limit(1)\
+            .execute()
+        latest = result.data[0].get('updated_at') if result.data else None
+        return f"{getattr(result, 'count', None)}:{latest}"
+    
+    def _fetch_index_rows(self) -> List[Dict[str, Any]]:
+        """Page through every kb_chunks row (embeddings included)."""
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            result = self.supabase_client.table('kb_chunks')\
+                .select('id, doc_id, section, content, embedding')\
+                .order('id')\
+                .range(start, start + INDEX_PAGE_SIZE - 1)\
+                .execute()
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < INDEX_PAGE_SIZE:
+                return rows
+            start += INDEX_PAGE_SIZE
+    
+    def load_index(self, version: Optional[str] = None) -> EmbeddingIndex:
+        """(Re)build the in-process embedding index from Supabase.
+        
+        Args:
+            version: KB version the rows correspond to (fetched if omitted)
+        
+        Returns:
+            The freshly loaded index (also stored on the retriever)
+        """
+        if version is None:
+            version = self._fetch_kb_version()
+        started = time.perf_counter()
+        index = self._prepare_index(EmbeddingIndex.from_rows(self._fetch_index_rows(), version=version))
+        self._index = index
+        self._index_checked_at = time.monotonic()
+        logger.info(
+            f"Loaded embedding index: {len(index)} chunks x {index.dimensions} dims "
+            f"(version={version}, storage={index.storage}) in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return index
+    
+    def _prepare_index(self, index: EmbeddingIndex) -> EmbeddingIndex:
+        """Per-load work shared by Supabase and snapshot loads.
+        
+        - Compact storage (KB_INDEX_STORAGE) and the Matryoshka prefix
+          prefilter (KB_INDEX_PREFIX_DIMS)
+        - Role keyword features, computed once per chunk so role reranking
+          never scans chunk text per request
+        - BM25 postings for lexical_search()
+        """
+        index.quantize(
+            self.index_storage,
+            rescore_candidates=self.rescore_candidates,
+            prefix_dims=self.index_prefix_dims or None,
+        )
+        index.role_features = role_keyword_matrix(index.contents)
+        index.lexical = BM25Index.from_texts(index.contents)
+        return index
+    
+    def _load_initial_index(self) -> EmbeddingIndex:
+        """First load: memory-map the snapshot if it is current, else use Supabase.
+        
+        Why check the version first:
+        - A cold start then costs one tiny version query plus a page-cache
+          read, instead of a multi-MB JSON download and parse
+        - A stale snapshot (KB re-migrated without redeploying) is never served
+        - If the version query itself fails, the snapshot is still better
+          than no index at all
+        """
+        snapshot = load_snapshot(self.snapshot_dir, self.embedding_model) if self.snapshot_dir else None
+        if snapshot is None:
+            return self.load_index()
+        
+        try:
+            version = self._fetch_kb_version()
+        except Exception as e:
+            logger.warning(f"KB version check failed, serving snapshot {snapshot.version}: {e}")
+            version = snapshot.version
+        
+        if version != snapshot.version:
+            logger.info(f"KB snapshot is stale ({snapshot.version} → {version}), loading from Supabase")
+            return self.load_index(version)
+        
+        self._index = self._prepare_index(snapshot)
+        self._index_checked_at = time.monotonic()
+        logger.info(f"Memory-mapped KB snapshot: {len(snapshot)} chunks (version={snapshot.version})")
+        return snapshot
+    
+    def export_snapshot(self, directory: Optional[str] = None) -> str:
+        """Load the current KB from Supabase and write it as a snapshot.
+        
+        Called by scripts/migrate_all_kb_to_supabase.py after a migration.
+        The snapshot's kb_version comes from _fetch_kb_version(), so it
+        compares equal to what retrievers see at startup.
+        
+        Returns:
+            The snapshot directory
+        """
+        index = self.load_index()
+        return write_snapshot(index, directory or self.snapshot_dir or DEFAULT_SNAPSHOT_DIR, self.embedding_model)
+    
+    @property
+    def kb_version(self) -> Optional[str]:
+        """Version of the resident index (None until loaded, and in rpc mode)."""
+        index = self._index
+        return index.version if index is not None else None
+    
+    def on_kb_change(self, callback: Callable[[Optional[str]], None]) -> None:
+        """Register `callback(new_version)` to run when the KB is reloaded or invalidated.
+        
+        Used to drop caches derived from KB content (e.g. the semantic
+        answer cache) when the KB is re-migrated.
+        """
+        if callback not in self._kb_change_listeners:
+            self._kb_change_listeners.append(callback)
+    
+    def _notify_kb_change(self, version: Optional[str]) -> None:
+        for callback in list(self._kb_change_listeners):
+            try:
+                callback(version)
+            except Exception as e:
+                logger.warning(f"KB change listener failed: {e}")
+    
+    def invalidate_index(self) -> None:
+        """Drop the resident index so the next query reloads it."""
+        with self._index_lock:
+            self._index = None
+            self._index_checked_at = 0.0
+        self._notify_kb_change(None)
+    
+    def _ensure_index(self) -> EmbeddingIndex:
+        """Return a current index, reloading only when the KB changed.
+        
+        Why throttled version checks:
+        - The KB changes rarely (on re-migration), queries happen constantly
+        - A version check is one small query; a reload is a full-table fetch
+        - If the version check itself fails, keep serving the resident index
+        
+        KB change listeners run after the lock is released, so concurrent
+        queries don't wait on them (as in invalidate_index).
+        """
+        with self._index_lock:
+            if self._index is None:
+                return self._load_initial_index()
             
-            # Sort by similarity (highest first) and apply threshold
-            chunks_with_similarity.sort(key=lambda x: x['similarity'], reverse=True)
-            chunks = [c for c in chunks_with_similarity if c['similarity'] > threshold][:top_k]
+            now = time.monotonic()
+            if now - self._index_checked_at < self.index_refresh_interval:
+                return self._index
             
-            # Filter by doc_id if specified
-            if doc_id:
-                chunks = [c for c in chunks if c.get('doc_id') == doc_id]
+            try:
+                version = self._fetch_kb_version()
+            except Exception as e:
+                logger.warning(f"KB version check failed, keeping resident index: {e}")
+                self._index_checked_at = now
+                return self._index
             
-            logger.debug(f"Retrieved {len(chunks)} chunks for query: '{query[:50]}...' (client-side calc)")
-            return chunks
-        
-        except Exception as e:
-            logger.error(f"pgvector retrieval failed: {e}")
-            return []
+            if version == self._index.version:
+                self._index_checked_at = now
+                return self._index
+            
+            logger.info(f"KB changed ({self._index.version} → {version}), reloading index")
+            index = self.load_index(version)
+        self._notify_kb_change(version)
+        return index
     
     def retrieve_and_log(
         self,
@@ -292,9 +764,12 @@ class PgVectorRetriever:
         query: str,
         role: str,
         top_k: int = 3,
-        threshold: Optional[float] = None
+        threshold: Optional[float] = None,
+        role_weights: Optional[Dict[str, float]] = None,
+        query_embedding: Optional[List[float]] = None,
+        candidates: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
-        """Retrieve with role-specific filtering.
+        """Retrieve with role-specific reranking.
         
         Different roles need different types of information:
         - **Technical roles**: Code examples, architecture, implementation details
@@ -302,130 +777,65 @@ class PgVectorRetriever:
         - **Casual users**: Fun facts, personal interests, MMA background
         
         Strategy:
-        1. Retrieve more candidates than needed (top_k * 2)
-        2. Filter/score based on role preferences
-        3. Return top_k after filtering
+        1. Retrieve more candidates than needed (top_k * 2, one embedding)
+        2. Boost each candidate by weight × its precomputed role keyword count
+        3. Return top_k by boosted similarity
         
         Args:
             query: Search query
             role: User role (e.g., "Software Developer", "Hiring Manager")
             top_k: Final number of results
             threshold: Optional similarity threshold
+            role_weights: Per-call override of the per-profile boost weights
+            query_embedding: Precomputed embedding of `query` (skips embed())
+            candidates: Chunks already retrieved for this query (e.g. the
+                conversation state's retrieved_chunks); reranked as-is, with
+                no embedding call or index search
             
         Returns:
-            Filtered and re-ranked chunks
-            
-        Why this approach:
-        - Maintains high retrieval quality (start with good candidates)
-        - Adds role-specific intelligence
-        - Still fast (pgvector does heavy lifting)
-        - Extensible (easy to add new role logic)
-        """
-        # Retrieve more candidates for filtering
-        candidates = self.retrieve(query, top_k * 2, threshold)
-        
-        if not candidates:
-            return []
-        
-        # Apply role-specific filtering/scoring
-        if "technical" in role.lower() or "developer" in role.lower():
-            # Prefer technical content
-            filtered = self._filter_technical(candidates)
-        
-        elif "hiring" in role.lower() or "manager" in role.lower():
-            # Prefer career/achievement content
-            filtered = self._filter_career(candidates)
-        
-        elif "looking around" in role.lower() or "casual" in role.lower():
-            # Prefer fun/personal content
-            filtered = self._filter_casual(candidates)
-        
-        else:
-            # No filtering, use as-is
-            filtered = candidates
-        
-        # Return top_k after filtering
-        return filtered[:top_k]
-    
-    def _filter_technical(self, chunks: List[Dict]) -> List[Dict]:
-        """Boost technical content for developer roles.
-        
-        Technical indicators:
-        - Mentions of code, programming, implementation
-        - Technology names (Python, AI, ML, etc.)
-        - Architecture or design patterns
-        """
-        technical_keywords = [
-            'code', 'python', 'programming', 'implementation', 'architecture',
-            'ai', 'ml', 'api', 'database', 'algorithm', 'data structure',
-            'langchain', 'rag', 'vector', 'embedding', 'model'
-        ]
-        
-        # Score each chunk by technical keyword density
-        scored = []
-        for chunk in chunks:
-            content_lower = chunk['content'].lower()
-            tech_score = sum(1 for kw in technical_keywords if kw in content_lower)
+            Re-ranked chunks (fresh dicts with `_boosted_similarity`)
             
-            # Boost similarity by technical score
-            chunk['_tech_score'] = tech_score
-            chunk['_boosted_similarity'] = chunk['similarity'] + (tech_score * 0.02)
-            scored.append(chunk)
-        
-        # Sort by boosted similarity
-        scored.sort(key=lambda c: c['_boosted_similarity'], reverse=True)
-        return scored
-    
-    def _filter_career(self, chunks: List[Dict]) -> List[Dict]:
-        """Boost career/achievement content for hiring manager roles.
-        
-        Career indicators:
-        - Work experience, projects, achievements
-        - Skills, background, education
-        - Impact metrics, results
+        Why precomputed features:
+        - Keyword counts depend only on chunk content, so the index computes
+          them once at load (role_affinity.role_keyword_matrix)
+        - Reranking is a vectorized gather + add + argsort
+        - Candidate dicts are copied, never mutated
         """
-        career_keywords = [
-            'tesla', 'sales', 'experience', 'project', 'achievement',
-            'skill', 'background', 'education', 'work', 'role',
-            'developed', 'built', 'led', 'improved', 'implemented'
-        ]
-        
-        scored = []
-        for chunk in chunks:
-            content_lower = chunk['content'].lower()
-            career_score = sum(1 for kw in career_keywords if kw in content_lower)
-            
-            chunk['_career_score'] = career_score
-            chunk['_boosted_similarity'] = chunk['similarity'] + (career_score * 0.02)
-            scored.append(chunk)
-        
-        scored.sort(key=lambda c: c['_boosted_similarity'], reverse=True)
-        return scored
+        # Retrieve more candidates for reranking (unless the caller has them)
+        if candidates is None:
+            candidates = self.retrieve(query, top_k * 2, threshold, query_embedding=query_embedding)
+        
+        profile = role_profile(role)
+        if not candidates or profile is None:
+            # No reranking for this role, use as-is
+            return candidates[:top_k]
+        
+        with span("rerank"):
+            weight = {**self.role_weights, **(role_weights or {})}[profile]
+            counts = self._role_counts(candidates)[:, PROFILE_COLUMNS[profile]]
+            similarities = np.array([c['similarity'] for c in candidates], dtype=np.float32)
+            boosted = similarities + weight * counts
+            order = np.argsort(-boosted, kind='stable')[:top_k]
+        
+        return [{**candidates[i], '_boosted_similarity': float(boosted[i])} for i in order]
     
-    def _filter_casual(self, chunks: List[Dict]) -> List[Dict]:
-        """Boost fun/personal content for casual roles.
+    def _role_counts(self, chunks: List[Dict[str, Any]]) -> np.ndarray:
+        """Role keyword counts [len(chunks), profiles] for candidate chunks.
         
-        Casual indicators:
-        - MMA, fighting, personal interests
-        - Fun facts, hobbies
-        - Conversational tone
+        Looked up from the resident index's precomputed features; chunks the
+        index doesn't hold (RPC mode before any local load) are scanned
+        directly.
         """
-        casual_keywords = [
-            'mma', 'fight', 'fighting', 'cage', 'amateur', 'professional',
-            'chess', 'hobby', 'interest', 'fun', 'personal'
-        ]
-        
-        scored = []
-        for chunk in chunks:
-            content_lower = chunk['content'].lower()
-            casual_score = sum(1 for kw in casual_keywords if kw in content_lower)
-            
-            chunk['_casual_score'] = casual_score
-            chunk['_boosted_similarity'] = chunk['similarity'] + (casual_score * 0.03)
-            scored.append(chunk)
-        
-        scored.sort(key=lambda c: c['_boosted_similarity'], reverse=True)
-        return scored
+        index = self._index
+        if index is None or index.role_features is None:
+            return role_keyword_matrix([c['content'] for c in chunks])
+        
+        rows = index.rows_for_ids(c['id'] for c in chunks)
+        counts = index.role_features[np.maximum(rows, 0)]
+        missing = rows < 0
+        if missing.any():
+            counts[missing] = role_keyword_matrix([chunks[i]['content'] for i in np.flatnonzero(missing)])
+        return counts
     
     def health_check(self) -> Dict[str, Any]:
         """Check if retrieval service is operational.
@@ -439,8 +849,8 @@ class PgVectorRetriever:
             Status dict with health indicators
         """
         try:
-            # Test embedding generation
-            test_embedding = self.embed("health check test")
+            # Test embedding generation (bypass the cache to exercise OpenAI)
+            test_embedding = self.embed("health check test", use_cache=False)
             if not test_embedding:
                 return {"status": "unhealthy", "reason": "Embedding generation failed"}
             
@@ -457,6 +867,7 @@ class PgVectorRetriever:
                 "embedding_model": self.embedding_model,
                 "embedding_dimensions": self.embedding_dimensions,
                 "similarity_threshold": self.similarity_threshold,
+                "embedding_cache": self.embedding_cache.stats(),
                 "test_retrieval_count": len(chunks)
             }
         
@@ -0,0 +1,71 @@
+"""Role-affinity features for role-aware reranking.
+
+retrieve_for_role boosts chunks that match what a role cares about:
+technical content for developers, career content for hiring managers,
+fun/personal content for casual visitors. The boost is a weight times the
+number of role keywords a chunk contains.
+
+Keyword counts depend only on chunk content, so they are computed once per
+chunk when the index loads and kept as a small dense matrix
+float32[N_chunks, N_profiles]. Reranking a query's candidates is then a
+vectorized gather + add + argsort, with no per-request string scanning.
+
+Example usage:
+    features = role_keyword_matrix(index.contents)      # at index load
+    profile = role_profile("Software Developer")        # "technical"
+    boosted = similarities + weights[profile] * features[rows, PROFILE_COLUMNS[profile]]
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Keywords per role profile (substring matches on lowercased content)
+ROLE_KEYWORDS: Dict[str, Sequence[str]] = {
+    "technical": (
+        'code', 'python', 'programming', 'implementation', 'architecture',
+        'ai', 'ml', 'api', 'database', 'algorithm', 'data structure',
+        'langchain', 'rag', 'vector', 'embedding', 'model'
+    ),
+    "career": (
+        'tesla', 'sales', 'experience', 'project', 'achievement',
+        'skill', 'background', 'education', 'work', 'role',
+        'developed', 'built', 'led', 'improved', 'implemented'
+    ),
+    "casual": (
+        'mma', 'fight', 'fighting', 'cage', 'amateur', 'professional',
+        'chess', 'hobby', 'interest', 'fun', 'personal'
+    ),
+}
+
+# Similarity boost per matched keyword
+DEFAULT_ROLE_WEIGHTS: Dict[str, float] = {
+    "technical": 0.02,
+    "career": 0.02,
+    "casual": 0.03,
+}
+
+ROLE_PROFILES = tuple(ROLE_KEYWORDS)
+PROFILE_COLUMNS = {profile: column for column, profile in enumerate(ROLE_PROFILES)}
+
+
+def role_profile(role: str) -> Optional[str]:
+    """Map a UI role name to its keyword profile (None = no reranking)."""
+    lowered = (role or "").lower()
+    if "technical" in lowered or "developer" in lowered:
+        return "technical"
+    if "hiring" in lowered or "manager" in lowered:
+        return "career"
+    if "looking around" in lowered or "casual" in lowered:
+        return "casual"
+    return None
+
+
+def role_keyword_matrix(contents: Sequence[str]) -> np.ndarray:
+    """Keyword counts float32[len(contents), len(ROLE_PROFILES)]."""
+    matrix = np.zeros((len(contents), len(ROLE_PROFILES)), dtype=np.float32)
+    for row, content in enumerate(contents):
+        lowered = (content or "").lower()
+        for column, profile in enumerate(ROLE_PROFILES):
+            matrix[row, column] = sum(1 for kw in ROLE_KEYWORDS[profile] if kw in lowered)
+    return matrix
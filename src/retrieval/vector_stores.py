@@ -1,56 +1,94 @@
-from typing import List, Any
-try:
-    import faiss  # type: ignore
-except Exception:  # fallback stub implementation
-    class _StubIndex:
-        def __init__(self, d):
-            self.d = d
-            self._vecs = []
-        def add(self, arr):
-            self._vecs.extend(arr.tolist())
-        def search(self, arr, k):
-            # naive linear dist
-            import numpy as np
-            q = arr[0]
-            dists = []
-            for i, v in enumerate(self._vecs):
-                v = np.array(v)
-                d = float(((q - v) ** 2).sum())
-                dists.append((d, i))
-            dists.sort(key=lambda x: x[0])
-            sel = dists[:k]
-            if not sel:
-                import numpy as np
-                return np.array([[0.0]*k]), np.array([[-1]*k])
-            distances = [x[0] for x in sel]
-            indices = [x[1] for x in sel]
-            # pad
-            while len(distances) < k:
-                distances.append(0.0)
-                indices.append(-1)
-            import numpy as np
-            return np.array([distances]), np.array([indices])
-    class faiss:  # type: ignore
-        IndexFlatL2 = _StubIndex
+"""Generic in-process vector store backed by an ANN index.
+
+Uses faiss (HNSW) when installed and the pure-NumPy IVF index from
+ann_index.py otherwise, so search is sub-linear either way. Previously the
+faiss-less fallback scanned every vector in a Python loop.
+
+Example usage:
+    store = VectorStore(dimension=1536)
+    store.add_vectors(vectors, metadata=[{"doc_id": "career_kb"}, ...])
+    store.search(query_vector, k=5)            # [(metadata, distance), ...]
+    store.search_batch(query_vectors, k=5)     # one list per query
+    store.save("vector_stores/career")         # persistence
+    store = VectorStore.load("vector_stores/career")
+"""
+
+import json
+import os
+from typing import Any, List, Optional
+
 import numpy as np
 
+from .ann_index import (
+    DEFAULT_ANN_BACKEND,
+    DEFAULT_EF_SEARCH,
+    DEFAULT_NPROBE,
+    create_ann_index,
+    load_ann_index,
+)
+
+INDEX_FILENAME = "index"
+METADATA_FILENAME = "metadata.json"
+
+
 class VectorStore:
-    def __init__(self, dimension: int):
+    def __init__(
+        self,
+        dimension: int,
+        backend: str = DEFAULT_ANN_BACKEND,
+        nprobe: int = DEFAULT_NPROBE,
+        ef_search: int = DEFAULT_EF_SEARCH,
+        nlist: Optional[int] = None,
+    ):
+        """Create an empty store.
+
+        Args:
+            dimension: Vector dimension
+            backend: "auto" (faiss if installed, else IVF), "faiss", "ivf" or "flat"
+            nprobe: IVF lists scanned per query (recall/latency knob)
+            ef_search: HNSW search queue size (recall/latency knob)
+            nlist: IVF list count (default ≈ sqrt(N))
+        """
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
+        self.index = create_ann_index(dimension, backend, nlist=nlist, nprobe=nprobe, ef_search=ef_search)
         self.vectors = []
-    
+
     def add_vectors(self, vectors: List[np.ndarray], metadata: List[Any] = None):
-        """Add vectors to the FAISS index."""
+        """Add vectors to the index (incremental; no rebuild needed)."""
         self.index.add(np.array(vectors).astype('float32'))
         self.vectors.extend(metadata if metadata else [None] * len(vectors))
-    
+
     def search(self, query_vector: np.ndarray, k: int = 5) -> List[Any]:
         """Search for the top k nearest vectors to the query vector."""
-        distances, indices = self.index.search(np.array([query_vector]).astype('float32'), k)
-        return [(self.vectors[idx], distances[0][i]) for i, idx in enumerate(indices[0]) if idx >=0 and idx < len(self.vectors)]
+        return self.search_batch(np.array([query_vector]), k)[0]
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 5) -> List[List[Any]]:
+        """Search several query vectors at once (one index call)."""
+        distances, indices = self.index.search(np.asarray(query_vectors).astype('float32'), k)
+        return [
+            [(self.vectors[idx], distances[row][i]) for i, idx in enumerate(indices[row]) if idx >= 0 and idx < len(self.vectors)]
+            for row in range(indices.shape[0])
+        ]
 
     def reset(self):
         """Reset the vector store."""
         self.index.reset()
-        self.vectors = []
\ No newline at end of file
+        self.vectors = []
+
+    def save(self, directory: str) -> None:
+        """Persist the index and metadata (must be JSON-serializable) to `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        self.index.save(os.path.join(directory, INDEX_FILENAME))
+        with open(os.path.join(directory, METADATA_FILENAME), "w", encoding="utf-8") as f:
+            json.dump({"dimension": self.dimension, "metadata": self.vectors}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> "VectorStore":
+        """Load a store written by save()."""
+        with open(os.path.join(directory, METADATA_FILENAME), encoding="utf-8") as f:
+            saved = json.load(f)
+        store = cls.__new__(cls)
+        store.dimension = saved["dimension"]
+        store.index = load_ann_index(os.path.join(directory, INDEX_FILENAME))
+        store.vectors = saved["metadata"]
+        return store
@@ -0,0 +1,72 @@
+-- Migration 004: Server-side top-k search with doc_id filtering
+--
+-- Restores a working search_kb_chunks RPC for PgVectorRetriever's "rpc"
+-- search mode (PGVECTOR_SEARCH_MODE=rpc).
+--
+-- Why this migration:
+-- 1. Earlier fix scripts (archive/sql/fix_search_function*.sql) left several
+--    overloads of search_kb_chunks behind. PostgREST cannot pick between
+--    overloaded functions with compatible arguments, which is why the
+--    retriever fell back to downloading every chunk.
+-- 2. ivfflat uses ivfflat.probes = 1 by default. With lists = 100 and only a
+--    few hundred rows, one probe visits ~1% of the table and the query often
+--    returns nothing. The function pins probes for its own execution.
+-- 3. doc_id filtering and the similarity threshold belong in SQL so only k
+--    rows ever cross the network.
+--
+-- Run after 001-003 in the Supabase SQL Editor.
+
+-- Remove every previous signature so exactly one candidate remains
+DROP FUNCTION IF EXISTS search_kb_chunks(vector, float, int);
+DROP FUNCTION IF EXISTS search_kb_chunks(vector, double precision, integer);
+DROP FUNCTION IF EXISTS search_kb_chunks(vector, double precision, integer, text[]);
+
+-- Function: Search similar KB chunks using pgvector
+-- query_embedding arrives from PostgREST as a text literal "[0.1,0.2,...]"
+-- and is cast by pgvector's input function.
+CREATE OR REPLACE FUNCTION search_kb_chunks(
+    query_embedding vector(1536),
+    match_threshold double precision DEFAULT 0.6,
+    match_count integer DEFAULT 3,
+    filter_doc_ids text[] DEFAULT NULL
+)
+RETURNS TABLE (
+    id bigint,
+    doc_id text,
+    section text,
+    content text,
+    similarity double precision
+)
+LANGUAGE sql
+STABLE
+SET ivfflat.probes = 10
+AS $$
+    SELECT
+        kb_chunks.id,
+        kb_chunks.doc_id,
+        kb_chunks.section,
+        kb_chunks.content,
+        (1 - (kb_chunks.embedding <=> query_embedding))::double precision AS similarity
+    FROM kb_chunks
+    WHERE kb_chunks.embedding IS NOT NULL
+      AND (filter_doc_ids IS NULL OR kb_chunks.doc_id = ANY(filter_doc_ids))
+      AND 1 - (kb_chunks.embedding <=> query_embedding) > match_threshold
+    ORDER BY kb_chunks.embedding <=> query_embedding
+    LIMIT match_count;
+$$;
+
+-- Allow the API roles to call the function through PostgREST
+GRANT EXECUTE ON FUNCTION search_kb_chunks(vector, double precision, integer, text[])
+    TO anon, authenticated, service_role;
+
+-- Refresh PostgREST's schema cache so the new signature is visible immediately
+NOTIFY pgrst, 'reload schema';
+
+-- Smoke test: top 3 neighbours of an existing chunk, career_kb only
+-- SELECT id, doc_id, similarity
+-- FROM search_kb_chunks(
+--     (SELECT embedding FROM kb_chunks LIMIT 1),
+--     0.0,
+--     3,
+--     ARRAY['career_kb']
+-- );
@@ -0,0 +1,32 @@
+-- Migration 005: Per-request latency breakdown on messages
+--
+-- The conversation flow times every node (classify_query, retrieve_chunks,
+-- generate_answer, apply_role_context, ...) and sub-step (embed, fetch,
+-- score, llm, ...) and logs the breakdown with the message, e.g.
+--
+--   {"total_ms": 1834.2,
+--    "nodes": {"retrieve_chunks": 212.7, "generate_answer": 1540.3, ...},
+--    "spans": {"embed": {"ms": 180.1, "count": 1}, "llm": {"ms": 1521.0, "count": 1}}}
+--
+-- Why a jsonb column instead of one column per stage:
+-- 1. The node list changes as the pipeline evolves; no migration per node
+-- 2. jsonb operators still make per-stage percentiles a single query
+--
+-- Run after 001-004 in the Supabase SQL Editor. Optional for the app: the
+-- flow sends timings with every message, and until this runs
+-- SupabaseAnalytics.log_interaction gets PGRST204 (unknown column), retries
+-- without timings and stops sending them for the rest of the process.
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS timings JSONB;
+
+-- Per-stage latency percentiles over the last 7 days
+CREATE OR REPLACE VIEW message_stage_latency AS
+SELECT
+    stage.key AS node,
+    COUNT(*) AS requests,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY stage.value::text::float) AS p50_ms,
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY stage.value::text::float) AS p95_ms
+FROM messages, jsonb_each(messages.timings -> 'nodes') AS stage
+WHERE messages.created_at > NOW() - INTERVAL '7 days'
+GROUP BY stage.key
+ORDER BY p95_ms DESC;
@@ -0,0 +1,242 @@
+"""In-memory stand-in for the Supabase/PostgREST client used in tests.
+
+Implements just enough of the supabase-py query builder surface for the
+retriever and analytics code paths:
+
+    client.table('kb_chunks').select('id, content', count='exact')
+          .eq('doc_id', 'career_kb').order('id').range(0, 999).execute()
+
+Rows are stored as plain dicts. Embeddings are serialized the way
+PostgREST returns pgvector columns ("[0.1,0.2,...]") so parsing code is
+exercised exactly as in production.
+
+`client.rpc('search_kb_chunks', params)` evaluates the SQL function from
+supabase/migrations/004_search_kb_chunks_filters.sql over the in-memory
+kb_chunks table, including PostgREST's strict argument matching.
+"""
+
+import itertools
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+class FakePostgrestError(Exception):
+    """Raised where real PostgREST would return an error payload."""
+
+
+@dataclass
+class FakeResponse:
+    data: List[Dict[str, Any]]
+    count: Optional[int] = None
+
+
+def vector_literal(values) -> str:
+    """Serialize a vector the way PostgREST returns pgvector values."""
+    return "[" + ",".join(repr(float(v)) for v in values) + "]"
+
+
+class FakeQuery:
+    """Chainable query builder mirroring the subset of postgrest-py we use."""
+
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self._client = client
+        self._table = table
+        self._columns: Optional[List[str]] = None
+        self._count = False
+        self._filters: List = []
+        self._order: List = []
+        self._limit: Optional[int] = None
+        self._range: Optional[tuple] = None
+        self._insert: Optional[List[Dict[str, Any]]] = None
+        self._delete = False
+
+    # --- builder ------------------------------------------------------------
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "FakeQuery":
+        cols = [c.strip() for c in columns.split(",")]
+        self._columns = None if cols == ["*"] else cols
+        self._count = count is not None
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def in_(self, column: str, values) -> "FakeQuery":
+        allowed = set(values)
+        self._filters.append(lambda row: row.get(column) in allowed)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int) -> "FakeQuery":
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self._range = (start, end)
+        return self
+
+    def insert(self, rows) -> "FakeQuery":
+        self._insert = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self._delete = True
+        return self
+
+    # --- execution ----------------------------------------------------------
+    def execute(self) -> FakeResponse:
+        self._client.calls.append((self._table, "insert" if self._insert is not None else "select"))
+        table = self._client.tables.setdefault(self._table, [])
+
+        if self._insert is not None:
+            inserted = []
+            for row in self._insert:
+                stored = dict(row)
+                stored.setdefault("id", next(self._client._ids))
+                table.append(stored)
+                inserted.append(dict(stored))
+            return FakeResponse(data=inserted)
+
+        rows = [r for r in table if all(f(r) for f in self._filters)]
+
+        if self._delete:
+            self._client.tables[self._table] = [r for r in table if r not in rows]
+            return FakeResponse(data=rows)
+
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        total = len(rows)
+        if self._range is not None:
+            start, end = self._range
+            rows = rows[start:end + 1]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        if self._columns is not None:
+            rows = [{c: r.get(c) for c in self._columns} for r in rows]
+        else:
+            rows = [dict(r) for r in rows]
+        return FakeResponse(data=rows, count=total if self._count else None)
+
+
+def _parse_vector_literal(value: Any) -> List[float]:
+    if not isinstance(value, str) or not value.startswith("[") or not value.endswith("]"):
+        raise FakePostgrestError(f"22P02: malformed vector literal: {str(value)[:40]}")
+    return [float(x) for x in value[1:-1].split(",")]
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class FakeRpcCall:
+    """Deferred RPC invocation (mirrors postgrest-py's builder)."""
+
+    # Argument names and defaults of each SQL function, as PostgREST sees them
+    SIGNATURES = {
+        "search_kb_chunks": {
+            "query_embedding": None,
+            "match_threshold": 0.6,
+            "match_count": 3,
+            "filter_doc_ids": None,
+        },
+    }
+
+    def __init__(self, client: "FakeSupabaseClient", name: str, params: Dict[str, Any]):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    def execute(self) -> FakeResponse:
+        self._client.calls.append((self._name, "rpc"))
+        signature = self.SIGNATURES.get(self._name)
+        if signature is None or not set(self._params) <= set(signature):
+            raise FakePostgrestError(
+                f"PGRST202: Could not find the function public.{self._name}({', '.join(sorted(self._params))})"
+            )
+        args = {**signature, **self._params}
+        return getattr(self, f"_{self._name}")(**args)
+
+    def _search_kb_chunks(self, query_embedding, match_threshold, match_count, filter_doc_ids) -> FakeResponse:
+        query = _parse_vector_literal(query_embedding)
+        rows = []
+        for row in self._client.tables.get("kb_chunks", []):
+            if row.get("embedding") is None:
+                continue
+            if filter_doc_ids is not None and row["doc_id"] not in filter_doc_ids:
+                continue
+            embedding = _parse_vector_literal(row["embedding"])
+            if len(embedding) != len(query):
+                raise FakePostgrestError(f"22000: different vector dimensions {len(embedding)} and {len(query)}")
+            similarity = _cosine(embedding, query)
+            if similarity > match_threshold:
+                rows.append({
+                    "id": row["id"],
+                    "doc_id": row["doc_id"],
+                    "section": row["section"],
+                    "content": row["content"],
+                    "similarity": similarity,
+                })
+        rows.sort(key=lambda r: r["similarity"], reverse=True)
+        return FakeResponse(data=rows[:match_count])
+
+
+class FakeSupabaseClient:
+    """Minimal Supabase client double backed by in-memory tables."""
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.tables: Dict[str, List[Dict[str, Any]]] = tables or {}
+        self.calls: List[tuple] = []
+        self._ids = itertools.count(10_000)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpcCall:
+        return FakeRpcCall(self, name, params or {})
+
+    def add_chunk(self, chunk_id: int, doc_id: str, content: str, embedding, section: str = "entry",
+                  updated_at: str = "2025-10-16T00:00:00+00:00") -> None:
+        """Insert a kb_chunks row with a PostgREST-style embedding string."""
+        self.tables.setdefault("kb_chunks", []).append({
+            "id": chunk_id,
+            "doc_id": doc_id,
+            "section": section,
+            "content": content,
+            "embedding": vector_literal(embedding),
+            "metadata": json.dumps({}),
+            "updated_at": updated_at,
+        })
+
+
+class FakeEmbeddingsAPI:
+    """Stand-in for `OpenAI().embeddings` returning canned vectors."""
+
+    def __init__(self, vectors: Dict[str, List[float]], dimensions: int):
+        self.vectors = vectors
+        self.dimensions = dimensions
+        self.calls: List[Any] = []
+
+    def create(self, model: str, input):
+        self.calls.append(input)
+        texts = input if isinstance(input, list) else [input]
+        data = [
+            type("Embedding", (), {"embedding": list(self.vectors.get(t, [0.0] * self.dimensions)), "index": i})
+            for i, t in enumerate(texts)
+        ]
+        return type("EmbeddingResponse", (), {"data": data})
+
+
+class FakeOpenAIClient:
+    def __init__(self, vectors: Dict[str, List[float]], dimensions: int):
+        self.embeddings = FakeEmbeddingsAPI(vectors, dimensions)
@@ -0,0 +1,236 @@
+"""Tests for the analytics write-behind buffer."""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from src.analytics.supabase_analytics import (
+    RetrievalLogData,
+    SupabaseAnalytics,
+    UserInteractionData,
+)
+from src.analytics.write_buffer import WriteBehindBuffer
+from src.flows import core_nodes
+from src.flows.conversation_flow import run_conversation_flow
+from src.flows.conversation_state import ConversationState
+
+
+class RecordingWriter:
+    def __init__(self, fail_tables=(), bad_rows=()):
+        self.calls: List[Tuple[str, List[Dict]]] = []
+        self.fail_tables = set(fail_tables)
+        self.bad_rows = list(bad_rows)
+        self.written = threading.Event()
+
+    def __call__(self, table, rows):
+        if table in self.fail_tables or any(row in self.bad_rows for row in rows):
+            raise RuntimeError("insert failed")
+        self.calls.append((table, list(rows)))
+        self.written.set()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_flushes_by_size_as_bulk_inserts_parents_first():
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(writer, batch_size=4, flush_interval=60,
+                               table_order=("messages", "retrieval_logs"))
+
+    buffer.put("retrieval_logs", {"message_id": 1})
+    buffer.put("messages", {"id": 2})
+    buffer.put("retrieval_logs", {"message_id": 2})
+    assert writer.calls == []
+    buffer.put("messages", {"id": 3})
+
+    assert _wait_for(lambda: buffer.stats()["written"] == 4)
+    assert writer.calls == [
+        ("messages", [{"id": 2}, {"id": 3}]),
+        ("retrieval_logs", [{"message_id": 1}, {"message_id": 2}]),
+    ]
+    buffer.close()
+
+
+def test_flushes_by_time():
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(writer, batch_size=100, flush_interval=0.05)
+
+    buffer.put("messages", {"id": 1})
+    assert writer.written.wait(2)
+    assert buffer.stats()["written"] == 1
+    buffer.close()
+
+
+def test_drops_and_counts_when_full_and_close_flushes_the_rest():
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(writer, batch_size=100, flush_interval=60, max_pending=2)
+
+    assert buffer.put("messages", {"id": 1}) and buffer.put("messages", {"id": 2})
+    assert not buffer.put("messages", {"id": 3})
+    buffer.close()
+
+    assert writer.calls == [("messages", [{"id": 1}, {"id": 2}])]
+    assert buffer.stats() == {"queued": 2, "written": 2, "dropped": 1, "failed": 0, "flushes": 1, "pending": 0}
+    assert not buffer.put("messages", {"id": 4})
+
+
+def test_failed_bulk_insert_is_retried_row_by_row():
+    writer = RecordingWriter(bad_rows=[{"id": 2}])
+    buffer = WriteBehindBuffer(writer, batch_size=100, flush_interval=60)
+    for i in range(1, 4):
+        buffer.put("messages", {"id": i})
+
+    assert buffer.flush() == 2
+    assert writer.calls == [("messages", [{"id": 1}]), ("messages", [{"id": 3}])]
+    assert buffer.stats()["failed"] == 1
+    buffer.close()
+
+
+class FakeClient:
+    def __init__(self):
+        self.inserts: List[Tuple[str, object]] = []
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def insert(self, payload):
+                self.payload = payload
+                return self
+
+            def execute(self):
+                client.inserts.append((name, self.payload))
+                return type("Result", (), {"data": [{"id": 99}]})()
+
+        return Query()
+
+
+def _interaction():
+    return UserInteractionData(session_id="s", role_mode="Software Developer", query="q",
+                               answer="a", query_type="technical", latency_ms=5)
+
+
+def test_messages_are_written_synchronously_and_children_queued():
+    analytics = SupabaseAnalytics(write_behind=True)
+    analytics._client = FakeClient()
+
+    message_id = analytics.log_interaction(_interaction())
+    assert message_id == 99
+    assert [table for table, _ in analytics._client.inserts] == ["messages"]
+    assert "id" not in analytics._client.inserts[0][1]
+
+    analytics.log_retrieval(RetrievalLogData(message_id=message_id, topk_ids=[1], scores=[0.9], grounded=True))
+    assert len(analytics._client.inserts) == 1
+
+    analytics.flush()
+    logs_table, logs = analytics._client.inserts[1]
+    assert logs_table == "retrieval_logs" and logs[0]["message_id"] == 99
+    analytics._buffer.close()
+
+
+def test_direct_writes_without_write_behind():
+    analytics = SupabaseAnalytics(write_behind=False)
+    analytics._client = FakeClient()
+
+    assert analytics.log_interaction(_interaction()) == 99
+    assert analytics._client.inserts[0][0] == "messages"
+    assert "id" not in analytics._client.inserts[0][1]
+    assert analytics.buffer_stats() is None
+
+
+class MissingColumnError(Exception):
+    code = "PGRST204"
+
+
+class PreTimingsClient(FakeClient):
+    """messages table as it looks before migration 005 (no timings column)."""
+
+    def table(self, name):
+        query = super().table(name)
+        execute = query.execute
+
+        def checked_execute():
+            if name == "messages" and "timings" in query.payload:
+                raise MissingColumnError("Could not find the 'timings' column of 'messages' in the schema cache")
+            return execute()
+
+        query.execute = checked_execute
+        return query
+
+
+class DummyRagEngine:
+    class response_generator:
+        @staticmethod
+        def generate_contextual_response(query, context, role=None, chat_history=None, extra_instructions=None):
+            return "Noah has a strong track record."
+
+    def retrieve(self, query, top_k=4, doc_ids=None):
+        return {"matches": ["Match A"], "scores": [0.9],
+                "chunks": [{"id": 1, "content": "Match A", "doc_id": "career_kb", "similarity": 0.9}]}
+
+
+def test_flow_keeps_logging_messages_before_timings_migration(monkeypatch, caplog):
+    analytics = SupabaseAnalytics(write_behind=False)
+    analytics._client = PreTimingsClient()
+    monkeypatch.setattr(core_nodes, "supabase_analytics", analytics)
+
+    with caplog.at_level(logging.WARNING, logger="src.analytics.supabase_analytics"):
+        states = [
+            run_conversation_flow(ConversationState(role="Hiring Manager (nontechnical)", query=f"Tell me about Noah's career {i}"),
+                                  DummyRagEngine(), session_id="s")
+            for i in range(2)
+        ]
+
+    assert all(state.analytics_metadata["timings"] for state in states)
+    assert [state.analytics_metadata["message_id"] for state in states] == [99, 99]
+    messages = [row for table, row in analytics._client.inserts if table == "messages"]
+    assert len(messages) == 2 and all("timings" not in row for row in messages)
+    assert sum("timings column missing" in r.message for r in caplog.records) == 1
+
+
+def test_chat_response_completes_before_the_analytics_flush(monkeypatch):
+    import http.client
+    import json
+    from http.server import HTTPServer
+
+    from api import chat
+
+    async def fake_flow(state, rag_engine, session_id):
+        state.set_answer("done")
+        return state
+
+    flushed = threading.Event()
+
+    def slow_flush():
+        time.sleep(0.5)
+        flushed.set()
+
+    monkeypatch.setattr(chat, "ASYNC_FLOW_ENABLED", True)
+    monkeypatch.setattr(chat, "get_rag_engine", lambda: None)
+    monkeypatch.setattr(chat, "run_conversation_flow_async", fake_flow)
+    monkeypatch.setattr(chat.supabase_analytics, "flush", slow_flush)
+
+    server = HTTPServer(("127.0.0.1", 0), chat.handler)
+    thread = threading.Thread(target=server.handle_request, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        started = time.perf_counter()
+        connection.request("POST", "/api/chat", body=json.dumps({"query": "q"}),
+                           headers={"Content-Type": "application/json"})
+        body = json.loads(connection.getresponse().read())
+        elapsed = time.perf_counter() - started
+
+        assert body["answer"] == "done"
+        assert elapsed < 0.4 and not flushed.is_set()  # the flush is not on the client's clock
+        thread.join(2)
+        assert flushed.is_set()
+    finally:
+        server.server_close()
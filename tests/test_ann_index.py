@@ -0,0 +1,90 @@
+"""Tests for the pure-NumPy IVF index and VectorStore."""
+
+import numpy as np
+import pytest
+
+from src.retrieval.ann_index import IVFIndex, create_ann_index
+from src.retrieval.vector_stores import VectorStore
+
+DIMS = 32
+
+
+def _clustered(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=4.0, size=(20, DIMS))
+    return (centers[rng.integers(0, 20, n)] + rng.normal(size=(n, DIMS))).astype(np.float32)
+
+
+def _exact(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    distances = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+def test_small_index_is_exact_before_training() -> None:
+    vectors = _clustered(200)
+    index = IVFIndex(DIMS)
+    index.add(vectors)
+
+    distances, labels = index.search(vectors[:5], 3)
+
+    assert not index.is_trained
+    assert (labels == _exact(vectors, vectors[:5], 3)).all()
+    assert distances[:, 0] == pytest.approx(0.0, abs=1e-3)
+
+
+def test_trained_index_recall_and_nprobe_knob() -> None:
+    vectors = _clustered(3000)
+    queries = _clustered(50, seed=1)
+    expected = _exact(vectors, queries, 10)
+    index = IVFIndex(DIMS, nprobe=8)
+    index.add(vectors)
+    assert index.is_trained
+
+    def recall() -> float:
+        _, labels = index.search(queries, 10)
+        return np.mean([len(set(a) & set(b)) / 10 for a, b in zip(labels, expected)])
+
+    assert recall() >= 0.9
+    index.nprobe = len(index.centroids)
+    assert recall() == 1.0
+
+
+def test_incremental_inserts_are_searchable() -> None:
+    index = IVFIndex(DIMS, train_threshold=500)
+    index.add(_clustered(1000))
+    new = _clustered(3, seed=9) + 50.0
+
+    index.add(new)
+    _, labels = index.search(new, 1)
+
+    assert labels[:, 0].tolist() == [1000, 1001, 1002]
+
+
+def test_results_are_padded_like_faiss() -> None:
+    index = create_ann_index(DIMS, backend="flat")
+    index.add(_clustered(2))
+    distances, labels = index.search(_clustered(1, seed=3), 4)
+    assert labels[0, 2:].tolist() == [-1, -1]
+    assert distances[0, 0] <= distances[0, 1]
+
+
+def test_vector_store_batch_search_and_persistence(tmp_path) -> None:
+    vectors = _clustered(1500)
+    store = VectorStore(DIMS, backend="ivf")
+    store.add_vectors(list(vectors), metadata=[{"row": i} for i in range(len(vectors))])
+
+    single = [store.search(v, k=3) for v in vectors[:4]]
+    assert store.search_batch(vectors[:4], k=3) == single
+    assert single[0][0][0] == {"row": 0}
+
+    store.save(str(tmp_path / "store"))
+    restored = VectorStore.load(str(tmp_path / "store"))
+    assert restored.search_batch(vectors[:4], k=3) == single
+
+    restored.add_vectors([vectors[0] + 100.0], metadata=[{"row": "new"}])
+    assert restored.search(vectors[0] + 100.0, k=1)[0][0] == {"row": "new"}
+
+
+def test_unknown_backend_rejected() -> None:
+    with pytest.raises(ValueError):
+        VectorStore(DIMS, backend="annoy")
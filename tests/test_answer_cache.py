@@ -0,0 +1,172 @@
+"""Tests for the semantic answer cache and its use in generate_answer."""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.core.answer_cache import SemanticAnswerCache
+from src.flows import core_nodes
+from src.flows.conversation_state import ConversationState
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.pgvector_retriever import PgVectorRetriever
+from tests.fake_supabase import FakeOpenAIClient, FakeSupabaseClient
+
+KEY = SemanticAnswerCache.make_key("Software Developer", {"query_type": "technical"}, "v1")
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_near_duplicate_query_hits() -> None:
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.put(KEY, "what are noah's skills", [1.0, 0.0, 0.0], "Python, RAG, sales")
+
+    assert cache.get(KEY, [0.99, 0.05, 0.0]) == "Python, RAG, sales"
+    assert cache.get(KEY, [0.7, 0.7, 0.0]) is None
+    assert cache.top_entries() == [{"query": "what are noah's skills", "hits": 1}]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_role_flags_and_kb_version_partition_the_cache() -> None:
+    cache = SemanticAnswerCache()
+    cache.put(KEY, "q", [1.0, 0.0], "technical answer")
+
+    for other in (
+        SemanticAnswerCache.make_key("Just looking around", {"query_type": "technical"}, "v1"),
+        SemanticAnswerCache.make_key("Software Developer", {"query_type": "career"}, "v1"),
+        SemanticAnswerCache.make_key("Software Developer", {"query_type": "technical"}, "v2"),
+    ):
+        assert cache.get(other, [1.0, 0.0]) is None
+
+
+def test_ttl_lru_and_invalidation() -> None:
+    clock = FakeClock()
+    cache = SemanticAnswerCache(max_entries=2, ttl_seconds=60, clock=clock)
+    cache.put(KEY, "a", [1.0, 0.0, 0.0], "A")
+    cache.put(KEY, "b", [0.0, 1.0, 0.0], "B")
+    cache.get(KEY, [1.0, 0.0, 0.0])  # "a" is now most recently used
+    cache.put(KEY, "c", [0.0, 0.0, 1.0], "C")
+
+    assert cache.get(KEY, [0.0, 1.0, 0.0]) is None
+    assert cache.stats()["evictions"] == 1
+
+    clock.now += 61
+    assert cache.get(KEY, [1.0, 0.0, 0.0]) is None
+    assert len(cache) == 0  # both entries expired on lookup
+
+    cache.put(KEY, "d", [1.0, 0.0, 0.0], "D")
+    cache.invalidate("v2")
+    assert len(cache) == 0
+
+
+def test_put_prunes_expired_entries_in_every_bucket() -> None:
+    clock = FakeClock()
+    cache = SemanticAnswerCache(max_entries=10, ttl_seconds=60, clock=clock)
+    other = SemanticAnswerCache.make_key("Just looking around", {"query_type": "general"}, "v1")
+    cache.put(other, "a", [1.0, 0.0], "A")
+    clock.now += 61
+
+    cache.put(KEY, "b", [0.0, 1.0], "B")
+
+    assert len(cache) == 1
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["evictions"] == 0
+
+
+class CountingGenerator:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate_contextual_response(self, **kwargs: Any) -> str:
+        self.calls += 1
+        return f"answer #{self.calls}"
+
+
+class CachingRagEngine:
+    def __init__(self, embeddings: Dict[str, List[float]]) -> None:
+        self.embeddings = embeddings
+        self.answer_cache = SemanticAnswerCache(similarity_threshold=0.95)
+        self.kb_version: Optional[str] = "v1"
+        self.response_generator = CountingGenerator()
+
+    def embed(self, text: str) -> List[float]:
+        return self.embeddings[text]
+
+
+def _answer(engine: CachingRagEngine, query: str, role: str = "Software Developer", history=None) -> ConversationState:
+    state = ConversationState(role=role, query=query, chat_history=history or [])
+    state.stash("query_type", "technical")
+    return core_nodes.generate_answer(state, engine)
+
+
+@pytest.fixture
+def engine() -> CachingRagEngine:
+    return CachingRagEngine({
+        "How does this chatbot work?": [1.0, 0.0],
+        "how does this chatbot work": [0.99, 0.02],
+        "What are Noah's hobbies?": [0.0, 1.0],
+    })
+
+
+def test_generate_answer_reuses_cached_answer(engine: CachingRagEngine) -> None:
+    first = _answer(engine, "How does this chatbot work?")
+    second = _answer(engine, "how does this chatbot work")
+
+    assert engine.response_generator.calls == 1
+    assert second.answer == first.answer == "answer #1"
+    assert second.fetch("answer_cache_hit") is True
+
+    _answer(engine, "What are Noah's hobbies?")
+    _answer(engine, "how does this chatbot work", role="Just looking around")
+    assert engine.response_generator.calls == 3
+
+
+def test_generate_answer_skips_cache_with_history_or_unknown_kb(
+    engine: CachingRagEngine, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    _answer(engine, "How does this chatbot work?", history=history)
+    _answer(engine, "How does this chatbot work?", history=history)
+    assert engine.response_generator.calls == 2
+    assert len(engine.answer_cache) == 0
+
+    engine.kb_version = None
+    monkeypatch.setattr(core_nodes, "_kb_version_missing_logged", False)
+    with caplog.at_level(logging.INFO, logger=core_nodes.__name__):
+        _answer(engine, "How does this chatbot work?")
+        _answer(engine, "How does this chatbot work?")
+    assert len(engine.answer_cache) == 0
+    assert sum("no KB version" in r.getMessage() for r in caplog.records) == 1
+
+
+def test_kb_reload_invalidates_registered_cache() -> None:
+    supabase = FakeSupabaseClient()
+    supabase.add_chunk(1, "career_kb", "Noah worked in sales at Tesla", [1.0, 0.0])
+    retriever = PgVectorRetriever(
+        openai_client=FakeOpenAIClient({"tesla": [1.0, 0.0]}, 2),
+        supabase_client=supabase,
+        index_refresh_interval=0,
+        embedding_cache=EmbeddingCache(),
+        snapshot_dir=None,
+    )
+    cache = SemanticAnswerCache()
+    retriever.on_kb_change(cache.invalidate)
+    lock_held = []
+    retriever.on_kb_change(lambda version: lock_held.append(retriever._index_lock.locked()))
+
+    retriever.retrieve("tesla")
+    cache.put(KEY, "q", [1.0, 0.0], "A")
+    retriever.retrieve("tesla")
+    assert len(cache) == 1  # same KB version, nothing dropped
+
+    supabase.add_chunk(2, "career_kb", "Noah moved into AI", [0.0, 1.0], updated_at="2025-10-17T00:00:00+00:00")
+    retriever.retrieve("tesla")
+    assert len(cache) == 0
+    assert retriever.kb_version is not None
+    assert lock_held == [False]  # listeners run after the index lock is released
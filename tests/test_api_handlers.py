@@ -32,7 +32,7 @@ def test_chat_handler():
     print("="*80)
     
     # Mock dependencies
-    with patch('api.chat.RagEngine') as MockRagEngine, \
+    with patch('api.chat.get_rag_engine') as mock_get_engine, \
          patch('api.chat.run_conversation_flow') as mock_flow:
         
         # Setup mocks
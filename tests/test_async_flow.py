@@ -0,0 +1,222 @@
+"""Tests for the asyncio conversation flow runner."""
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from src.flows import action_execution, core_nodes
+from src.flows.async_flow import FlowDeadlineExceeded, FlowNode, run_flow_graph, run_in_thread, sync_node
+from src.flows.conversation_flow import run_conversation_flow, run_conversation_flow_async
+from src.flows.conversation_state import ConversationState
+
+
+def _state(query="Tell me about Noah's career"):
+    return ConversationState(role="Hiring Manager (nontechnical)", query=query)
+
+
+def _sleeper(name, seconds, order):
+    def node(state):
+        order.append(f"start:{name}")
+        time.sleep(seconds)
+        order.append(f"end:{name}")
+        return state
+    return sync_node(node)
+
+
+def test_independent_nodes_run_concurrently_after_dependencies():
+    order: List[str] = []
+    nodes = [
+        FlowNode("a", _sleeper("a", 0.05, order)),
+        FlowNode("b", _sleeper("b", 0.3, order), after=("a",)),
+        FlowNode("c", _sleeper("c", 0.3, order), after=("a",)),
+        FlowNode("d", _sleeper("d", 0.05, order), after=("b", "c")),
+    ]
+
+    started = time.perf_counter()
+    asyncio.run(run_flow_graph(_state(), nodes, deadline_s=5))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.55  # longest chain is 0.4s; sequential would be 0.7s
+    assert order[:2] == ["start:a", "end:a"]
+    assert set(order[2:4]) == {"start:b", "start:c"}
+    assert order[-2:] == ["start:d", "end:d"]
+
+
+def test_required_node_past_deadline_raises():
+    nodes = [FlowNode("slow", _sleeper("slow", 0.5, []))]
+    with pytest.raises(FlowDeadlineExceeded):
+        asyncio.run(run_flow_graph(_state(), nodes, deadline_s=0.1))
+
+
+def test_optional_nodes_do_not_hold_the_response():
+    async def answer(state):
+        state.set_answer("done")
+
+    def failing(state):
+        raise RuntimeError("sms down")
+
+    nodes = [
+        FlowNode("answer", answer),
+        FlowNode("notify", _sleeper("notify", 0.5, []), after=("answer",), required=False),
+        FlowNode("failing", sync_node(failing), after=("answer",), required=False),
+    ]
+
+    started = time.perf_counter()
+    state = asyncio.run(run_flow_graph(_state(), nodes, deadline_s=0.1))
+
+    assert state.answer == "done"
+    assert time.perf_counter() - started < 0.4
+
+
+def test_graph_validation():
+    noop = sync_node(lambda state: state)
+    with pytest.raises(ValueError, match="declared before"):
+        asyncio.run(run_flow_graph(_state(), [FlowNode("b", noop, after=("a",)), FlowNode("a", noop)]))
+    with pytest.raises(ValueError, match="Duplicate"):
+        asyncio.run(run_flow_graph(_state(), [FlowNode("a", noop), FlowNode("a", noop)]))
+
+
+def test_execute_actions_async_runs_actions_concurrently(monkeypatch):
+    executor = action_execution.ActionExecutor()
+    calls: List[str] = []
+
+    def slow_handler(name):
+        def handler(state, action):
+            time.sleep(0.2)
+            calls.append(name)
+        return handler
+
+    monkeypatch.setattr(executor, "execute_send_resume", slow_handler("email"))
+    monkeypatch.setattr(executor, "execute_notify_resume_sent", slow_handler("sms"))
+    state = _state()
+    state.pending_actions = [{"type": "send_resume"}, {"type": "notify_resume_sent"}, {"type": "unknown"}]
+
+    started = time.perf_counter()
+    asyncio.run(executor.execute_async(state))
+
+    assert sorted(calls) == ["email", "sms"]
+    assert time.perf_counter() - started < 0.35
+
+
+class DummyResponseGenerator:
+    def generate_contextual_response(self, query, context, role=None, chat_history=None, extra_instructions=None):
+        return f"Noah has a strong track record. ({len(context)} chunks)"
+
+
+class DummyRagEngine:
+    response_generator = DummyResponseGenerator()
+
+    def retrieve(self, query: str, top_k: int = 4, doc_ids=None) -> Dict[str, Any]:
+        return {
+            "matches": ["Match A"],
+            "scores": [0.9],
+            "chunks": [{"content": "Match A", "doc_id": "career", "similarity": 0.9}],
+        }
+
+
+def test_async_flow_matches_sequential_flow(monkeypatch):
+    logged: List[int] = []
+
+    class DummyAnalytics:
+        @staticmethod
+        def log_interaction(data):
+            logged.append(data.latency_ms)
+            return 7
+
+    monkeypatch.setattr(core_nodes, "supabase_analytics", DummyAnalytics)
+
+    sequential = run_conversation_flow(_state(), DummyRagEngine(), session_id="s")
+    concurrent = asyncio.run(run_conversation_flow_async(_state(), DummyRagEngine(), session_id="s"))
+
+    assert concurrent.answer == sequential.answer
+    assert concurrent.pending_actions == sequential.pending_actions
+    assert concurrent.analytics_metadata["message_id"] == sequential.analytics_metadata["message_id"] == 7
+    answer_path = {"handle_greeting", "classify_query", "retrieve_chunks", "generate_answer",
+                   "plan_actions", "apply_role_context"}
+    assert set(sequential.analytics_metadata["timings"]["nodes"]) == answer_path | {"execute_actions"}
+    assert set(concurrent.analytics_metadata["timings"]["nodes"]) == answer_path | {"execute_actions", "log_and_notify"}
+    assert len(logged) == 2
+
+
+class SlowStorage:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get_signed_url(self, file_path: str, expires_in: int = 86400) -> str:
+        self.calls += 1
+        time.sleep(0.05)
+        return "https://signed.example.com/resume.pdf"
+
+
+def test_resume_answer_link_does_not_depend_on_the_email_branch(monkeypatch):
+    storage = SlowStorage()
+    sent: List[str] = []
+
+    class Resend:
+        def send_resume_email(self, to_email, to_name, resume_url, message=None):
+            sent.append(resume_url)
+            return {"status": "sent"}
+
+    class DummyAnalytics:
+        @staticmethod
+        def log_interaction(data):
+            return 1
+
+    monkeypatch.setattr(core_nodes, "supabase_analytics", DummyAnalytics)
+    monkeypatch.setattr(action_execution, "_action_executor", action_execution.ActionExecutor())
+    monkeypatch.setattr(action_execution, "get_storage_service", lambda: storage)
+    monkeypatch.setattr(action_execution, "get_resend_service", lambda: Resend())
+    monkeypatch.setattr(action_execution, "get_twilio_service", lambda: None)
+
+    for _ in range(3):
+        state = _state("Please email me Noah's resume")
+        state.stash("user_email", "hiring@company.com")
+        state = asyncio.run(run_conversation_flow_async(state, DummyRagEngine(), session_id="s"))
+        assert f"Download Noah's resume: {core_nodes.RESUME_DOWNLOAD_URL}" in state.answer
+        assert state.analytics_metadata["resume_email_status"] == "sent"
+    assert sent == ["https://signed.example.com/resume.pdf"] * 3
+    assert storage.calls == 3  # signed once per request, for the email only
+
+
+def test_messages_insert_runs_alongside_execute_actions(monkeypatch):
+    class SlowAnalytics:
+        @staticmethod
+        def log_interaction(data):
+            time.sleep(0.3)
+            return 5
+
+    def slow_actions(state):
+        time.sleep(0.3)
+        state.update_analytics("resume_email_status", "sent")
+        return state
+
+    monkeypatch.setattr(core_nodes, "supabase_analytics", SlowAnalytics)
+    monkeypatch.setattr(action_execution._action_executor, "execute_async", sync_node(slow_actions))
+
+    started = time.perf_counter()
+    state = asyncio.run(run_conversation_flow_async(_state(), DummyRagEngine(), session_id="s"))
+
+    assert time.perf_counter() - started < 0.5  # 0.6s if the insert waited for the actions
+    assert state.analytics_metadata["message_id"] == 5
+    assert state.analytics_metadata["resume_email_status"] == "sent"
+    assert {"execute_actions", "log_and_notify"} <= set(state.analytics_metadata["timings"]["nodes"])
+
+
+def test_action_executor_initializes_services_once_across_threads(monkeypatch):
+    created: List[object] = []
+
+    def slow_factory():
+        time.sleep(0.05)
+        created.append(object())
+        return created[-1]
+
+    executor = action_execution.ActionExecutor()
+    monkeypatch.setattr(action_execution, "get_twilio_service", slow_factory)
+
+    async def ensure_many():
+        return await asyncio.gather(*(run_in_thread(executor._ensure_twilio) for _ in range(4)))
+
+    services = asyncio.run(ensure_many())
+    assert len(created) == 1 and all(service is created[0] for service in services)
@@ -0,0 +1,111 @@
+"""Tests for the BM25 index and hybrid (lexical + vector) retrieval."""
+
+import pytest
+
+from src.retrieval.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.pgvector_retriever import PgVectorRetriever
+from tests.fake_supabase import FakeOpenAIClient, FakeSupabaseClient
+
+TEXTS = [
+    "Noah worked in sales at Tesla before moving into AI engineering",
+    "Supabase Postgres with the pgvector extension stores embeddings",
+    "The retrieve_chunks node calls the RAG engine",
+    "Twilio sends SMS notifications when someone requests a resume",
+]
+
+
+def test_tokenize_keeps_identifiers_and_drops_stopwords() -> None:
+    assert tokenize("What does retrieve_chunks do in Noah's pgvector setup?") == [
+        "retrieve_chunks", "pgvector", "setup"
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, expected_row",
+    [("why pgvector", 1), ("Twilio", 3), ("retrieve_chunks", 2), ("Tesla sales", 0)],
+)
+def test_bm25_finds_exact_identifiers(query: str, expected_row: int) -> None:
+    rows, scores = BM25Index.from_texts(TEXTS).search(query, top_k=2)
+    assert rows[0] == expected_row
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_bm25_respects_row_restriction_and_empty_queries() -> None:
+    index = BM25Index.from_texts(TEXTS)
+    assert index.search("pgvector", rows=[0, 2, 3])[0].size == 0
+    assert index.search("the of and")[0].size == 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    vector = [{"id": 1, "similarity": 0.9}, {"id": 2, "similarity": 0.8}]
+    lexical = [{"id": 2, "bm25_score": 4.0}, {"id": 3, "bm25_score": 2.0}]
+
+    fused = reciprocal_rank_fusion([vector, lexical])
+
+    assert [c["id"] for c in fused] == [2, 1, 3]
+    assert fused[0]["similarity"] == 0.8  # vector fields kept
+    assert "rrf_score" not in vector[1]
+
+
+@pytest.fixture
+def retriever() -> PgVectorRetriever:
+    client = FakeSupabaseClient()
+    for chunk_id, (text, doc_id) in enumerate(zip(TEXTS, ["career_kb", "technical_kb", "technical_kb", "technical_kb"]), 1):
+        embedding = [0.0] * 4
+        embedding[chunk_id - 1] = 1.0
+        client.add_chunk(chunk_id, doc_id, text, embedding)
+    # The query embeds closest to the career chunk even though it names pgvector
+    return PgVectorRetriever(
+        similarity_threshold=0.3,
+        openai_client=FakeOpenAIClient(
+            {"why pgvector": [1.0, 0.2, 0.0, 0.0], "pgvector extension": [1.0, 0.5, 0.6, 0.0]}, 4
+        ),
+        supabase_client=client,
+        embedding_cache=EmbeddingCache(),
+        snapshot_dir=None,
+    )
+
+
+def test_lexical_search_returns_chunks_with_similarity(retriever: PgVectorRetriever) -> None:
+    chunks = retriever.lexical_search("why pgvector", top_k=3, threshold=0.0)
+
+    assert [c["id"] for c in chunks] == [2]
+    assert chunks[0]["bm25_score"] > 0
+    assert chunks[0]["similarity"] == pytest.approx(0.2 / (1.04 ** 0.5), abs=1e-5)
+    assert retriever.lexical_search("why pgvector", doc_id="career_kb", threshold=0.0) == []
+
+
+def test_lexical_search_drops_hits_below_similarity_threshold(retriever: PgVectorRetriever) -> None:
+    assert retriever.lexical_search("why pgvector", top_k=3) == []
+
+
+def test_rag_engine_drops_sub_threshold_lexical_hits(retriever: PgVectorRetriever) -> None:
+    from src.core.rag_engine import RagEngine
+
+    engine = RagEngine(use_pgvector=False, hybrid_retrieval=True)
+    engine.pgvector_retriever = retriever
+
+    hybrid = engine.retrieve("why pgvector", top_k=2)
+    engine.hybrid_retrieval = False
+    vector_only = engine.retrieve("why pgvector", top_k=2)
+
+    # Chunk 2 matches "pgvector" lexically but its similarity (~0.196) is
+    # below the 0.3 threshold, so fusion must not admit it
+    assert [c["id"] for c in vector_only["chunks"]] == [1]
+    assert [c["id"] for c in hybrid["chunks"]] == [1]
+    assert all(score >= 0.3 for score in hybrid["scores"])
+
+
+def test_rag_engine_fuses_lexical_hits(retriever: PgVectorRetriever) -> None:
+    from src.core.rag_engine import RagEngine
+
+    engine = RagEngine(use_pgvector=False, hybrid_retrieval=True)
+    engine.pgvector_retriever = retriever
+
+    hybrid = engine.retrieve("pgvector extension", top_k=2)
+    engine.hybrid_retrieval = False
+    vector_only = engine.retrieve("pgvector extension", top_k=2)
+
+    assert [c["id"] for c in vector_only["chunks"]] == [1, 3]
+    assert [c["id"] for c in hybrid["chunks"]] == [1, 2]
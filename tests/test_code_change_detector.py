@@ -0,0 +1,105 @@
+"""Tests for throttled source change detection and incremental code index refresh."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.retrieval.code_index import CodeIndex
+from src.retrieval.code_service import CodeIndexService, SourceChangeDetector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("def alpha():\n    pass\n")
+    (tmp_path / "src" / "b.py").write_text("def beta():\n    pass\n")
+    (tmp_path / "venv").mkdir()
+    (tmp_path / "venv" / "ignored.py").write_text("def ignored():\n    pass\n")
+    return tmp_path
+
+
+def _edit(path, text):
+    path.write_text(text)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_detector_scans_the_files_code_index_indexes(repo):
+    detector = SourceChangeDetector(repo, check_interval=0)
+    assert detector.snapshot == CodeIndex(repo).file_stats()
+    assert sorted(detector.snapshot) == [os.path.join("src", "a.py"), os.path.join("src", "b.py")]
+
+
+def test_detector_is_throttled_and_reports_exact_changes(repo):
+    clock = FakeClock()
+    detector = SourceChangeDetector(repo, check_interval=10, clock=clock)
+
+    _edit(repo / "src" / "a.py", "def alpha():\n    return 1\n")
+    (repo / "src" / "c.py").write_text("def gamma():\n    pass\n")
+    (repo / "src" / "b.py").unlink()
+
+    with patch.object(detector, "scan", wraps=detector.scan) as scan:
+        clock.now = 5
+        assert detector.poll() is None
+        scan.assert_not_called()
+
+        clock.now = 10
+        changes = detector.poll()
+        assert scan.call_count == 1
+
+    assert changes.modified == [os.path.join("src", "a.py")]
+    assert changes.added == [os.path.join("src", "c.py")]
+    assert changes.removed == [os.path.join("src", "b.py")]
+
+    clock.now = 20
+    assert not detector.poll()
+    assert detector.poll(force=True) is not None
+
+
+def test_service_refreshes_only_modified_files(repo):
+    index = CodeIndex(repo)
+    service = CodeIndexService(code_index=index, check_interval=0)
+    version = service.version()
+
+    assert not service.ensure_current()
+
+    _edit(repo / "src" / "a.py", "def alpha_renamed():\n    pass\n")
+    with patch.object(index, "_source_files", side_effect=AssertionError("full walk")), \
+            patch.object(index, "_parse_file", wraps=index._parse_file) as parse:
+        changes = service.ensure_current()
+
+    assert changes.modified == [os.path.join("src", "a.py")]
+    assert parse.call_count == 1
+    assert service.version() != version
+    assert list(index.index.items()) == list(CodeIndex(repo).index.items())
+    assert index.search_code("alpha_renamed")
+
+
+def test_service_rewalks_when_files_are_added_or_removed(repo):
+    index = CodeIndex(repo)
+    service = CodeIndexService(code_index=index, check_interval=0)
+
+    (repo / "src" / "c.py").write_text("def gamma():\n    pass\n")
+    (repo / "src" / "b.py").unlink()
+    service.ensure_current()
+
+    assert list(index.index.items()) == list(CodeIndex(repo).index.items())
+    assert index.search_code("gamma") and not index.search_code("beta")
+
+
+def test_disable_auto_rebuild_skips_checks(repo):
+    class Settings:
+        disable_auto_rebuild = True
+
+    service = CodeIndexService(settings=Settings(), code_index=CodeIndex(repo), check_interval=0)
+    with patch.object(service.detector, "scan", side_effect=AssertionError("scanned")):
+        assert service.ensure_current() is None
@@ -1,6 +1,6 @@
 """Tests around role-specific LangGraph enrichments for technical audiences."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, List
 
 import pytest
@@ -21,11 +21,20 @@ class DummyResponseGenerator:
 class DummyRagEngine:
     code_snippets: List[Dict[str, Any]]
     response_text: str = "Here is the latest information."
+    code_calls: List[Dict[str, Any]] = field(default_factory=list)
 
-    def retrieve(self, query: str, top_k: int = 4) -> Dict[str, Any]:
+    def retrieve(self, query: str, top_k: int = 4, doc_ids: List[str] | None = None) -> Dict[str, Any]:
         return {"matches": [], "scores": [], "chunks": []}
 
-    def retrieve_with_code(self, query: str, role: str | None = None) -> Dict[str, Any]:
+    def retrieve_with_code(
+        self,
+        query: str,
+        role: str | None = None,
+        include_code: bool | None = None,
+        query_embedding: List[float] | None = None,
+        candidates: List[Dict[str, Any]] | None = None,
+    ) -> Dict[str, Any]:
+        self.code_calls.append({"query_embedding": query_embedding, "candidates": candidates})
         return {
             "code_snippets": self.code_snippets,
             "has_code": bool(self.code_snippets),
@@ -93,6 +102,21 @@ def test_software_developer_receives_code_and_updates(developer_engine: DummyRag
     assert "Data Collection Overview" in output
 
 
+def test_code_lookup_reuses_query_embedding_and_retrieved_chunks(developer_engine: DummyRagEngine) -> None:
+    state = ConversationState(role="Software Developer", query="Show me the code for the retrieval pipeline")
+    state.query_embedding = [0.1, 0.2]
+    state.retrieved_chunks = [{"content": "Match A", "similarity": 0.9}]
+
+    nodes.classify_query(state)
+    nodes.plan_actions(state)
+    state.set_answer("Developer focused answer.")
+    nodes.apply_role_context(state, developer_engine)
+
+    assert developer_engine.code_calls == [
+        {"query_embedding": [0.1, 0.2], "candidates": [{"content": "Match A", "similarity": 0.9}]}
+    ]
+
+
 def test_non_technical_manager_offered_resume_prompt(developer_engine: DummyRagEngine) -> None:
     state = ConversationState(
         role="Hiring Manager (nontechnical)",
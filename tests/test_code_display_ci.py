@@ -11,10 +11,17 @@ from src.flows import conversation_nodes as nodes
 
 @dataclass
 class DummyRagEngine:
-    def retrieve(self, query: str, top_k: int = 4) -> Dict[str, Any]:
+    def retrieve(self, query: str, top_k: int = 4, doc_ids: List[str] | None = None) -> Dict[str, Any]:
         return {"matches": [], "scores": [], "chunks": []}
 
-    def retrieve_with_code(self, query: str, role: str | None = None) -> Dict[str, Any]:
+    def retrieve_with_code(
+        self,
+        query: str,
+        role: str | None = None,
+        include_code: bool | None = None,
+        query_embedding: List[float] | None = None,
+        candidates: List[Dict[str, Any]] | None = None,
+    ) -> Dict[str, Any]:
         return {"code_snippets": [], "has_code": False}
 
     @property
@@ -0,0 +1,80 @@
+"""Tests for the serialized CodeIndex artifact and incremental refresh."""
+
+import os
+
+import pytest
+
+from src.retrieval.code_index import CodeIndex
+
+MODULE_A = '''class Retriever:
+    """Fetches chunks."""
+
+    def retrieve_chunks(self, query):
+        return query
+'''
+
+MODULE_B = '''def generate_answer(state):
+    return state
+'''
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text(MODULE_A)
+    (tmp_path / "src" / "b.py").write_text(MODULE_B)
+    (tmp_path / "src" / "broken.py").write_text("def nope(:\n")
+    return tmp_path
+
+
+def _touch_later(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_artifact_round_trip_matches_fresh_build(repo):
+    built = CodeIndex(repo, artifact_path="artifact")
+    built.save()
+
+    loaded = CodeIndex(repo, artifact_path="artifact")
+    fresh = CodeIndex(repo)
+
+    assert loaded.loaded_from_artifact and not built.loaded_from_artifact
+    assert list(loaded.index.items()) == list(fresh.index.items())
+    assert loaded.search_code("retrieve") == fresh.search_code("retrieve")
+    assert loaded.search_by_keywords(["state", "query"]) == fresh.search_by_keywords(["state", "query"])
+
+    hit = loaded.search_code("retrieve_chunks")[0]
+    assert hit["citation"] == os.path.join("src", "a.py") + ":4-5"
+    assert hit["content"] == loaded.get_file_snippet(hit["file"], hit["line_start"], hit["line_end"])
+
+
+def test_refresh_reparses_only_changed_files(repo):
+    CodeIndex(repo, artifact_path="artifact").save()
+    index = CodeIndex(repo, artifact_path="artifact")
+    assert index.refresh() == 0
+
+    # Touched but unchanged: hash matches, nothing re-parsed
+    _touch_later(repo / "src" / "b.py")
+    assert index.refresh() == 0
+
+    # Shift retrieve_chunks down two lines, add a file, delete another
+    (repo / "src" / "a.py").write_text("import os\n\n" + MODULE_A)
+    _touch_later(repo / "src" / "a.py")
+    (repo / "src" / "c.py").write_text("def log_and_notify():\n    pass\n")
+    (repo / "src" / "b.py").unlink()
+
+    assert index.refresh() == 2
+    assert list(index.index.items()) == list(CodeIndex(repo).index.items())
+    assert index.search_code("retrieve_chunks")[0]["line_start"] == 6
+    assert not index.search_code("generate_answer")
+
+
+def test_corrupt_artifact_falls_back_to_building(repo):
+    (repo / "artifact").mkdir()
+    (repo / "artifact" / "index.json.gz").write_bytes(b"not gzip")
+
+    index = CodeIndex(repo, artifact_path="artifact")
+
+    assert not index.loaded_from_artifact
+    assert index.search_code("generate_answer")
@@ -0,0 +1,99 @@
+"""CodeIndex search via the inverted token index must match a full scan."""
+
+import pytest
+
+from src.retrieval.code_index import CodeIndex, REPO_ROOT, _SubstringPostings
+
+
+def _scan(index, keywords, name_points, content_points, max_results, any_content=False):
+    """Reference implementation: the original per-entry substring scan."""
+    results = []
+    for item in index.index.values():
+        name, content = item["name"].lower(), item["content"].lower()
+        if any_content:
+            score = name_points * (keywords[0] in name) + content_points * any(t in content for t in keywords[1:])
+        else:
+            score = sum(name_points * (k in name) + content_points * (k in content) for k in keywords)
+        if score:
+            results.append((item, score))
+    results.sort(key=lambda pair: pair[1], reverse=True)
+    return [(item["file"], item["name"], item["line_start"], score) for item, score in results[:max_results]]
+
+
+def _summary(results):
+    return [(r["file"], r["name"], r["line_start"], r["score"]) for r in results]
+
+
+@pytest.fixture(scope="module")
+def code_index():
+    return CodeIndex(REPO_ROOT, artifact_path="vector_stores/code_index")
+
+
+@pytest.mark.parametrize("query", [
+    "retrieve_chunks",
+    "retriev",                      # partial identifier
+    "how does the embedding cache work?",
+    "Noah's RAG pipeline",          # punctuation inside a term
+    "(",                            # no word characters at all
+    "__init__",
+    "db",                           # shorter than a trigram
+    "",
+])
+def test_search_code_matches_full_scan(code_index, query):
+    q = query.lower()
+    for max_results in (1, 3, 10):
+        expected = _scan(code_index, [q] + q.split(), 10, 5, max_results, any_content=True)
+        assert _summary(code_index.search_code(query, max_results)) == expected
+
+
+@pytest.mark.parametrize("keywords", [
+    ["pgvector", "embedding"],
+    ["Cache", "cache"],             # case-insensitive, duplicates count twice
+    ["chunk", "state", "self"],
+])
+def test_search_by_keywords_matches_full_scan(code_index, keywords):
+    expected = _scan(code_index, [k.lower() for k in keywords], 15, 5, 5)
+    assert _summary(code_index.search_by_keywords(keywords)) == expected
+
+
+def test_results_carry_citations(code_index):
+    hit = code_index.search_code("search_by_keywords")[0]
+    assert hit["name"] == "search_by_keywords"
+    assert hit["citation"] == f"{hit['file']}:{hit['line_start']}-{hit['line_end']}"
+    assert hit["github_url"].endswith(f"{hit['file']}#L{hit['line_start']}")
+
+
+def test_search_index_follows_refresh(tmp_path):
+    (tmp_path / "a.py").write_text("def alpha():\n    pass\n")
+    index = CodeIndex(tmp_path)
+    assert index.search_code("beta") == []
+
+    (tmp_path / "b.py").write_text("def beta():\n    pass\n")
+    index.refresh()
+    assert [r["name"] for r in index.search_code("beta")] == ["beta"]
+
+
+class NoScanDict(dict):
+    def __iter__(self):
+        raise AssertionError("vocabulary scanned")
+
+    items = keys = values = __iter__
+
+
+def test_substring_lookup_never_scans_the_vocabulary():
+    tokens = ["retrieve_chunks", "retriever", "chunk", "db", "embedding_cache"]
+    postings = _SubstringPostings({token: [entry_id] for entry_id, token in enumerate(tokens)})
+    postings.postings = NoScanDict(postings.postings)
+
+    assert postings.matches("chunk") == {0, 2}        # exact token + containing token
+    assert postings.matches("retriev") == {0, 1}
+    assert postings.matches("g_ca") == {4}
+    assert postings.matches("emb") == {4}
+    assert postings.matches("missing") == set()
+
+
+def test_short_terms_are_scanned_once_then_memoized():
+    postings = _SubstringPostings({"db": [0], "embedding": [1], "retriever": [2]})
+    assert postings.matches("b") == {0, 1}
+    postings.postings = NoScanDict(postings.postings)
+    assert postings.matches("b") == {0, 1}
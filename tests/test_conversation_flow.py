@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, List
 
 import pytest
@@ -22,8 +22,10 @@ class DummyResponseGenerator:
 class DummyRagEngine:
     retrieve_result: Dict[str, Any]
     response_text: str
+    retrieved_doc_ids: List[List[str] | None] = field(default_factory=list)
 
-    def retrieve(self, query: str, top_k: int = 4) -> Dict[str, Any]:
+    def retrieve(self, query: str, top_k: int = 4, doc_ids: List[str] | None = None) -> Dict[str, Any]:
+        self.retrieved_doc_ids.append(doc_ids)
         return self.retrieve_result
 
     @property
@@ -72,6 +74,23 @@ def test_retrieve_chunks_stores_context(base_state: ConversationState, dummy_eng
     assert base_state.fetch("retrieval_scores") == [0.95, 0.74]
 
 
+@pytest.mark.parametrize(
+    "query_type, expected",
+    [
+        ("career", ["career_kb"]),
+        ("technical", ["technical_kb", "architecture_kb"]),
+        ("mma", None),
+        ("general", None),
+    ],
+)
+def test_retrieve_chunks_routes_query_type_to_partitions(
+    base_state: ConversationState, dummy_engine: DummyRagEngine, query_type: str, expected
+) -> None:
+    base_state.stash("query_type", query_type)
+    nodes.retrieve_chunks(base_state, dummy_engine)
+    assert dummy_engine.retrieved_doc_ids == [expected]
+
+
 def test_generate_answer_uses_response_generator(base_state: ConversationState, dummy_engine: DummyRagEngine) -> None:
     nodes.retrieve_chunks(base_state, dummy_engine)
     nodes.generate_answer(base_state, dummy_engine)
@@ -0,0 +1,101 @@
+"""Tests for the query-embedding cache and its use in PgVectorRetriever."""
+
+import pytest
+
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.pgvector_retriever import PgVectorRetriever
+from tests.fake_supabase import FakeOpenAIClient, FakeSupabaseClient
+
+MODEL = "text-embedding-3-small"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hit_after_put_with_normalized_text() -> None:
+    cache = EmbeddingCache()
+    cache.put(MODEL, "What are Noah's skills?", [0.1, 0.2])
+
+    assert cache.get(MODEL, "  what are   noah's SKILLS? ") == pytest.approx([0.1, 0.2])
+    assert cache.get("text-embedding-3-large", "What are Noah's skills?") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_returned_vector_is_a_copy() -> None:
+    cache = EmbeddingCache()
+    cache.put(MODEL, "q", [1.0, 2.0])
+    cache.get(MODEL, "q").append(3.0)
+    assert cache.get(MODEL, "q") == [1.0, 2.0]
+
+
+def test_lru_eviction() -> None:
+    cache = EmbeddingCache(max_entries=2)
+    cache.put(MODEL, "a", [1.0])
+    cache.put(MODEL, "b", [2.0])
+    cache.get(MODEL, "a")  # "b" is now least recently used
+    cache.put(MODEL, "c", [3.0])
+
+    assert cache.get(MODEL, "b") is None
+    assert cache.get(MODEL, "a") == [1.0]
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl() -> None:
+    clock = FakeClock()
+    cache = EmbeddingCache(ttl_seconds=60, clock=clock)
+    cache.put(MODEL, "q", [1.0])
+
+    clock.now += 59
+    assert cache.get(MODEL, "q") == [1.0]
+    clock.now += 2
+    assert cache.get(MODEL, "q") is None
+    assert len(cache) == 0
+
+
+def test_persistent_tier_survives_new_instance(tmp_path) -> None:
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(persist_path=path).put(MODEL, "q", [0.5, -0.25])
+
+    restarted = EmbeddingCache(persist_path=path)
+    assert restarted.get(MODEL, "q") == pytest.approx([0.5, -0.25])
+    assert restarted.stats()["persistent_hits"] == 1
+
+
+def test_retriever_skips_openai_for_repeat_queries() -> None:
+    supabase = FakeSupabaseClient()
+    supabase.add_chunk(1, "career_kb", "Noah worked in sales at Tesla", [1.0, 0.0])
+    openai_client = FakeOpenAIClient({"tesla": [1.0, 0.0]}, 2)
+    retriever = PgVectorRetriever(
+        similarity_threshold=0.3,
+        openai_client=openai_client,
+        supabase_client=supabase,
+        embedding_cache=EmbeddingCache(),
+    )
+
+    first = retriever.retrieve("tesla")
+    second = retriever.retrieve_for_role("tesla", role="Just looking around")
+
+    assert [c["id"] for c in first] == [c["id"] for c in second] == [1]
+    assert len(openai_client.embeddings.calls) == 1
+
+
+def test_failed_embeddings_are_not_cached() -> None:
+    class BrokenEmbeddings:
+        def create(self, model, input):
+            raise RuntimeError("rate limited")
+
+    cache = EmbeddingCache()
+    retriever = PgVectorRetriever(
+        openai_client=type("Client", (), {"embeddings": BrokenEmbeddings()})(),
+        supabase_client=FakeSupabaseClient(),
+        embedding_cache=cache,
+    )
+
+    assert retriever.embed("tesla") == []
+    assert len(cache) == 0
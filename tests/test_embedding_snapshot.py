@@ -0,0 +1,70 @@
+"""Tests for the memory-mapped KB snapshot (src/retrieval/embedding_snapshot.py)."""
+
+import numpy as np
+
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.embedding_snapshot import load_snapshot, read_snapshot_version
+from src.retrieval.pgvector_retriever import PgVectorRetriever
+from tests.fake_supabase import FakeOpenAIClient, FakeSupabaseClient
+
+
+def _kb() -> FakeSupabaseClient:
+    client = FakeSupabaseClient()
+    client.add_chunk(1, "career_kb", "Noah worked in sales at Tesla", [1.0, 0.0, 0.0])
+    client.add_chunk(2, "technical_kb", "RAG pipeline with pgvector", [0.0, 2.0, 0.0])
+    return client
+
+
+def _retriever(supabase: FakeSupabaseClient, snapshot_dir) -> PgVectorRetriever:
+    return PgVectorRetriever(
+        similarity_threshold=0.3,
+        openai_client=FakeOpenAIClient({"rag": [0.0, 1.0, 0.0]}, 3),
+        supabase_client=supabase,
+        embedding_cache=EmbeddingCache(),
+        snapshot_dir=str(snapshot_dir),
+    )
+
+
+def _embedding_fetches(client: FakeSupabaseClient) -> int:
+    return sum(1 for table, op in client.calls if table == "kb_chunks" and op == "select")
+
+
+def test_snapshot_round_trip_is_memory_mapped(tmp_path) -> None:
+    supabase = _kb()
+    _retriever(supabase, tmp_path).export_snapshot()
+
+    index = load_snapshot(str(tmp_path), "text-embedding-3-small")
+
+    assert isinstance(index.matrix.base, np.memmap) or isinstance(index.matrix, np.memmap)
+    assert list(index.ids) == [1, 2]
+    assert index.version == read_snapshot_version(str(tmp_path))
+    assert index.search([0.0, 1.0, 0.0], top_k=1)[0]["similarity"] == 1.0
+
+
+def test_cold_start_uses_current_snapshot_without_downloading(tmp_path) -> None:
+    supabase = _kb()
+    _retriever(supabase, tmp_path).export_snapshot()
+    supabase.calls.clear()
+
+    chunks = _retriever(supabase, tmp_path).retrieve("rag")
+
+    assert [c["id"] for c in chunks] == [2]
+    # Only the single-row version check, not a page of embeddings
+    assert _embedding_fetches(supabase) == 1
+
+
+def test_stale_snapshot_falls_back_to_supabase(tmp_path) -> None:
+    supabase = _kb()
+    _retriever(supabase, tmp_path).export_snapshot()
+    supabase.add_chunk(3, "technical_kb", "pgvector ivfflat tuning", [0.0, 1.0, 0.1], updated_at="2025-10-17T00:00:00+00:00")
+
+    ids = [c["id"] for c in _retriever(supabase, tmp_path).retrieve("rag", top_k=2)]
+
+    assert sorted(ids) == [2, 3]
+
+
+def test_missing_or_foreign_snapshot_is_ignored(tmp_path) -> None:
+    assert load_snapshot(str(tmp_path / "missing")) is None
+
+    _retriever(_kb(), tmp_path).export_snapshot()
+    assert load_snapshot(str(tmp_path), "text-embedding-3-large") is None
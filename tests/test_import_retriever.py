@@ -0,0 +1,57 @@
+"""Tests for the load-once imports KB store."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.retrieval import import_retriever
+from src.retrieval.import_retriever import (
+    get_all_imports_for_role,
+    get_import_explanation,
+    search_import_explanations,
+)
+
+HEADER = "import,category,tier,audience,explanation,enterprise_concern,enterprise_alternative,when_to_switch\n"
+ROWS = (
+    'openai,llm,1,hm,"Reliable embeddings API.",c,a,w\n'
+    'openai,llm,2,dev,"Client with retry logic and embeddings.",c,a,w\n'
+    'supabase,database,1,hm,"Postgres database with vector search.",c,a,w\n'
+)
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    path = tmp_path / "imports_kb.csv"
+    path.write_text(HEADER + ROWS)
+    monkeypatch.setattr(import_retriever, "IMPORTS_KB_PATH", path)
+    return path
+
+
+def test_csv_parsed_once_across_calls(kb):
+    with patch.object(import_retriever, "_load_imports_kb", wraps=import_retriever._load_imports_kb) as load:
+        assert get_import_explanation("OpenAI", "Software Developer")["tier"] == "2"
+        assert [r["import"] for r in get_all_imports_for_role("Software Developer")] == ["openai", "supabase"]
+        assert search_import_explanations("why a vector database?", "Just looking around")[0]["import"] == "supabase"
+    assert load.call_count == 1
+
+
+def test_tier_fallback_and_missing_import(kb):
+    # supabase has no tier 2 row: developers get the tier 1 explanation
+    assert get_import_explanation("supabase", "Software Developer")["tier"] == "1"
+    assert get_import_explanation("pinecone", "Software Developer") is None
+
+
+def test_results_are_copies(kb):
+    get_import_explanation("openai", "Software Developer")["explanation"] = "mutated"
+    assert get_import_explanation("openai", "Software Developer")["explanation"] != "mutated"
+
+
+def test_reloads_when_file_mtime_changes(kb):
+    assert get_import_explanation("resend", "Software Developer") is None
+
+    kb.write_text(HEADER + ROWS + 'resend,email,1,hm,"Transactional email.",c,a,w\n')
+    stat = kb.stat()
+    os.utime(kb, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert get_import_explanation("resend", "Software Developer")["category"] == "email"
@@ -0,0 +1,367 @@
+"""Tests for PgVectorRetriever's in-process embedding index.
+
+Uses the in-memory Supabase/OpenAI doubles from tests/fake_supabase.py so
+the retrieval path runs end-to-end without network access.
+"""
+
+import numpy as np
+import pytest
+
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.embedding_index import EmbeddingIndex
+from src.retrieval.pgvector_retriever import PgVectorRetriever
+from tests.fake_supabase import FakeOpenAIClient, FakeSupabaseClient
+
+DIMS = 8
+
+
+def _unit(i: int) -> list:
+    vec = [0.0] * DIMS
+    vec[i] = 1.0
+    return vec
+
+
+@pytest.fixture
+def fake_supabase() -> FakeSupabaseClient:
+    client = FakeSupabaseClient()
+    client.add_chunk(1, "career_kb", "Noah worked in sales at Tesla", _unit(0))
+    client.add_chunk(2, "technical_kb", "RAG pipeline with pgvector", _unit(1))
+    client.add_chunk(3, "technical_kb", "LangGraph orchestration nodes", [0.0, 0.9, 0.1, 0, 0, 0, 0, 0])
+    client.add_chunk(4, "mma_kb", "Amateur MMA fight record", _unit(2))
+    return client
+
+
+@pytest.fixture
+def retriever(fake_supabase: FakeSupabaseClient) -> PgVectorRetriever:
+    openai_client = FakeOpenAIClient(
+        {
+            "tesla": _unit(0),
+            "rag": [0.0, 1.0, 0.05, 0, 0, 0, 0, 0],
+            "fight": _unit(2),
+        },
+        DIMS,
+    )
+    return PgVectorRetriever(
+        similarity_threshold=0.3,
+        openai_client=openai_client,
+        supabase_client=fake_supabase,
+        index_refresh_interval=3600,
+        embedding_cache=EmbeddingCache(),
+        snapshot_dir=None,
+    )
+
+
+def _embedding_fetches(client: FakeSupabaseClient) -> int:
+    return sum(1 for table, op in client.calls if table == "kb_chunks" and op == "select")
+
+
+def test_retrieve_ranks_by_cosine_similarity(retriever: PgVectorRetriever) -> None:
+    chunks = retriever.retrieve("rag", top_k=2)
+    assert [c["id"] for c in chunks] == [2, 3]
+    assert chunks[0]["similarity"] > chunks[1]["similarity"]
+    assert chunks[0]["doc_id"] == "technical_kb"
+
+
+def test_retrieve_applies_threshold(retriever: PgVectorRetriever) -> None:
+    chunks = retriever.retrieve("tesla", top_k=4)
+    assert [c["id"] for c in chunks] == [1]
+
+
+def test_index_is_loaded_once(retriever: PgVectorRetriever, fake_supabase: FakeSupabaseClient) -> None:
+    retriever.retrieve("rag")
+    calls_after_first = _embedding_fetches(fake_supabase)
+    retriever.retrieve("tesla")
+    retriever.retrieve("fight")
+    assert _embedding_fetches(fake_supabase) == calls_after_first
+
+
+def test_index_reloads_when_kb_changes(retriever: PgVectorRetriever, fake_supabase: FakeSupabaseClient) -> None:
+    assert retriever.retrieve("fight", top_k=1)[0]["id"] == 4
+
+    fake_supabase.add_chunk(5, "mma_kb", "Cage fight highlights", _unit(2), updated_at="2025-10-17T00:00:00+00:00")
+    retriever.index_refresh_interval = 0
+
+    ids = [c["id"] for c in retriever.retrieve("fight", top_k=2)]
+    assert sorted(ids) == [4, 5]
+
+
+def test_embedding_index_matches_brute_force() -> None:
+    rng = np.random.default_rng(7)
+    matrix = rng.normal(size=(200, 16)).astype(np.float32)
+    rows = [
+        {"id": i, "doc_id": "technical_kb", "section": f"s{i}", "content": f"c{i}", "embedding": matrix[i].tolist()}
+        for i in range(200)
+    ]
+    index = EmbeddingIndex.from_rows(rows)
+    query = rng.normal(size=16)
+
+    expected = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    top = index.search(query, top_k=5, threshold=-1.0)
+
+    assert [c["id"] for c in top] == list(np.argsort(-expected)[:5])
+    assert top[0]["similarity"] == pytest.approx(float(expected.max()), rel=1e-5)
+
+
+def test_embedding_index_handles_top_k_larger_than_index() -> None:
+    rows = [{"id": 1, "doc_id": "career_kb", "section": "a", "content": "x", "embedding": "[1.0, 0.0]"}]
+    index = EmbeddingIndex.from_rows(rows)
+    assert len(index.search([1.0, 0.0], top_k=10)) == 1
+
+
+@pytest.fixture
+def rpc_retriever(retriever: PgVectorRetriever) -> PgVectorRetriever:
+    retriever.search_mode = "rpc"
+    return retriever
+
+
+def test_rpc_mode_returns_top_k_without_downloading_chunks(
+    rpc_retriever: PgVectorRetriever, fake_supabase: FakeSupabaseClient
+) -> None:
+    chunks = rpc_retriever.retrieve("rag", top_k=2)
+
+    assert [c["id"] for c in chunks] == [2, 3]
+    assert ("search_kb_chunks", "rpc") in fake_supabase.calls
+    assert _embedding_fetches(fake_supabase) == 0
+
+
+def test_rpc_mode_pushes_doc_id_filter_into_sql(rpc_retriever: PgVectorRetriever) -> None:
+    chunks = rpc_retriever.retrieve("rag", top_k=1, threshold=-1.0, doc_id="career_kb")
+    assert [c["doc_id"] for c in chunks] == ["career_kb"]
+
+
+def test_rpc_mode_matches_local_index(rpc_retriever: PgVectorRetriever) -> None:
+    remote = rpc_retriever.retrieve("rag", top_k=3, threshold=0.0)
+    rpc_retriever.search_mode = "local"
+    local = rpc_retriever.retrieve("rag", top_k=3, threshold=0.0)
+
+    assert [c["id"] for c in remote] == [c["id"] for c in local]
+    for r, l in zip(remote, local):
+        assert r["similarity"] == pytest.approx(l["similarity"], abs=1e-5)
+
+
+def test_rpc_failure_falls_back_to_local_index(
+    rpc_retriever: PgVectorRetriever, fake_supabase: FakeSupabaseClient, monkeypatch
+) -> None:
+    def broken_rpc(name, params=None):
+        raise RuntimeError("PGRST203: Could not choose the best candidate function")
+
+    monkeypatch.setattr(fake_supabase, "rpc", broken_rpc)
+    assert [c["id"] for c in rpc_retriever.retrieve("fight", top_k=1)] == [4]
+
+
+def test_invalid_search_mode_rejected(fake_supabase: FakeSupabaseClient) -> None:
+    with pytest.raises(ValueError):
+        PgVectorRetriever(openai_client=FakeOpenAIClient({}, DIMS), supabase_client=fake_supabase, search_mode="faiss")
+
+
+def test_embed_many_uses_one_call_and_preserves_order(retriever: PgVectorRetriever) -> None:
+    calls = retriever.openai_client.embeddings.calls
+
+    vectors = retriever.embed_many(["fight", "tesla", "fight"])
+
+    assert vectors == [_unit(2), _unit(0), _unit(2)]
+    assert calls == [["fight", "tesla"]]
+
+    retriever.embed_many(["tesla", "rag"])
+    assert calls[-1] == ["rag"]  # "tesla" came from the embedding cache
+
+
+def test_retrieve_many_matches_single_query_retrieval(retriever: PgVectorRetriever) -> None:
+    queries = ["rag", "tesla", "fight"]
+    batched = retriever.retrieve_many(queries, top_k=2)
+
+    assert len(retriever.openai_client.embeddings.calls) == 1
+    for query, chunks in zip(queries, batched):
+        assert [c["id"] for c in chunks] == [c["id"] for c in retriever.retrieve(query, top_k=2)]
+
+
+def test_search_many_matches_search() -> None:
+    rng = np.random.default_rng(11)
+    rows = [
+        {"id": i, "doc_id": "career_kb", "section": "", "content": "", "embedding": rng.normal(size=12).tolist()}
+        for i in range(50)
+    ]
+    index = EmbeddingIndex.from_rows(rows)
+    queries = rng.normal(size=(4, 12))
+
+    batched = index.search_many(queries, top_k=3, threshold=-1.0)
+
+    assert [[c["id"] for c in r] for r in batched] == [
+        [c["id"] for c in index.search(q, top_k=3, threshold=-1.0)] for q in queries
+    ]
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_quantized_index_rescoring_matches_float32(storage: str) -> None:
+    rng = np.random.default_rng(3)
+    rows = [
+        {"id": i, "doc_id": "architecture_kb", "section": "", "content": "", "embedding": rng.normal(size=64).tolist()}
+        for i in range(300)
+    ]
+    exact = EmbeddingIndex.from_rows(rows)
+    compact = EmbeddingIndex.from_rows(rows).quantize(storage, rescore_candidates=32)
+    queries = rng.normal(size=(10, 64))
+
+    for expected, actual in zip(exact.search_many(queries, top_k=5, threshold=-1.0),
+                                compact.search_many(queries, top_k=5, threshold=-1.0)):
+        assert [c["id"] for c in actual] == [c["id"] for c in expected]
+        # Rescored similarities are exact float32, not quantized approximations
+        assert [c["similarity"] for c in actual] == pytest.approx([c["similarity"] for c in expected], abs=1e-6)
+
+    assert compact.resident_bytes < exact.resident_bytes / (1.9 if storage == "float16" else 3.5)
+
+
+@pytest.mark.parametrize("storage", ["float32", "int8"])
+def test_matryoshka_prefix_prefilter_rescores_at_full_dimension(storage: str) -> None:
+    rng = np.random.default_rng(5)
+    # Matryoshka-style vectors: leading dims carry most of the variance
+    scale = np.exp(-np.arange(64) / 16.0)
+    rows = [
+        {"id": i, "doc_id": "technical_kb", "section": "", "content": "", "embedding": (rng.normal(size=64) * scale).tolist()}
+        for i in range(300)
+    ]
+    exact = EmbeddingIndex.from_rows(rows)
+    prefix = EmbeddingIndex.from_rows(rows).quantize(storage, rescore_candidates=48, prefix_dims=16)
+    queries = rng.normal(size=(10, 64)) * scale
+
+    assert prefix.coarse.shape == (300, 16)
+    for expected, actual in zip(exact.search_many(queries, top_k=5, threshold=-1.0),
+                                prefix.search_many(queries, top_k=5, threshold=-1.0)):
+        assert [c["id"] for c in actual] == [c["id"] for c in expected]
+        assert [c["similarity"] for c in actual] == pytest.approx([c["similarity"] for c in expected], abs=1e-6)
+
+    # A prefix as wide as the index is a no-op
+    assert EmbeddingIndex.from_rows(rows).quantize("float32", prefix_dims=64).coarse is None
+
+
+def test_retriever_with_int8_storage(fake_supabase: FakeSupabaseClient) -> None:
+    retriever = PgVectorRetriever(
+        similarity_threshold=0.3,
+        openai_client=FakeOpenAIClient({"rag": [0.0, 1.0, 0.05, 0, 0, 0, 0, 0]}, DIMS),
+        supabase_client=fake_supabase,
+        embedding_cache=EmbeddingCache(),
+        snapshot_dir=None,
+        index_storage="int8",
+    )
+    assert [c["id"] for c in retriever.retrieve("rag", top_k=2)] == [2, 3]
+
+    with pytest.raises(ValueError):
+        EmbeddingIndex.from_rows([]).quantize("int4")
+
+
+def test_doc_id_filter_runs_before_top_k(retriever: PgVectorRetriever) -> None:
+    # "rag" is closest to the technical_kb chunks; filtering to career_kb must
+    # still return the best career chunk instead of an empty, post-filtered list
+    chunks = retriever.retrieve("rag", top_k=1, threshold=-1.0, doc_id="career_kb")
+    assert [c["id"] for c in chunks] == [1]
+
+
+def test_doc_id_accepts_multiple_partitions(retriever: PgVectorRetriever) -> None:
+    chunks = retriever.retrieve("fight", top_k=4, threshold=-1.0, doc_id=["career_kb", "mma_kb"])
+    assert [c["id"] for c in chunks] == [4, 1]
+    assert retriever.retrieve("fight", top_k=4, threshold=-1.0, doc_id=["unknown_kb"]) == []
+
+
+def test_index_partitions_are_contiguous_slices() -> None:
+    rows = [
+        {"id": i, "doc_id": doc_id, "section": "", "content": "", "embedding": _unit(i % DIMS)}
+        for i, doc_id in enumerate(["mma_kb", "career_kb", "mma_kb", "technical_kb", "career_kb"])
+    ]
+    index = EmbeddingIndex.from_rows(rows)
+
+    assert index.partitions == {"career_kb": [(0, 2)], "mma_kb": [(2, 4)], "technical_kb": [(4, 5)]}
+    assert {c["id"] for c in index.search(_unit(0), top_k=5, threshold=-1.0, doc_ids="mma_kb")} == {0, 2}
+
+
+@pytest.fixture
+def role_retriever() -> PgVectorRetriever:
+    client = FakeSupabaseClient()
+    # All equally similar to the query; only role keywords differ
+    client.add_chunk(1, "career_kb", "Noah led sales projects at Tesla", _unit(0))
+    client.add_chunk(2, "technical_kb", "Python RAG code with vector embedding", _unit(0))
+    client.add_chunk(3, "mma_kb", "Amateur MMA fight in the cage", _unit(0))
+    client.add_chunk(4, "career_kb", "Plain entry", _unit(0))
+    return PgVectorRetriever(
+        similarity_threshold=0.3,
+        openai_client=FakeOpenAIClient({"about noah": _unit(0)}, DIMS),
+        supabase_client=client,
+        embedding_cache=EmbeddingCache(),
+        snapshot_dir=None,
+    )
+
+
+@pytest.mark.parametrize(
+    "role, expected_first",
+    [
+        ("Software Developer", 2),
+        ("Hiring Manager", 1),
+        ("Just looking around", 3),
+    ],
+)
+def test_retrieve_for_role_boosts_role_content(role_retriever: PgVectorRetriever, role: str, expected_first: int) -> None:
+    chunks = role_retriever.retrieve_for_role("about noah", role, top_k=2)
+    assert chunks[0]["id"] == expected_first
+    assert chunks[0]["_boosted_similarity"] > chunks[0]["similarity"]
+
+
+def test_retrieve_for_role_uses_precomputed_features(role_retriever: PgVectorRetriever, monkeypatch) -> None:
+    role_retriever.retrieve("about noah")  # loads the index and its role features
+
+    def no_scanning(contents):
+        raise AssertionError("chunk text scanned per request")
+
+    monkeypatch.setattr("src.retrieval.pgvector_retriever.role_keyword_matrix", no_scanning)
+    first = role_retriever.retrieve_for_role("about noah", "Software Developer", top_k=4)
+    again = role_retriever.retrieve_for_role("about noah", "Software Developer", top_k=4)
+
+    assert [c["id"] for c in first] == [c["id"] for c in again]
+    assert "_boosted_similarity" not in role_retriever.retrieve("about noah", top_k=4)[0]
+
+
+def test_retrieve_for_role_weights_are_configurable(role_retriever: PgVectorRetriever) -> None:
+    chunks = role_retriever.retrieve_for_role(
+        "about noah", "Software Developer", top_k=4, role_weights={"technical": 0.0}
+    )
+    assert [c["_boosted_similarity"] for c in chunks] == pytest.approx([c["similarity"] for c in chunks])
+
+
+def test_retrieve_for_role_reranks_precomputed_candidates(role_retriever: PgVectorRetriever, monkeypatch) -> None:
+    embedding = role_retriever.embed("about noah")
+    candidates = role_retriever.retrieve("about noah", top_k=4, query_embedding=embedding)
+    expected = role_retriever.retrieve_for_role("about noah", "Software Developer", top_k=2)
+
+    def no_search(*args, **kwargs):
+        raise AssertionError("candidates were retrieved again")
+
+    monkeypatch.setattr(role_retriever, "embed", no_search)
+    monkeypatch.setattr(role_retriever, "retrieve", no_search)
+    reranked = role_retriever.retrieve_for_role("about noah", "Software Developer", top_k=2, candidates=candidates)
+
+    assert reranked == expected
+
+
+def test_rag_engine_embeds_query_once_and_reuses_candidates(role_retriever: PgVectorRetriever, monkeypatch, tmp_path) -> None:
+    from src.core.rag_engine import RagEngine
+    from src.retrieval.code_index import CodeIndex
+
+    engine = RagEngine(use_pgvector=False, code_index=CodeIndex(tmp_path))
+    engine.use_pgvector, engine.pgvector_retriever = True, role_retriever
+    embed_calls = []
+    original_embed = role_retriever.embed
+    monkeypatch.setattr(role_retriever, "embed", lambda text: embed_calls.append(text) or original_embed(text))
+
+    # Partition under-fills (one mma chunk), so the whole KB tops it up
+    results = engine.retrieve("about noah", top_k=3, doc_ids=["mma_kb"])
+    assert len(results["chunks"]) == 3
+    assert embed_calls == ["about noah"]
+    assert results["query_embedding"] == original_embed("about noah")
+
+    def no_search(*args, **kwargs):
+        raise AssertionError("KB searched again for code retrieval")
+
+    monkeypatch.setattr(role_retriever, "retrieve", no_search)
+    with_code = engine.retrieve_with_code(
+        "about noah", role="Software Developer",
+        query_embedding=results["query_embedding"], candidates=results["chunks"],
+    )
+    assert with_code["matches"] and set(with_code["matches"]) <= set(results["matches"])
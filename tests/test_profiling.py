@@ -0,0 +1,140 @@
+"""Tests for per-request pipeline profiling and latency histograms."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.flows import core_nodes
+from src.flows.async_flow import FlowNode, run_flow_graph, sync_node
+from src.flows.conversation_flow import run_conversation_flow
+from src.flows.conversation_state import ConversationState
+from src.observability.profiling import (
+    LatencyHistogram,
+    get_latency_histograms,
+    latency_summary,
+    node_span,
+    profile_pipeline,
+    span,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_histograms():
+    get_latency_histograms().reset()
+    yield
+    get_latency_histograms().reset()
+
+
+def test_spans_accumulate_into_the_active_profile():
+    with profile_pipeline() as profile:
+        with node_span("retrieve_chunks"):
+            for _ in range(2):
+                with span("embed"):
+                    time.sleep(0.01)
+        timings = profile.snapshot()
+
+    assert timings["spans"]["embed"]["count"] == 2
+    assert timings["spans"]["embed"]["ms"] >= 20
+    assert timings["nodes"]["retrieve_chunks"] >= timings["spans"]["embed"]["ms"]
+    assert timings["total_ms"] >= timings["nodes"]["retrieve_chunks"]
+
+
+def test_spans_outside_a_profile_are_no_ops():
+    with span("embed"), node_span("classify_query"):
+        pass
+    assert latency_summary() == {}
+
+
+def test_sync_nodes_record_into_the_request_profile_from_threads():
+    def embed_node(state):
+        with span("embed"):
+            time.sleep(0.01)
+        return state
+
+    nodes = [FlowNode("a", sync_node(embed_node)), FlowNode("b", sync_node(embed_node))]
+    with profile_pipeline() as profile:
+        asyncio.run(run_flow_graph(ConversationState(role="r", query="q"), nodes, deadline_s=5))
+
+    timings = profile.snapshot()
+    assert set(timings["nodes"]) == {"a", "b"}
+    assert timings["spans"]["embed"]["count"] == 2
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for value in [10] * 90 + [400] * 9 + [2500]:
+        histogram.observe(value)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100 and summary["max_ms"] == 2500
+    assert 5 <= summary["p50_ms"] <= 10
+    assert 300 <= summary["p95_ms"] <= 500
+    assert 300 <= summary["p99_ms"] <= 500
+    assert histogram.percentile(100) == 2500
+
+
+class DummyResponseGenerator:
+    def generate_contextual_response(self, query, context, role=None, chat_history=None, extra_instructions=None):
+        with span("llm"):
+            return "Noah has a strong track record."
+
+
+class DummyRagEngine:
+    response_generator = DummyResponseGenerator()
+
+    def retrieve(self, query, top_k=4, doc_ids=None):
+        with span("embed"):
+            pass
+        return {"matches": ["A"], "scores": [0.9], "chunks": [{"content": "A", "similarity": 0.9}]}
+
+
+def test_flow_persists_timings_with_the_message(monkeypatch):
+    logged = []
+
+    class DummyAnalytics:
+        @staticmethod
+        def log_interaction(data):
+            logged.append(data)
+            return 1
+
+    monkeypatch.setattr(core_nodes, "supabase_analytics", DummyAnalytics)
+    state = run_conversation_flow(
+        ConversationState(role="Hiring Manager (nontechnical)", query="Tell me about Noah's career"),
+        DummyRagEngine(),
+        session_id="s",
+    )
+
+    timings = state.analytics_metadata["timings"]
+    assert logged[0].timings == timings
+    assert {"classify_query", "retrieve_chunks", "generate_answer", "execute_actions"} <= set(timings["nodes"])
+    assert {"embed", "llm"} <= set(timings["spans"])
+    summary = latency_summary()
+    assert summary["total"]["count"] == 1
+    assert "node.log_and_notify" in summary and "span.llm" in summary
+
+
+def _latency_request(headers):
+    from io import BytesIO
+    from unittest.mock import MagicMock
+
+    from api.chat import handler as ChatHandler
+
+    handler = ChatHandler.__new__(ChatHandler)
+    handler.send_response = MagicMock()
+    handler.send_header = MagicMock()
+    handler.end_headers = MagicMock()
+    handler.headers = headers
+    handler.wfile = BytesIO()
+    handler.do_GET()
+    return handler.send_response.call_args[0][0]
+
+
+def test_latency_endpoint_requires_admin_token(monkeypatch):
+    monkeypatch.delenv("LATENCY_STATS_TOKEN", raising=False)
+    assert _latency_request({"Authorization": "Bearer anything"}) == 404
+
+    monkeypatch.setenv("LATENCY_STATS_TOKEN", "s3cret")
+    assert _latency_request({}) == 403
+    assert _latency_request({"Authorization": "Bearer wrong"}) == 403
+    assert _latency_request({"Authorization": "Bearer s3cret"}) == 200
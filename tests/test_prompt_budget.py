@@ -0,0 +1,139 @@
+"""Tests for token-budget-aware role prompt assembly."""
+
+from unittest.mock import Mock
+
+from src.core.prompt_budget import (
+    PromptBudget,
+    TokenCounter,
+    capture_prompt_report,
+    fit_context,
+    fit_history,
+)
+from src.core.response_generator import ResponseGenerator
+
+COUNTER = TokenCounter(chars_per_token=4)
+
+
+def _chunk(content, similarity, **extra):
+    return {"content": content, "similarity": similarity, **extra}
+
+
+def test_estimator_collapses_whitespace_runs():
+    assert COUNTER.count("") == 0
+    assert COUNTER.count("abcd efgh") == 3
+    assert COUNTER.count("abcd            \n\n      efgh") == 3
+
+
+def test_truncate_stays_within_budget_and_closes_code_fences():
+    text = "intro line\n```python\n" + "x = compute(x)\n" * 200 + "```\n"
+    cut = COUNTER.truncate(text, 60)
+    assert COUNTER.count(cut) <= 60
+    assert cut.count("```") % 2 == 0
+    assert cut.endswith("[...]")
+    assert COUNTER.truncate("short", 60) == "short"
+
+
+def test_fit_history_keeps_newest_contiguous_lines():
+    lines = ["User: " + "a" * 200, "Assistant: " + "b" * 40, "User: " + "c" * 40]
+    kept, used = fit_history(lines, 40, COUNTER)
+    assert kept == lines[1:]
+    assert used == sum(COUNTER.count(line) + 1 for line in kept)
+
+
+def test_fit_context_drops_low_scores_and_keeps_retrieval_order():
+    chunks = [
+        _chunk("low " * 100, 0.2),
+        _chunk("high " * 50, 0.9),
+        _chunk("mid " * 50, 0.5, _boosted_similarity=0.95),
+    ]
+    texts, usage = fit_context(chunks, 130, COUNTER, min_chunk_tokens=80)
+    assert texts == [chunks[1]["content"], chunks[2]["content"]]
+    assert usage == {"context": 115, "chunks_used": 2, "chunks_trimmed": 0, "chunks_dropped": 1}
+
+
+def test_fit_context_trims_when_enough_budget_remains():
+    chunks = [_chunk("first " * 40, 0.9), _chunk("second line\n" * 100, 0.8)]
+    texts, usage = fit_context(chunks, 200, COUNTER, min_chunk_tokens=80)
+    assert texts[0] == chunks[0]["content"]
+    assert texts[1].endswith("[...]")
+    assert usage["chunks_trimmed"] == 1 and usage["chunks_dropped"] == 0
+    assert usage["context"] <= 200
+
+
+def test_fit_context_without_limit_keeps_everything():
+    chunks = [_chunk("a" * 400, 0.1), "plain string chunk"]
+    texts, usage = fit_context(chunks, None, COUNTER)
+    assert texts == ["a" * 400, "plain string chunk"]
+    assert usage["chunks_dropped"] == 0
+
+
+def _generator(total):
+    return ResponseGenerator(llm=Mock(), prompt_budget=PromptBudget(total=total, history=100, min_chunk=80),
+                             token_counter=COUNTER)
+
+
+def test_assembled_prompt_fits_budget_and_reports_usage():
+    gen = _generator(total=1500)
+    chunks = [_chunk(f"chunk {i} " + "detail " * 400, 0.9 - i / 10) for i in range(4)]
+
+    with capture_prompt_report() as report:
+        prompt, context_str, returned = gen.assemble_role_prompt("How does RAG work?", chunks, "Software Developer")
+
+    assert report == returned
+    assert report["total"] == COUNTER.count(prompt) <= 1500
+    assert report["chunks_used"] + report["chunks_dropped"] == 4
+    assert report["chunks_dropped"] >= 1
+    assert "chunk 0" in context_str and "chunk 3" not in context_str
+    assert report["tokenizer"] == "estimate:4"
+
+
+def test_history_is_included_in_the_role_prompt():
+    gen = _generator(total=0)
+    history = [
+        {"role": "user", "content": "What does Noah work on?"},
+        {"role": "assistant", "content": "Noah builds RAG systems."},
+    ]
+    prompt, _, report = gen.assemble_role_prompt("Tell me more", [], None, history)
+    assert "Previous conversation:\nUser: What does Noah work on?\nAssistant: Noah builds RAG systems." in prompt
+    assert report["history"] > 0
+
+
+def test_generate_and_stream_send_the_same_budgeted_prompt():
+    llm = Mock()
+    llm.predict.return_value = "answer"
+    llm.stream = None
+    gen = ResponseGenerator(llm=llm, qa_chain=Mock(), prompt_budget=PromptBudget(total=1200), token_counter=COUNTER)
+    chunks = [_chunk("fact " * 2000, 0.9)]
+
+    with capture_prompt_report() as report:
+        assert gen.generate_contextual_response("q", chunks) == "answer"
+    sent = llm.predict.call_args[0][0]
+    assert COUNTER.count(sent) <= 1200 and report["chunks_trimmed"] == 1
+
+    with capture_prompt_report() as stream_report:
+        deltas = gen.stream_contextual_response("q", chunks)
+    assert stream_report == report
+    assert "".join(deltas) == "answer"
+    assert llm.predict.call_args[0][0] == sent
+
+
+def test_only_exact_counts_are_logged_as_tokens_prompt(monkeypatch):
+    from src.flows import core_nodes
+    from src.flows.conversation_state import ConversationState
+
+    logged = []
+
+    class DummyAnalytics:
+        @staticmethod
+        def log_interaction(data):
+            logged.append(data.tokens_prompt)
+            return 1
+
+    monkeypatch.setattr(core_nodes, "supabase_analytics", DummyAnalytics)
+    for tokenizer in ("estimate:3.5", "tiktoken:cl100k_base"):
+        state = ConversationState(role="Software Developer", query="q")
+        state.update_analytics("prompt_budget", {"total": 321, "tokenizer": tokenizer})
+        core_nodes.log_and_notify(state, session_id="s", latency_ms=1)
+        assert state.analytics_metadata["prompt_budget"]["total"] == 321  # estimate still recorded
+
+    assert logged == [None, 321]
@@ -0,0 +1,102 @@
+"""Table-driven tests for classify_query and the compiled keyword matcher."""
+
+import ast
+import random
+from pathlib import Path
+
+import pytest
+
+from src.flows import query_classification as qc
+from src.flows.conversation_state import ConversationState
+from src.flows.keyword_matcher import KeywordMatcher
+
+DEV = "Software Developer"
+HM = "Hiring Manager (nontechnical)"
+
+# (role, query, query_type, flags set to True)
+CASES = [
+    (DEV, "Tell me about Noah's career", "career", set()),
+    (DEV, "Can I see his resume or CV?", "career", set()),
+    (DEV, "What kind of work does Noah do?", "career", set()),
+    (DEV, "Show me the code for the retrieval pipeline", "technical", {"code_display_requested", "code_would_help"}),
+    (HM, "Show me the code for the retrieval pipeline", "technical", {"code_display_requested"}),
+    (DEV, "How would you build an API endpoint for this?", "technical", {"code_would_help"}),
+    (HM, "How would you build an API endpoint for this?", "general", set()),
+    (DEV, "how does this chatbot work", "technical", {"needs_longer_response", "teaching_moment"}),
+    (DEV, "What technical stack is used?", "technical", set()),
+    (DEV, "Why did you choose Supabase instead of Pinecone?", "technical",
+     {"import_explanation_requested", "needs_longer_response", "teaching_moment"}),
+    (DEV, "What does langchain do here?", "technical", {"import_explanation_requested"}),
+    (DEV, "Does Noah like streamlit?", "general", set()),
+    (DEV, "Does Noah do MMA?", "mma", set()),
+    (DEV, "He fights in the UFC cage", "mma", set()),
+    (DEV, "What's his amateur bout record?", "mma", set()),
+    (DEV, "I love mmatches and fighters", "general", set()),  # whole words only
+    (DEV, "Tell me about Noah", "general", set()),  # "bout" inside "about"
+    (DEV, "Any fun fact about Noah?", "fun", set()),
+    (DEV, "Can you display the collected data?", "data", {"data_display_requested"}),
+    (DEV, "How many users asked questions this week?", "data", {"data_would_help"}),
+    (DEV, "Compare pgvector vs FAISS", "data",
+     {"code_would_help", "data_would_help", "import_explanation_requested", "needs_longer_response", "teaching_moment"}),
+    (DEV, "Tell me about his cvs", "data", {"data_would_help", "import_explanation_requested"}),  # substring "vs"
+    (DEV, "engineering", "general", {"vague_query_expanded"}),
+    (DEV, "hello", "general", set()),
+    (DEV, "", "general", set()),
+]
+
+
+@pytest.mark.parametrize("role,query,query_type,flags", CASES)
+def test_classify_query_flags(role, query, query_type, flags):
+    state = qc.classify_query(ConversationState(role=role, query=query))
+
+    assert state.fetch("query_type") == query_type
+    assert {key for key, value in state.extras.items() if value is True} == flags
+
+
+VOCABULARIES = {
+    "teaching": qc.TEACHING_KEYWORDS,
+    "code_display": qc.CODE_DISPLAY_KEYWORDS,
+    "proactive_code": qc.PROACTIVE_CODE_TOPICS,
+    "import": qc.IMPORT_KEYWORDS,
+    "library": qc.LIBRARY_NAMES,
+    "fun": qc.FUN_KEYWORDS,
+    "data_display": qc.DATA_DISPLAY_KEYWORDS,
+    "proactive_data": qc.PROACTIVE_DATA_TOPICS,
+    "career": qc.CAREER_TERMS,
+}
+
+
+def test_matcher_agrees_with_substring_scans():
+    words = [phrase for phrases in VOCABULARIES.values() for phrase in phrases] + ["noah", "about", "?", "x"]
+    rng = random.Random(7)
+    for _ in range(2000):
+        text = rng.choice(["", " ", "-"]).join(rng.choices(words, k=rng.randint(0, 6)))
+        hits = qc.QUERY_MATCHER.match(text)
+        for category, phrases in VOCABULARIES.items():
+            assert (category in hits) == any(phrase in text for phrase in phrases), (category, text)
+
+
+def test_matcher_reports_overlapping_phrases():
+    matcher = KeywordMatcher({"short": ["how does"], "long": ["how does it"], "inner": ["does i"], "tail": ["it"]})
+    assert matcher.match("so how does it work") == {"short", "long", "inner", "tail"}
+    assert matcher.match("how doe") == frozenset()
+
+
+def test_word_bounded_phrases():
+    matcher = KeywordMatcher({"other": ["about"]}, word_bounded={"mma": ["bout", "mma"]})
+    assert matcher.match("his last bout.") == {"mma"}
+    assert matcher.match("tell me about it") == {"other"}
+    assert matcher.match("mma") == {"mma"}
+
+
+def test_partitions_only_name_ingested_kbs():
+    script = Path(__file__).resolve().parent.parent / "scripts" / "migrate_all_kb_to_supabase.py"
+    tree = ast.parse(script.read_text(encoding="utf-8"))
+    ingested = next(
+        ast.literal_eval(node.value)
+        for node in tree.body
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "KNOWLEDGE_BASES"
+    )
+    doc_ids = {kb["doc_id"] for kb in ingested.values()}
+    for partitions in qc.QUERY_TYPE_PARTITIONS.values():
+        assert set(partitions) <= doc_ids
@@ -31,4 +31,69 @@ def test_rag_engine_integration(rag_engine):
     query = "Explain the tech stack used in the project."
     response = rag_engine.generate_response(query)
     assert response is not None
-    assert "tech stack" in response.lower()
\ No newline at end of file
+    assert "tech stack" in response.lower()
+
+class _CountingEngine:
+    created = 0
+
+    def __init__(self):
+        type(self).created += 1
+
+
+@pytest.fixture
+def counting_engine(monkeypatch):
+    import src.core.rag_engine as rag_engine_module
+
+    _CountingEngine.created = 0
+    monkeypatch.setattr(rag_engine_module, "RagEngine", _CountingEngine)
+    rag_engine_module.reset_rag_engine()
+    yield rag_engine_module
+    rag_engine_module.reset_rag_engine()
+
+
+def test_get_rag_engine_builds_once_across_threads(counting_engine):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        engines = list(pool.map(lambda _: counting_engine.get_rag_engine(), range(32)))
+
+    assert _CountingEngine.created == 1
+    assert all(engine is engines[0] for engine in engines)
+
+
+def test_reset_rag_engine_forces_rebuild(counting_engine):
+    first = counting_engine.get_rag_engine()
+    counting_engine.reset_rag_engine()
+
+    assert counting_engine.get_rag_engine() is not first
+    assert _CountingEngine.created == 2
+
+
+def test_components_are_built_lazily():
+    from src.core.rag_engine import LAZY_COMPONENTS
+
+    engine = RagEngine(use_pgvector=False)
+    assert not any(engine.components_loaded().values())
+
+    engine.response_generator
+    loaded = engine.components_loaded()
+    assert loaded["llm"] and loaded["response_generator"]
+    assert not (loaded["code_index"] or loaded["career_kb"] or loaded["_career_docs"] or loaded["embeddings"])
+
+    timings = engine.warm(["code_service"])
+    assert set(timings) == {"code_service"}
+    assert engine.components_loaded()["code_index"]
+
+    engine.warm()
+    assert all(engine.components_loaded()[name] for name in LAZY_COMPONENTS)
+    with pytest.raises(ValueError):
+        engine.warm(["faiss_index"])
+
+
+def test_lazy_components_can_be_injected():
+    engine = RagEngine(use_pgvector=False)
+    sentinel = object()
+    engine.response_generator = sentinel
+
+    assert engine.response_generator is sentinel
+    assert not engine.components_loaded()["llm"]
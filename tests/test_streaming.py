@@ -0,0 +1,188 @@
+"""Tests for token streaming: ResponseGenerator → conversation flow → /api/chat SSE."""
+
+import json
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.chat import handler as ChatHandler
+from src.core.response_generator import ResponseGenerator
+from src.flows import conversation_flow
+from src.flows.code_validation import sanitize_answer_stream, sanitize_generated_answer
+from src.flows.conversation_flow import stream_conversation_flow
+from src.flows.conversation_nodes import generate_answer
+from src.flows.conversation_state import ConversationState
+
+COMPLETION = "Noah shipped this.\nI built the retriever and I am skilled in Python. My work is on GitHub."
+
+
+class ChunkLLM:
+    """Streams a fixed completion in small chunks (splitting replacement patterns)."""
+
+    def __init__(self, text=COMPLETION, size=3):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+
+    def predict(self, prompt):
+        return "".join(self.chunks)
+
+    def stream(self, prompt):
+        for chunk in self.chunks:
+            yield MagicMock(content=chunk)
+
+
+def _generator(llm):
+    return ResponseGenerator(llm)
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1000])
+def test_streamed_response_matches_blocking_response(size):
+    generator = _generator(ChunkLLM(size=size))
+    kwargs = dict(query="What did Noah build?", context=[{"content": "ctx"}], role="Software Developer")
+
+    deltas = list(generator.stream_contextual_response(**kwargs))
+
+    assert "".join(deltas) == generator.generate_contextual_response(**kwargs)
+    assert "Noah built" in "".join(deltas) and "I built" not in "".join(deltas)
+    if size == 1:
+        assert len(deltas) > 1
+
+
+def test_stream_falls_back_to_predict_without_stream_support():
+    class PredictOnly:
+        def predict(self, prompt):
+            return "My background is in sales."
+
+    deltas = list(_generator(PredictOnly()).stream_contextual_response("q", ["ctx"]))
+    assert "".join(deltas) == "Noah's background is in sales."
+
+
+@pytest.mark.parametrize("text", [
+    "}\n\nSELECT\n\nHere is the answer.\nSecond line.",
+    "  Plain answer without artifacts",
+    "SELECT\n",
+    "FROM.\n{}\nSelected projects follow.\nFrom sales to AI.",
+    "((\n(not an artifact) answer",
+])
+def test_sanitize_answer_stream_drops_artifact_prefix(text):
+    for size in (1, 4, 100):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        streamed = "".join(sanitize_answer_stream(chunks))
+        assert streamed.rstrip("\n") == sanitize_generated_answer(text)
+
+
+def test_sanitize_answer_stream_yields_before_first_newline():
+    stream = sanitize_answer_stream(iter(["\n  Noah", " built", " a RAG system.", "\nMore."]))
+    assert next(stream) == "Noah"  # released on the first delta, not at the newline
+    assert next(stream) == " built"
+
+    stream = sanitize_answer_stream(iter(["}\n", "Sel", "ected work", " follows"]))
+    assert next(stream) == "Selected work"  # "Sel" could still be SELECT; held one delta
+
+
+def _state(query="What did Noah build?"):
+    state = ConversationState(role="Software Developer", query=query)
+    state.retrieved_chunks = [{"content": "Noah built a RAG system.", "similarity": 0.9}]
+    return state
+
+
+def test_generate_answer_stream_sets_same_answer():
+    engine = MagicMock()
+    engine.response_generator = _generator(ChunkLLM(text="}\nSELECT\n" + COMPLETION))
+
+    streamed_state = _state()
+    deltas = list(conversation_flow.generate_answer_stream(streamed_state, engine))
+    blocking_state = generate_answer(_state(), engine)
+
+    assert streamed_state.answer == blocking_state.answer
+    assert "".join(deltas).startswith("Noah shipped this.")
+    budget = streamed_state.analytics_metadata["prompt_budget"]
+    assert budget == blocking_state.analytics_metadata["prompt_budget"]
+    assert budget["chunks_used"] == 1 and budget["total"] > budget["context"]
+
+
+def test_rag_engine_streams_llm_tokens():
+    from src.core.rag_engine import RagEngine
+
+    engine = RagEngine(use_pgvector=False)
+    engine.llm = ChunkLLM(size=2)
+
+    deltas = list(conversation_flow.generate_answer_stream(_state(), engine))
+
+    assert len(deltas) > 10  # token by token, not one synthesized chunk at the end
+    assert "".join(deltas).startswith("Noah shipped this.")
+    assert not engine.response_generator.degraded_mode
+
+
+def test_stream_conversation_flow_event_order(monkeypatch):
+    def apply_role_context(state, rag_engine):
+        state.set_answer(state.answer + "\n\n**Code**")
+        return state
+
+    monkeypatch.setattr(conversation_flow, "retrieve_chunks", lambda state, engine: state)
+    monkeypatch.setattr(conversation_flow, "apply_role_context", apply_role_context)
+    monkeypatch.setattr(conversation_flow, "execute_actions", lambda state: state)
+    monkeypatch.setattr(conversation_flow, "log_and_notify", lambda state, **kwargs: state)
+
+    engine = MagicMock()
+    engine.response_generator = _generator(ChunkLLM())
+    events = list(stream_conversation_flow(_state("Tell me about the retriever code"), engine, session_id="s"))
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[-2:] == ["context", "done"] and set(kinds[:-2]) == {"token"}
+    tokens = "".join(payload for kind, payload in events if kind == "token")
+    final_state = events[-1][1]
+    assert final_state.answer == tokens + events[-2][1]
+
+
+def _chat_handler(request):
+    handler = ChatHandler.__new__(ChatHandler)
+    handler.send_response = MagicMock()
+    handler.send_header = MagicMock()
+    handler.end_headers = MagicMock()
+    body = json.dumps(request).encode("utf-8")
+    handler.headers = {"Content-Length": str(len(body))}
+    handler.rfile = BytesIO(body)
+    handler.wfile = BytesIO()
+    return handler
+
+
+def _events(raw):
+    frames = [frame for frame in raw.decode("utf-8").split("\n\n") if frame]
+    return [(frame.split("\n")[0][len("event: "):], json.loads(frame.split("\n")[1][len("data: "):]))
+            for frame in frames]
+
+
+def test_chat_api_sends_server_sent_events():
+    final = ConversationState(role="Software Developer", query="q")
+    final.set_answer("Hello world\n\nblock")
+
+    def fake_flow(state, rag_engine, session_id):
+        yield ("token", "Hello ")
+        yield ("token", "world")
+        yield ("context", "\n\nblock")
+        yield ("done", final)
+
+    handler = _chat_handler({"query": "q", "role": "Software Developer", "stream": True})
+    with patch("api.chat.get_rag_engine"), patch("api.chat.stream_conversation_flow", fake_flow), \
+            patch("api.chat.supabase_analytics") as analytics:
+        handler.do_POST()
+
+    analytics.flush.assert_called_once()  # queued analytics written before the instance can freeze
+    handler.send_header.assert_any_call("Content-Type", "text/event-stream")
+    events = _events(handler.wfile.getvalue())
+    assert [kind for kind, _ in events] == ["token", "token", "context", "done"]
+    assert events[-1][1]["answer"] == "Hello world\n\nblock" and events[-1][1]["success"]
+
+
+def test_chat_api_reports_stream_errors_in_band():
+    def failing_flow(state, rag_engine, session_id):
+        yield ("token", "partial")
+        raise RuntimeError("boom")
+
+    handler = _chat_handler({"query": "q", "stream": True})
+    with patch("api.chat.get_rag_engine"), patch("api.chat.stream_conversation_flow", failing_flow):
+        handler.do_POST()
+
+    events = _events(handler.wfile.getvalue())
+    assert events[-1] == ("error", {"success": False, "error": "Internal server error: boom"})